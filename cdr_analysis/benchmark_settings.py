@@ -0,0 +1,17 @@
+# Settings for running the benchmarks where PostgreSQL is not available:
+#
+#     python manage.py run_benchmarks --settings=cdr_analysis.benchmark_settings
+#
+# SQLite has no full-text search trigger or server-side cursors, so its
+# timings are only comparable with other SQLite runs.
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'benchmark.sqlite3',
+        'TEST': {'NAME': BASE_DIR / 'benchmark.sqlite3'},
+    }
+}
@@ -23,10 +23,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'cdr_app',
 ]
 
 MIDDLEWARE = [
+    'cdr_app.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,6 +36,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cdr_app.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'cdr_analysis.urls'
@@ -72,6 +75,20 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# File-based so web workers and the enrichment workers that invalidate it
+# share one cache without running a cache server.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -112,3 +129,137 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Inference models
+# Pipelines are loaded once per process by cdr_app.model_registry.
+
+# Override the checkpoint used for a pipeline task, e.g.
+# {'summarization': 'sshleifer/distilbart-cnn-12-6'}
+CDR_MODELS = {}
+
+# Pin a checkpoint revision (tag or commit) per pipeline task. The model and
+# revision are recorded on every enriched record; `manage.py reenrich`
+# reprocesses records enriched with anything else.
+CDR_MODEL_REVISIONS = {}
+
+# Pipeline tasks to load in the background when a worker starts.
+CDR_WARM_MODELS = []
+
+# Upper bound on the resident size of cached models; least recently used
+# models are evicted once it is exceeded. None disables eviction.
+CDR_MODEL_MEMORY_BUDGET_MB = None
+
+# How models run on the CPU: 'torch' (fp32), 'torch-int8' (dynamically
+# quantized Linear layers) or 'onnx' (ONNX Runtime, needs optimum[onnxruntime]).
+# CDR_INFERENCE_BACKENDS overrides it per pipeline task.
+CDR_INFERENCE_BACKEND = 'torch'
+CDR_INFERENCE_BACKENDS = {}
+
+# Where the 'onnx' backend saves its exports, one directory per checkpoint
+# and revision, so each checkpoint is only exported once.
+CDR_ONNX_EXPORT_DIR = BASE_DIR / 'onnx_models'
+
+# Number of texts per padded forward pass in the batched inference helpers.
+CDR_INFERENCE_BATCH_SIZE = 16
+
+# Tokens per chunk when long notes are summarized map-reduce style. None uses
+# the summarization model's own input limit.
+CDR_SUMMARY_CHUNK_TOKENS = None
+
+
+# Enrichment job queue
+# Jobs are stored in the database and executed by
+# `manage.py run_enrichment_worker`.
+
+CDR_JOB_MAX_ATTEMPTS = 5
+
+# Retries back off exponentially from the base delay up to the maximum.
+CDR_JOB_RETRY_BASE_SECONDS = 30
+CDR_JOB_RETRY_MAX_SECONDS = 3600
+
+# Running jobs whose worker has not finished them within this time are
+# assumed abandoned and put back on the queue.
+CDR_JOB_LOCK_TIMEOUT_SECONDS = 1800
+
+
+# CSV ingestion
+
+# Rows read, parsed and upserted per statement.
+CDR_INGEST_CHUNK_SIZE = 5000
+
+
+# CDR list view
+
+# Rows per page, and the largest page a client may ask for with ?page_size=.
+CDR_LIST_PAGE_SIZE = 50
+CDR_LIST_MAX_PAGE_SIZE = 500
+
+# Rows fetched per round trip from the server-side cursor when exporting.
+CDR_EXPORT_CHUNK_SIZE = 2000
+
+# Long recordings are transcribed in windows of this many seconds, each with
+# this much extra context on both sides that is decoded but discarded.
+CDR_ASR_WINDOW_SECONDS = 30
+CDR_ASR_OVERLAP_SECONDS = 2
+
+# Seconds the list page and the dashboard aggregates are served from the
+# cache. Any write to the CDR table retires cached results sooner.
+CDR_CACHE_TIMEOUTS = {
+    'cdr_list': 30,
+    'cdr_aggregates': 300,
+    'cdr_graph_number': 300,
+    'cdr_graph_rings': 300,
+}
+
+# Prometheus metrics at /metrics are only served to these client addresses.
+# Behind a reverse proxy on the same host every request arrives from
+# 127.0.0.1, so also set CDR_METRICS_TOKEN there: scrapers must then send
+# "Authorization: Bearer <token>". The counters are kept per worker process;
+# with several workers each scrape sees only the worker that answered it.
+CDR_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+CDR_METRICS_TOKEN = os.environ.get('CDR_METRICS_TOKEN', '')
+
+# Count and time the database queries of every request for /metrics. Each
+# query then goes through a Python wrapper, so this is off unless asked for,
+# independently of DEBUG.
+CDR_PROFILE_QUERIES = False
+
+# Allow profiling a single request with ?profile=1 (returns cProfile output
+# instead of the page). Anyone who can reach the site can use it.
+CDR_PROFILING_ENABLED = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'cdr_app': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Voice activity detection in front of the speech model: a frame is speech
+# when it is CDR_VAD_MARGIN_DB above the noise floor, louder than
+# CDR_VAD_MIN_DB (dBFS) and less spectrally flat than CDR_VAD_MAX_FLATNESS.
+CDR_VAD_ENABLED = True
+CDR_VAD_MARGIN_DB = 10.0
+CDR_VAD_MIN_DB = -50.0
+CDR_VAD_MAX_FLATNESS = 0.5
+CDR_VAD_HANGOVER_SECONDS = 0.3
+
+# Transcripts and enrichment results cached per recording (by content hash);
+# the least recently used entries beyond this many are evicted.
+CDR_AUDIO_CACHE_MAX_ENTRIES = 10000
+
+# Caller-callee graph (cdr_app.graph)
+# Country code given to numbers written without one.
+CDR_DEFAULT_COUNTRY_CODE = '1'
+# Days of calls ring detection and the enrichment signal look at.
+CDR_GRAPH_WINDOW_DAYS = 30
+# Distinct numbers called in the window at which the fan-out signal is full.
+CDR_GRAPH_MIN_FAN_OUT = 50
+# Enrichment marks calls as suspect when their caller's graph score reaches
+# this (0-1). None turns the graph signal off.
+CDR_GRAPH_SUSPECT_SCORE = 0.8
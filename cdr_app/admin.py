@@ -1,4 +1,8 @@
 from django.contrib import admin
-from .models import CallDetailRecord
+from .models import AudioAnalysis, CallDetailRecord, EnrichmentJob, IngestionRun, ReenrichmentCursor
 
-admin.site.register(CallDetailRecord)
\ No newline at end of file
+admin.site.register(CallDetailRecord)
+admin.site.register(EnrichmentJob)
+admin.site.register(IngestionRun)
+admin.site.register(AudioAnalysis)
+admin.site.register(ReenrichmentCursor)
@@ -0,0 +1,150 @@
+import operator
+from collections import Counter, defaultdict
+from datetime import timedelta, timezone as dt_timezone
+from functools import reduce
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+
+from .models import CallDetailRecord, CallRollup
+
+TRUNCATE = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+
+
+def _columns(rows, type_rows):
+    return {
+        'buckets': [row['bucket'].isoformat() for row in rows],
+        'counts': [row['counts'] for row in rows],
+        'avg_duration': [round(row['avg_duration'], 1) if row['avg_duration'] is not None else None for row in rows],
+        'call_types': [row['call_type'] for row in type_rows],
+        'call_type_counts': [row['counts'] for row in type_rows],
+    }
+
+
+def _bucket_start(value, rollup_granularity):
+    value = value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if rollup_granularity == 'day' else value
+
+
+def _from_rollups(granularity, start, end, call_types):
+    # Hourly series come from the hour rollups; daily and weekly ones from
+    # the day rollups. Only buckets wholly inside the range are read from the
+    # rollups; the calls in a partly covered bucket at either end are counted
+    # from the records, so both bounds are exact.
+    rollup_granularity = 'hour' if granularity == 'hour' else 'day'
+    step = timedelta(hours=1) if rollup_granularity == 'hour' else timedelta(days=1)
+    rollups = CallRollup.objects.filter(granularity=rollup_granularity).exclude(call_count=0)
+    edges = []
+    inner_start = inner_end = None
+    if start:
+        inner_start = _bucket_start(start, rollup_granularity)
+        if inner_start < start:
+            inner_start += step
+    if end:
+        inner_end = _bucket_start(end, rollup_granularity)
+    if start and end and inner_start >= inner_end:
+        # The range lies within one or two buckets, none of them whole.
+        rollups = rollups.none()
+        edges.append(Q(call_start_time__gte=start, call_start_time__lt=end))
+    else:
+        if start:
+            rollups = rollups.filter(bucket__gte=inner_start)
+            if start < inner_start:
+                edges.append(Q(call_start_time__gte=start, call_start_time__lt=inner_start))
+        if end:
+            rollups = rollups.filter(bucket__lt=inner_end)
+            if inner_end < end:
+                edges.append(Q(call_start_time__gte=inner_end, call_start_time__lt=end))
+    if call_types:
+        rollups = rollups.filter(call_type__in=call_types)
+
+    if granularity == 'week':
+        rollups = rollups.annotate(period=TruncWeek('bucket', tzinfo=dt_timezone.utc))
+    else:
+        rollups = rollups.annotate(period=F('bucket'))
+    periods = defaultdict(lambda: [0, 0])
+    for row in rollups.values('period').annotate(counts=Sum('call_count'), duration=Sum('total_duration')):
+        periods[row['period']][0] += row['counts']
+        periods[row['period']][1] += row['duration']
+    type_counts = Counter(dict(rollups.values_list('call_type').annotate(counts=Sum('call_count'))))
+
+    if edges:
+        cdrs = CallDetailRecord.objects.filter(reduce(operator.or_, edges))
+        if call_types:
+            cdrs = cdrs.filter(call_type__in=call_types)
+        duration = ExpressionWrapper(F('call_end_time') - F('call_start_time'), output_field=DurationField())
+        partial = (
+            cdrs.annotate(period=TRUNCATE[granularity]('call_start_time', tzinfo=dt_timezone.utc))
+            .values('period')
+            .annotate(counts=Count('id'), duration=Sum(duration))
+        )
+        for row in partial:
+            periods[row['period']][0] += row['counts']
+            periods[row['period']][1] += row['duration'].total_seconds() if row['duration'] else 0
+        type_counts.update(dict(cdrs.values_list('call_type').annotate(counts=Count('id'))))
+
+    rows = [
+        {'bucket': period, 'counts': counts, 'avg_duration': duration / counts}
+        for period, (counts, duration) in sorted(periods.items())
+    ]
+    type_rows = [
+        {'call_type': call_type, 'counts': counts} for call_type, counts in type_counts.most_common()
+    ]
+    return _columns(rows, type_rows)
+
+
+def _from_records(granularity, start, end, call_types, suspect, sentiment, number):
+    cdrs = CallDetailRecord.objects.all()
+    if start:
+        cdrs = cdrs.filter(call_start_time__gte=start)
+    if end:
+        cdrs = cdrs.filter(call_start_time__lt=end)
+    if call_types:
+        cdrs = cdrs.filter(call_type__in=call_types)
+    if suspect is not None:
+        cdrs = cdrs.filter(is_suspect=suspect)
+    if sentiment:
+        cdrs = cdrs.filter(sentiment_label__iexact=sentiment)
+    if number:
+        cdrs = cdrs.filter(Q(caller_number__icontains=number) | Q(callee_number__icontains=number))
+
+    duration = ExpressionWrapper(F('call_end_time') - F('call_start_time'), output_field=DurationField())
+    series = (
+        cdrs.annotate(bucket=TRUNCATE[granularity]('call_start_time', tzinfo=dt_timezone.utc))
+        .values('bucket')
+        .annotate(counts=Count('id'), avg=Avg(duration))
+        .order_by('bucket')
+    )
+    rows = [
+        {
+            'bucket': row['bucket'],
+            'counts': row['counts'],
+            'avg_duration': row['avg'].total_seconds() if row['avg'] is not None else None,
+        }
+        for row in series
+    ]
+    type_rows = cdrs.values('call_type').annotate(counts=Count('id')).order_by('-counts')
+    return _columns(rows, type_rows)
+
+
+def aggregate_calls(granularity='day', start=None, end=None, call_types=None, suspect=None, sentiment=None,
+                    number=None):
+    """Call counts and average duration per time bucket, plus the call type
+    distribution, as columnar lists ready to be plotted.
+
+    Filters on suspect flag, sentiment or number need the records
+    themselves and are aggregated in the database from the CDR table;
+    everything else is answered from the rollup tables.
+    """
+    if granularity not in TRUNCATE:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    if suspect is None and not sentiment and not number:
+        data = _from_rollups(granularity, start, end, call_types)
+    else:
+        data = _from_records(granularity, start, end, call_types, suspect, sentiment, number)
+    data['granularity'] = granularity
+    return data
@@ -1,6 +1,26 @@
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CdrAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cdr_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        warm_models = getattr(settings, 'CDR_WARM_MODELS', [])
+        if warm_models:
+            from .model_registry import get_registry
+
+            # Warm in the background so the worker can start accepting
+            # requests; the first request for a model still loading waits on
+            # the registry's per-model lock instead of loading it again.
+            threading.Thread(
+                target=get_registry().warm,
+                args=(warm_models,),
+                name='cdr-model-warmup',
+                daemon=True,
+            ).start()
@@ -0,0 +1,108 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .metrics import AUDIO_CACHE_REQUESTS
+from .model_registry import model_id
+from .models import AudioAnalysis
+from .transcription import transcribe_file
+
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def record_request(cache, hit):
+    """Count a lookup of the ``transcript`` or ``enrichment`` cache."""
+    AUDIO_CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def stats():
+    # Lookups are counted per process, in the cdr_audio_cache_requests_total
+    # metric.
+    return {
+        'entries': AudioAnalysis.objects.count(),
+        'max_entries': _max_entries(),
+        'transcript_hits': AUDIO_CACHE_REQUESTS.value(cache='transcript', result='hit'),
+        'transcript_misses': AUDIO_CACHE_REQUESTS.value(cache='transcript', result='miss'),
+        'enrichment_hits': AUDIO_CACHE_REQUESTS.value(cache='enrichment', result='hit'),
+        'enrichment_misses': AUDIO_CACHE_REQUESTS.value(cache='enrichment', result='miss'),
+    }
+
+
+def _max_entries():
+    return getattr(settings, 'CDR_AUDIO_CACHE_MAX_ENTRIES', 10000)
+
+
+def hash_audio(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as audio_file:
+        for block in iter(lambda: audio_file.read(HASH_BLOCK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def asr_model():
+    return model_id("automatic-speech-recognition")
+
+
+def enrichment_key(suspect_labels):
+    """Identify the models (and zero-shot labels) behind the derived fields."""
+    parts = [
+        model_id("sentiment-analysis"),
+        model_id("summarization"),
+        model_id("zero-shot-classification"),
+        *suspect_labels,
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def lookup(audio_hash, model_name=None):
+    """Return the cached analysis of ``audio_hash``, or ``None``."""
+    entry = AudioAnalysis.objects.filter(audio_hash=audio_hash, model_name=model_name or asr_model()).first()
+    record_request('transcript', entry is not None)
+    if entry is not None:
+        AudioAnalysis.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return entry
+
+
+def store_transcript(audio_hash, transcript, speech_ratio, model_name=None):
+    entry, created = AudioAnalysis.objects.update_or_create(
+        audio_hash=audio_hash,
+        model_name=model_name or asr_model(),
+        defaults={'transcript': transcript, 'speech_ratio': speech_ratio},
+    )
+    if created:
+        evict()
+    return entry
+
+
+def store_enrichment(entries, key):
+    """Save the enrichment fields already set on ``entries`` under ``key``."""
+    for entry in entries:
+        entry.enrichment_key = key
+    AudioAnalysis.objects.bulk_update(
+        entries, ['enrichment_key', 'sentiment_label', 'sentiment_score', 'summary', 'is_suspect'],
+    )
+
+
+def evict(max_entries=None):
+    """Drop the least recently used entries beyond ``max_entries``."""
+    max_entries = _max_entries() if max_entries is None else max_entries
+    stale = AudioAnalysis.objects.order_by('-last_used_at', '-id').values_list('id', flat=True)[max_entries:]
+    stale_ids = list(stale)
+    if stale_ids:
+        AudioAnalysis.objects.filter(id__in=stale_ids).delete()
+    return len(stale_ids)
+
+
+def transcribe_cached(path):
+    """Transcribe the recording at ``path`` unless the same audio was
+    transcribed with the current speech model before. Returns the cache
+    entry and whether it was a hit."""
+    audio_hash = hash_audio(path)
+    entry = lookup(audio_hash)
+    if entry is not None:
+        return entry, True
+    result = transcribe_file(path)
+    return store_transcript(audio_hash, result.text, result.speech_ratio), False
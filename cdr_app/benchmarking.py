@@ -0,0 +1,208 @@
+import io
+import math
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .caching import invalidate_cached_data
+from .models import CallDetailRecord
+
+# Options of the load-test generator (scripts/generate_csv.py) for seeded
+# and uploaded records. Record indexes are zero-padded to a fixed width so
+# call ids stay unique however the seeding is split up.
+SYNTHETIC_OPTIONS = {
+    'subscribers': 200_000,
+    'zipf': 0.8,
+    'fraud': 0.01,
+    'fraud_callers': 50,
+    'notes': 0.5,
+    'start': '2024-01-01',
+    'days': 365,
+    'id_width': 10,
+}
+# Columns written by seed_records; the remaining ones are nullable.
+SEED_COLUMNS = (
+    'call_id', 'caller_number', 'callee_number', 'call_start_time', 'call_end_time', 'call_type',
+    'call_notes', 'is_suspect', 'suspect_reason', 'enrichment_status',
+)
+
+
+@contextmanager
+def benchmark_database(keepdb=False, verbosity=0):
+    """Run the block against a throwaway copy of the default database
+    (``test_<NAME>``), created and migrated like the test runner does."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, keepdb=keepdb, serialize=False,
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity, keepdb)
+
+
+def median_seconds(func, repeat=5, warmup=1):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (``pct`` in 0-100)."""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance between two transcripts, relative to the
+    length of ``reference``."""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref) if ref else float(bool(hyp))
+
+
+def token_f1(reference, hypothesis):
+    """Unigram overlap F1 between two texts (ROUGE-1 style)."""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    if not ref or not hyp:
+        return float(ref == hyp)
+    ref_counts = {}
+    for word in ref:
+        ref_counts[word] = ref_counts.get(word, 0) + 1
+    overlap = 0
+    for word in hyp:
+        if ref_counts.get(word):
+            ref_counts[word] -= 1
+            overlap += 1
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / len(hyp), overlap / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+
+def scaling_exponent(sizes, timings):
+    """Least-squares slope of log(time) against log(size): ~1 means linear
+    growth, values well below 1 mean sublinear."""
+    if len(sizes) < 2:
+        return float('nan')
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(timing, 1e-9)) for timing in timings]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+
+def run_inference_task(task, pipe, notes, recording, batch_size):
+    """Run one task over ``notes`` (or, for speech recognition, over
+    ``recording``). Returns the outputs, the number of items (texts, or
+    seconds of audio) and the elapsed seconds."""
+    from . import inference
+    from .transcription import iter_audio_blocks, transcribe_blocks
+
+    started = time.perf_counter()
+    if task == 'automatic-speech-recognition':
+        result = transcribe_blocks(iter_audio_blocks(recording), pipe)
+        return result.text, result.audio_seconds, time.perf_counter() - started
+    if task == 'sentiment-analysis':
+        outputs = inference.analyze_sentiment_batch(notes, batch_size, pipe=pipe)
+    elif task == 'summarization':
+        outputs = inference.summarize_text_batch(notes, batch_size, pipe=pipe)
+    else:
+        results = inference._run_batched(pipe, notes, batch_size, candidate_labels=inference.SUSPECT_LABELS)
+        outputs = [result['labels'][0] for result in results]
+    return outputs, len(notes), time.perf_counter() - started
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return ``(result, baseline value, relative change)`` for every result
+    more than ``tolerance`` (a fraction) worse than the matching baseline
+    entry. Entries are matched on name and row count."""
+    previous = {(entry['name'], entry['rows']): entry['value'] for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry['name'], entry['rows']))
+        if not before:
+            continue
+        change = (entry['value'] - before) / before
+        if entry['better'] == 'higher':
+            change = -change
+        if change > tolerance:
+            regressions.append((entry, before, change))
+    return regressions
+
+
+def synthetic_blocks(start, count, seed=0, block_size=100_000):
+    """Yield DataFrames of ``count`` synthetic records numbered from
+    ``start``, built a block at a time by the load-test generator."""
+    import numpy as np
+    import pandas as pd
+
+    from scripts.generate_csv import generate_block
+
+    options = dict(SYNTHETIC_OPTIONS, start=pd.Timestamp(SYNTHETIC_OPTIONS['start']))
+    rng = np.random.default_rng([seed, start])
+    for offset in range(0, count, block_size):
+        yield generate_block(rng, start + offset + 1, min(block_size, count - offset), options)
+
+
+def write_synthetic_csv(path, start, count, seed=0):
+    """Write ``count`` synthetic records as an ingestible CSV file."""
+    from .ingest import CSV_COLUMNS
+
+    for offset, block in enumerate(synthetic_blocks(start, count, seed)):
+        for column in ('call_start_time', 'call_end_time'):
+            block[column] = block[column].dt.strftime('%Y-%m-%dT%H:%M:%S+00:00')
+        block.to_csv(path, columns=CSV_COLUMNS, mode='a' if offset else 'w', header=not offset, index=False)
+
+
+def _copy_block(cursor, table, frame):
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(SEED_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _insert_block(cursor, table, frame):
+    placeholders = ', '.join(['%s'] * len(SEED_COLUMNS))
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(SEED_COLUMNS)}) VALUES ({placeholders})",
+        list(frame.itertuples(index=False, name=None)),
+    )
+
+
+def seed_records(start, count, seed=0, block_size=100_000):
+    """Insert ``count`` enriched synthetic records numbered from ``start``.
+
+    Rows go straight from the generator's DataFrames to the database, with
+    COPY on PostgreSQL and a single executemany per block elsewhere; no
+    model instances are built. The rollups are not updated.
+    """
+    table = CallDetailRecord._meta.db_table
+    load = _copy_block if connection.vendor == 'postgresql' else _insert_block
+    with connection.cursor() as cursor:
+        for block in synthetic_blocks(start, count, seed, block_size):
+            block = block.assign(
+                call_start_time=block['call_start_time'].dt.to_pydatetime(),
+                call_end_time=block['call_end_time'].dt.to_pydatetime(),
+                call_notes=block['call_notes'].where(block['call_notes'] != '', None),
+                is_suspect=False,
+                suspect_reason='',
+                enrichment_status='done',
+            )
+            load(cursor, table, block[list(SEED_COLUMNS)])
+    invalidate_cached_data()
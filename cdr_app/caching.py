@@ -0,0 +1,91 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import CACHE_REQUESTS
+
+# Every cached view result is keyed by this version, so bumping it retires
+# all of them at once. It is bumped whenever CDR data is written.
+DATA_VERSION_KEY = 'cdr:data-version'
+
+
+class CacheCounters:
+    """Hit and miss counts for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+view_counters = defaultdict(CacheCounters)
+
+
+def data_version():
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        # Seed from the clock rather than 1 so a version lost to a cache clear
+        # can never come back and revive entries cached under it.
+        cache.add(DATA_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    try:
+        cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        cache.add(DATA_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_cached_data():
+    """Retire cached view results once the current transaction commits (or
+    right away outside a transaction)."""
+    transaction.on_commit(bump_data_version)
+
+
+def cache_key(name, params):
+    digest = hashlib.sha256(repr(sorted(params.items())).encode('utf-8')).hexdigest()
+    return f"cdr:{name}:{data_version()}:{digest}"
+
+
+def cached_result(name, params, compute):
+    """Return ``compute()`` for view ``name`` and request ``params``, from the
+    cache while no CDR data has been written since it was stored.
+
+    Cache view data rather than rendered responses: pages carry per-user
+    CSRF tokens and flash messages.
+    """
+    key = cache_key(name, params)
+    value = cache.get(key)
+    view_counters[name].record(value is not None)
+    CACHE_REQUESTS.inc(view=name, result='hit' if value is not None else 'miss')
+    if value is None:
+        value = compute()
+        timeout = getattr(settings, 'CDR_CACHE_TIMEOUTS', {}).get(name, 60)
+        cache.set(key, value, timeout)
+    return value
+
+
+def stats():
+    return {
+        name: {'hits': counters.hits, 'misses': counters.misses, 'hit_ratio': round(counters.hit_ratio, 4)}
+        for name, counters in view_counters.items()
+    }
@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .filters import filter_cdrs
+from .models import CallDetailRecord
+
+EXPORT_COLUMNS = (
+    'call_id', 'caller_number', 'callee_number', 'call_start_time', 'call_end_time', 'call_type',
+    'call_notes', 'sentiment_label', 'sentiment_score', 'summary', 'is_suspect', 'speech_ratio',
+)
+STREAM_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _chunk_size(chunk_size=None):
+    return chunk_size or getattr(settings, 'CDR_EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_rows(filters, ordering=('id',), chunk_size=None):
+    """Yield filtered records as tuples of ``EXPORT_COLUMNS``.
+
+    ``iterator()`` reads through a server-side cursor on PostgreSQL, so only
+    ``chunk_size`` rows are held in memory however many are exported.
+    """
+    queryset = filter_cdrs(CallDetailRecord.objects.all(), **filters).order_by(*ordering)
+    return queryset.values_list(*EXPORT_COLUMNS).iterator(chunk_size=_chunk_size(chunk_size))
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(rows, batch_size=500):
+    """Encode rows as CSV text, a few hundred rows per yielded string."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in _batched(rows, batch_size):
+        writer.writerows(
+            [value.isoformat() if hasattr(value, 'isoformat') else value for value in row] for row in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows, batch_size=500):
+    """Encode rows as newline-delimited JSON objects."""
+    for batch in _batched(rows, batch_size):
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), cls=DjangoJSONEncoder) + '\n' for row in batch)
+
+
+ENCODERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('call_id', pa.string()),
+        ('caller_number', pa.string()),
+        ('callee_number', pa.string()),
+        ('call_start_time', pa.timestamp('us', tz='UTC')),
+        ('call_end_time', pa.timestamp('us', tz='UTC')),
+        ('call_type', pa.string()),
+        ('call_notes', pa.string()),
+        ('sentiment_label', pa.string()),
+        ('sentiment_score', pa.float64()),
+        ('summary', pa.string()),
+        ('is_suspect', pa.bool_()),
+        ('speech_ratio', pa.float64()),
+    ])
+
+
+def write_parquet(filters, directory, chunk_size=None):
+    """Write filtered records to ``directory/date=YYYY-MM-DD/part-0.parquet``
+    (Hive-style partitions by call start date, UTC). Returns the row count.
+
+    Records are read in start time order, so each date's rows arrive
+    together: one partition file is open at a time and each chunk becomes
+    a row group, keeping memory flat.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    chunk_size = _chunk_size(chunk_size)
+    rows = export_rows(filters, ordering=('call_start_time', 'id'), chunk_size=chunk_size)
+    writer, current_date, count = None, None, 0
+
+    def flush(batch):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type)
+                                                 for column, field in zip(columns, schema)], schema=schema))
+
+    try:
+        batch = []
+        for row in rows:
+            date = row[3].date().isoformat()
+            if date != current_date:
+                if batch:
+                    flush(batch)
+                    batch = []
+                if writer:
+                    writer.close()
+                partition = os.path.join(directory, f"date={date}")
+                os.makedirs(partition, exist_ok=True)
+                writer = pq.ParquetWriter(os.path.join(partition, 'part-0.parquet'), schema)
+                current_date = date
+            batch.append(row)
+            count += 1
+            if len(batch) >= chunk_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        if writer:
+            writer.close()
+    return count
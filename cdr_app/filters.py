@@ -0,0 +1,66 @@
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .search import search_cdrs
+from .utils import parse_keywords, suspect_keywords_q
+
+
+def parse_timestamp(value):
+    """Parse an ISO date or datetime; naive values are taken as UTC."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value!r}")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def parse_flag(value):
+    return {'true': True, 'false': False}.get(value)
+
+
+def filter_cdrs(queryset, q=None, suspect_keywords=(), start=None, end=None, suspect=None, sentiment=None):
+    """Apply the record filters shared by the list view and the exports.
+
+    ``q`` is a search query (and annotates ``rank``), ``suspect_keywords``
+    keep records whose notes mention any of them, ``start``/``end`` bound
+    the call start time (end exclusive), ``suspect`` is the AI suspect flag
+    and ``sentiment`` a sentiment label.
+    """
+    if q:
+        queryset = search_cdrs(queryset, q)
+    if suspect_keywords:
+        queryset = queryset.filter(suspect_keywords_q(suspect_keywords))
+    if start:
+        queryset = queryset.filter(call_start_time__gte=start)
+    if end:
+        queryset = queryset.filter(call_start_time__lt=end)
+    if suspect is not None:
+        # Suspect flags are written by the enrichment workers; filters only
+        # read them.
+        queryset = queryset.filter(is_suspect=suspect)
+    if sentiment:
+        queryset = queryset.filter(sentiment_label__iexact=sentiment)
+    return queryset
+
+
+def filters_from_query(params):
+    """Read the shared filters from request GET parameters."""
+    suspect = parse_flag(params.get('suspect'))
+    if suspect is None and params.get('use_ai_filter') == 'true':
+        suspect = True
+    return {
+        'q': params.get('q', ''),
+        'suspect_keywords': tuple(parse_keywords(params.getlist('suspect_keywords', []))),
+        'start': parse_timestamp(params.get('start')),
+        'end': parse_timestamp(params.get('end')),
+        'suspect': suspect,
+        'sentiment': params.get('sentiment', ''),
+    }
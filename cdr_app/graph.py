@@ -0,0 +1,182 @@
+import re
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Count, Exists, Max, OuterRef, Q, Sum
+
+from .models import CallEdge
+
+# Extensions ("x123", "ext. 123", "#123") are not part of the number.
+EXTENSION_RE = re.compile(r'(?:x|ext\.?|#)\s*\d*\s*$', re.IGNORECASE)
+
+
+def _country_code():
+    return getattr(settings, 'CDR_DEFAULT_COUNTRY_CODE', '1')
+
+
+@lru_cache(maxsize=100000)
+def _normalize(value, country_code):
+    value = EXTENSION_RE.sub('', value).strip()
+    digits = re.sub(r'\D', '', value)
+    if not digits:
+        return ''
+    if value.startswith('+'):
+        return '+' + digits
+    if digits.startswith('00'):
+        return '+' + digits[2:]
+    if country_code == '1' and len(digits) == 11 and digits.startswith('1'):
+        return '+' + digits
+    # A leading 0 is a national trunk prefix.
+    return '+' + country_code + digits.lstrip('0')
+
+
+def normalize_number(value):
+    """Canonical ``+<country code><number>`` form of a phone number, so that
+    '(212) 555-0100', '212.555.0100 x12' and '001 212 555 0100' are the same
+    node. Numbers without a country code get ``CDR_DEFAULT_COUNTRY_CODE``.
+    Returns '' when there are no digits."""
+    return _normalize(str(value), _country_code()) if value else ''
+
+
+def _day_filter(start=None, end=None):
+    window = Q(call_count__gt=0)
+    if start:
+        window &= Q(day__gte=start)
+    if end:
+        window &= Q(day__lte=end)
+    return window
+
+
+def default_window(end=None):
+    """The last ``CDR_GRAPH_WINDOW_DAYS`` days up to ``end`` (by default the
+    latest day with calls)."""
+    end = end or CallEdge.objects.aggregate(day=Max('day'))['day']
+    if end is None:
+        return None, None
+    return end - timedelta(days=getattr(settings, 'CDR_GRAPH_WINDOW_DAYS', 30) - 1), end
+
+
+def suspect_score(fan_out, fan_in, reciprocal):
+    """0-1 score for calling many distinct numbers (saturating at
+    ``CDR_GRAPH_MIN_FAN_OUT``), of which few call back, while few numbers
+    call in. Busy ordinary numbers are called about as much as they call
+    and score low."""
+    if not fan_out:
+        return 0.0
+    spread = min(fan_out / getattr(settings, 'CDR_GRAPH_MIN_FAN_OUT', 50), 1.0)
+    return spread * (1 - reciprocal / fan_out) * (fan_out / (fan_out + fan_in))
+
+
+def number_profile(number, start=None, end=None, limit=20):
+    """Fan-out, fan-in, reciprocity and top counterparties of ``number``
+    between the ``start`` and ``end`` dates. Reads only the number's own
+    edges, so the cost grows with its degree, not with the table."""
+    number = normalize_number(number)
+    window = _day_filter(start, end)
+    outgoing = dict(
+        CallEdge.objects.filter(window, caller=number).values('callee')
+        .annotate(calls=Sum('call_count')).values_list('callee', 'calls')
+    )
+    incoming = dict(
+        CallEdge.objects.filter(window, callee=number).values('caller')
+        .annotate(calls=Sum('call_count')).values_list('caller', 'calls')
+    )
+    reciprocal = len(outgoing.keys() & incoming.keys())
+
+    def top(counts):
+        return [
+            {'number': other, 'calls': calls}
+            for other, calls in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        ]
+
+    return {
+        'number': number,
+        'fan_out': len(outgoing),
+        'fan_in': len(incoming),
+        'calls_out': sum(outgoing.values()),
+        'calls_in': sum(incoming.values()),
+        'reciprocity': reciprocal / len(outgoing) if outgoing else 0.0,
+        'suspect_score': suspect_score(len(outgoing), len(incoming), reciprocal),
+        'top_callees': top(outgoing),
+        'top_callers': top(incoming),
+    }
+
+
+def suspect_scores(numbers, start=None, end=None):
+    """``suspect_score`` of each of ``numbers`` (normalized), in two grouped
+    queries however many numbers are asked for."""
+    numbers = {normalize_number(number) for number in numbers} - {''}
+    if not numbers:
+        return {}
+    window = _day_filter(start, end)
+    called_back = CallEdge.objects.filter(window, caller=OuterRef('callee'), callee=OuterRef('caller'))
+    outgoing = (
+        CallEdge.objects.filter(window, caller__in=numbers)
+        .annotate(called_back=Exists(called_back))
+        .values('caller')
+        .annotate(
+            fan_out=Count('callee', distinct=True),
+            reciprocal=Count('callee', distinct=True, filter=Q(called_back=True)),
+        )
+    )
+    fan_in = dict(
+        CallEdge.objects.filter(window, callee__in=numbers).values('callee')
+        .annotate(fan_in=Count('caller', distinct=True)).values_list('callee', 'fan_in')
+    )
+    return {
+        row['caller']: suspect_score(row['fan_out'], fan_in.get(row['caller'], 0), row['reciprocal'])
+        for row in outgoing
+    }
+
+
+def suspect_callers(cdrs):
+    """Normalized caller numbers of ``cdrs`` whose graph score, over the
+    ``CDR_GRAPH_WINDOW_DAYS`` before their calls, reaches
+    ``CDR_GRAPH_SUSPECT_SCORE``."""
+    threshold = getattr(settings, 'CDR_GRAPH_SUSPECT_SCORE', None)
+    days = [cdr.call_start_time.date() for cdr in cdrs if cdr.call_start_time]
+    if threshold is None or not days:
+        return set()
+    start, _ = default_window(min(days))
+    scores = suspect_scores({cdr.caller_number for cdr in cdrs}, start, max(days))
+    return {number for number, score in scores.items() if score >= threshold}
+
+
+def find_rings(start=None, end=None, min_size=3, max_size=50):
+    """Groups of ``min_size`` to ``max_size`` numbers connected by calls in
+    both directions between the ``start`` and ``end`` dates: the connected
+    components of the reciprocal call graph, largest call volume first."""
+    import numpy as np
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    edges = list(
+        CallEdge.objects.filter(_day_filter(start, end)).values('caller', 'callee')
+        .annotate(calls=Sum('call_count')).values_list('caller', 'callee', 'calls')
+    )
+    if not edges:
+        return []
+    callers, callees, calls = zip(*edges)
+    numbers, index = np.unique(np.array(callers + callees), return_inverse=True)
+    size = len(numbers)
+    adjacency = coo_matrix(
+        (np.array(calls, dtype=np.int64), (index[:len(edges)], index[len(edges):])), shape=(size, size),
+    ).tocsr()
+    # Non-zero only where both directions have calls.
+    mutual = adjacency.minimum(adjacency.T)
+    count, labels = connected_components(mutual, directed=False)
+    sizes = np.bincount(labels, minlength=count)
+    order = np.argsort(labels, kind='stable')
+    boundaries = np.concatenate(([0], np.cumsum(sizes)))
+
+    rings = []
+    for component in np.flatnonzero((sizes >= min_size) & (sizes <= max_size)):
+        members = order[boundaries[component]:boundaries[component + 1]]
+        rings.append({
+            'numbers': numbers[members].tolist(),
+            'size': len(members),
+            'calls': int(adjacency[members][:, members].sum()),
+        })
+    rings.sort(key=lambda ring: (-ring['calls'], ring['numbers']))
+    return rings
@@ -0,0 +1,315 @@
+# Model inference for CDR enrichment. Only imported where inference runs
+# (workers, commands), never by the list and dashboard views.
+import hashlib
+import logging
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from . import audio_cache
+from .graph import normalize_number, suspect_callers
+from .metrics import INFERENCE_ITEMS, INFERENCE_SECONDS
+from .model_registry import get_pipeline, model_id
+from .models import CallDetailRecord, SuspectClassification
+from .rollups import ROLLUP_FIELDS, record_changes, rollup_row
+
+logger = logging.getLogger(__name__)
+
+def _transcribe(file_path):
+    # Errors propagate so the enrichment job fails and is retried with
+    # backoff instead of storing a placeholder transcript.
+    with INFERENCE_SECONDS.time(stage='transcription'):
+        entry, cached = audio_cache.transcribe_cached(file_path)
+    INFERENCE_ITEMS.inc(stage='transcription')
+    logger.debug("Transcribed %s%s", file_path, " (cached)" if cached else "")
+    return entry
+
+def transcribe_audio(file_path):
+    try:
+        return _transcribe(file_path).transcript
+    except Exception:
+        logger.exception("Error transcribing %s", file_path)
+        return "No transcript available."
+
+SUSPECT_LABELS = ["suspect", "normal"]
+NO_TRANSCRIPTION = "No transcription available."
+
+def _has_text(text):
+    return isinstance(text, str) and bool(text.strip())
+
+def _batch_size(batch_size=None):
+    return batch_size or getattr(settings, 'CDR_INFERENCE_BATCH_SIZE', 16)
+
+def _length_sorted_batches(texts, batch_size):
+    # Group texts of similar length so each padded batch wastes as little
+    # compute on padding tokens as possible.
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        yield order[start:start + batch_size]
+
+def _run_batched(pipe, texts, batch_size, **kwargs):
+    """Run ``pipe`` over the non-empty entries of ``texts`` in length-sorted
+    batches and return its outputs in input order (``None`` for empty ones)."""
+    outputs = [None] * len(texts)
+    indices = [i for i, text in enumerate(texts) if _has_text(text)]
+    valid = [texts[i] for i in indices]
+    batch_size = _batch_size(batch_size)
+    for batch in _length_sorted_batches(valid, batch_size):
+        results = pipe([valid[i] for i in batch], batch_size=len(batch), **kwargs)
+        for i, result in zip(batch, results):
+            outputs[indices[i]] = result
+    return outputs
+
+def analyze_sentiment_batch(texts, batch_size=None, pipe=None):
+    sentiment_pipeline = pipe or get_pipeline("sentiment-analysis")
+    results = _run_batched(sentiment_pipeline, texts, batch_size, truncation=True)
+    return [(r['label'], r['score']) if r else ('N/A', 0.0) for r in results]
+
+def analyze_sentiment(text):
+    return analyze_sentiment_batch([text])[0]
+
+def _sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def classify_suspect_batch(texts, batch_size=None):
+    """Return whether each text is classified as suspect.
+
+    Results are cached in ``SuspectClassification`` by text hash, model and
+    label set; only texts without a cached result are run through the
+    model (in batches), so repeating a request is a single DB read.
+    """
+    model_name = model_id("zero-shot-classification")
+    labels_key = _sha256('\x1f'.join(SUSPECT_LABELS))
+    hashes = [_sha256(text) if _has_text(text) else None for text in texts]
+    cached = dict(
+        SuspectClassification.objects.filter(
+            model_name=model_name, labels_key=labels_key, text_hash__in={h for h in hashes if h},
+        ).values_list('text_hash', 'is_suspect')
+    )
+
+    misses = {}
+    for text, text_hash in zip(texts, hashes):
+        if text_hash and text_hash not in cached:
+            misses.setdefault(text_hash, text)
+    if misses:
+        classifier_pipeline = get_pipeline("zero-shot-classification")
+        results = _run_batched(classifier_pipeline, list(misses.values()), batch_size, candidate_labels=SUSPECT_LABELS)
+        classifications = [
+            SuspectClassification(
+                text_hash=text_hash,
+                model_name=model_name,
+                labels_key=labels_key,
+                label=result['labels'][0],
+                score=result['scores'][0],
+                is_suspect=result['labels'][0] == "suspect",
+            )
+            for text_hash, result in zip(misses, results)
+        ]
+        SuspectClassification.objects.bulk_create(classifications, ignore_conflicts=True)
+        cached.update((c.text_hash, c.is_suspect) for c in classifications)
+
+    return [bool(text_hash) and cached[text_hash] for text_hash in hashes]
+
+def suspect_reason(by_notes, by_calling_pattern):
+    if by_notes and by_calling_pattern:
+        return 'both'
+    if by_notes:
+        return 'notes'
+    return 'calling_pattern' if by_calling_pattern else ''
+
+def flag_suspect_calls_with_ai(cdrs, batch_size=None):
+    cdrs = list(cdrs)
+    flags = classify_suspect_batch([cdr.call_notes for cdr in cdrs], batch_size)
+    suspect_calls = []
+    old_rows = []
+    for cdr, is_suspect in zip(cdrs, flags):
+        if is_suspect:
+            old_rows.append(rollup_row(cdr))
+            cdr.is_suspect = True
+            cdr.suspect_reason = suspect_reason(True, cdr.suspect_reason in ('calling_pattern', 'both'))
+            suspect_calls.append(cdr)
+    with transaction.atomic():
+        CallDetailRecord.objects.bulk_update(suspect_calls, ['is_suspect', 'suspect_reason'], batch_size=500)
+        record_changes(old_rows, [rollup_row(cdr) for cdr in suspect_calls])
+    return suspect_calls
+
+SUMMARY_MAX_TOKENS = 130
+SUMMARY_MIN_TOKENS = 30
+
+def _summary_chunk_tokens(tokenizer):
+    # Longest input the model takes, less its special tokens and a margin
+    # for text that re-tokenizes slightly longer after decoding. Chunks must
+    # be well above the summary length for the reduce rounds to shrink.
+    limit = getattr(settings, 'CDR_SUMMARY_CHUNK_TOKENS', None)
+    if not limit:
+        limit = min(tokenizer.model_max_length, 1024) - tokenizer.num_special_tokens_to_add() - 8
+    return max(limit, 2 * SUMMARY_MAX_TOKENS)
+
+def _token_chunks(tokenizer, texts, limit):
+    """Split each text into pieces of at most ``limit`` tokens. Returns the
+    pieces and the index of the text each one came from."""
+    owners, chunks = [], []
+    encoded = tokenizer(texts, add_special_tokens=False, verbose=False)['input_ids']
+    for i, ids in enumerate(encoded):
+        for start in range(0, max(len(ids), 1), limit):
+            owners.append(i)
+            chunks.append(ids[start:start + limit])
+    return owners, tokenizer.batch_decode(chunks, skip_special_tokens=True)
+
+def summarize_text_batch(texts, batch_size=None, pipe=None):
+    """Summarize ``texts`` without truncating long ones.
+
+    Map-reduce: every text is split into chunks that fit the model, all
+    chunks are summarized together in batched passes, and texts that needed
+    more than one chunk have their chunk summaries joined and summarized
+    again until a single chunk remains. Work grows linearly with length.
+    """
+    summarization_pipeline = pipe or get_pipeline("summarization")
+    tokenizer = summarization_pipeline.tokenizer
+    limit = _summary_chunk_tokens(tokenizer)
+    summaries = [NO_TRANSCRIPTION] * len(texts)
+    pending = {i: text for i, text in enumerate(texts) if _has_text(text)}
+    while pending:
+        indices = list(pending)
+        owners, chunks = _token_chunks(tokenizer, list(pending.values()), limit)
+        results = _run_batched(
+            summarization_pipeline, chunks, batch_size,
+            max_length=SUMMARY_MAX_TOKENS, min_length=SUMMARY_MIN_TOKENS, do_sample=False, truncation=True,
+        )
+        parts = defaultdict(list)
+        for owner, result in zip(owners, results):
+            parts[indices[owner]].append(result['summary_text'] if result else '')
+        pending = {}
+        for i, chunk_summaries in parts.items():
+            if len(chunk_summaries) == 1:
+                summaries[i] = chunk_summaries[0] or NO_TRANSCRIPTION
+            else:
+                pending[i] = ' '.join(chunk_summaries)
+    return summaries
+
+def summarize_text(text):
+    return summarize_text_batch([text])[0]
+
+ENRICHMENT_FIELDS = [
+    'sentiment_label', 'sentiment_score', 'summary', 'is_suspect', 'suspect_reason',
+    'sentiment_model', 'summary_model', 'suspect_model',
+]
+# Only written for records transcribed by enrich_records whose notes are
+# unchanged since, so notes ingested while a job runs are never replaced.
+TRANSCRIPT_FIELDS = ['call_notes', 'speech_ratio', 'transcript_model']
+
+# Record field holding the model id of each pipeline task's output.
+MODEL_FIELDS = {
+    'automatic-speech-recognition': 'transcript_model',
+    'sentiment-analysis': 'sentiment_model',
+    'summarization': 'summary_model',
+    'zero-shot-classification': 'suspect_model',
+}
+
+def current_models():
+    return {field: model_id(task) for task, field in MODEL_FIELDS.items()}
+
+def enrich_records(cdrs, batch_size=None, only_stale=False):
+    """Transcribe, score, summarize and classify ``cdrs`` in batches and
+    write the results back with a single ``bulk_update``.
+
+    With ``only_stale`` transcripts from another speech model are redone,
+    and a stage skips records whose field for it already comes from the
+    current model unless their notes were just transcribed.
+    """
+    cdrs = list(cdrs)
+    models = current_models()
+    entries = {}
+    read_notes = {}
+    for i, cdr in enumerate(cdrs):
+        # A recording already found to hold no speech is not transcribed
+        # again; with only_stale, a transcript from another speech model is.
+        outdated = only_stale and cdr.transcript_model not in (None, models['transcript_model'])
+        if cdr.call_recording and (outdated or (not cdr.call_notes and cdr.speech_ratio is None)):
+            read_notes[cdr.id] = cdr.call_notes
+            entry = _transcribe(cdr.call_recording.path)
+            cdr.call_notes, cdr.speech_ratio = entry.transcript, entry.speech_ratio
+            cdr.transcript_model = entry.model_name
+            entries[i] = entry
+
+    # Records whose recording was analysed before with the same models take
+    # the cached results; only the rest go through inference.
+    key = audio_cache.enrichment_key(SUSPECT_LABELS)
+    pending = []
+    for i, cdr in enumerate(cdrs):
+        entry = entries.get(i)
+        hit = entry is not None and entry.enrichment_key == key
+        if entry is not None:
+            audio_cache.record_request('enrichment', hit)
+        if hit:
+            cdr.sentiment_label, cdr.sentiment_score = entry.sentiment_label, entry.sentiment_score
+            cdr.summary, cdr.is_suspect = entry.summary, entry.is_suspect
+        else:
+            pending.append(i)
+
+    stages = {
+        field: [i for i in pending if not only_stale or i in entries or getattr(cdrs[i], field) != models[field]]
+        for field in ('sentiment_model', 'summary_model', 'suspect_model')
+    }
+    with INFERENCE_SECONDS.time(stage='sentiment'):
+        sentiments = analyze_sentiment_batch([cdrs[i].call_notes for i in stages['sentiment_model']], batch_size)
+    with INFERENCE_SECONDS.time(stage='summarization'):
+        summaries = summarize_text_batch([cdrs[i].call_notes for i in stages['summary_model']], batch_size)
+    with INFERENCE_SECONDS.time(stage='suspect'):
+        suspect_flags = classify_suspect_batch([cdrs[i].call_notes for i in stages['suspect_model']], batch_size)
+    for stage, field in (('sentiment', 'sentiment_model'), ('summarization', 'summary_model'),
+                         ('suspect', 'suspect_model')):
+        INFERENCE_ITEMS.inc(len(stages[field]), stage=stage)
+    for i, (label, score) in zip(stages['sentiment_model'], sentiments):
+        cdrs[i].sentiment_label, cdrs[i].sentiment_score = label, score
+    for i, summary in zip(stages['summary_model'], summaries):
+        cdrs[i].summary = summary
+    # Records not classified again keep the notes flag of their last run.
+    for i in set(pending) - set(stages['suspect_model']):
+        cdrs[i].is_suspect = cdrs[i].suspect_reason in ('notes', 'both')
+    for i, is_suspect in zip(stages['suspect_model'], suspect_flags):
+        cdrs[i].is_suspect = is_suspect
+    analysed = []
+    for i in pending:
+        if i in entries:
+            cdr, entry = cdrs[i], entries[i]
+            entry.sentiment_label, entry.sentiment_score = cdr.sentiment_label, cdr.sentiment_score
+            entry.summary, entry.is_suspect = cdr.summary, cdr.is_suspect
+            analysed.append(entry)
+
+    # Calling patterns (many numbers called, few calling back) flag calls
+    # whose notes alone do not. The reason keeps the two signals apart, as
+    # suspect_model only describes the notes classifier.
+    flagged_callers = suspect_callers(cdrs)
+    for cdr in cdrs:
+        by_pattern = normalize_number(cdr.caller_number) in flagged_callers
+        cdr.suspect_reason = suspect_reason(cdr.is_suspect, by_pattern)
+        cdr.is_suspect = cdr.is_suspect or by_pattern
+
+    for cdr in cdrs:
+        cdr.sentiment_model = models['sentiment_model']
+        cdr.summary_model = models['summary_model']
+        cdr.suspect_model = models['suspect_model']
+
+    with transaction.atomic():
+        # The rows are read again under lock: ingestion may have changed or
+        # deleted them while inference ran, and the rollups must move from
+        # their current state.
+        current = {
+            row.pop('id'): row
+            for row in CallDetailRecord.objects.select_for_update()
+            .filter(id__in=[cdr.id for cdr in cdrs]).values('id', 'call_notes', *ROLLUP_FIELDS)
+        }
+        stored_notes = {cdr_id: row.pop('call_notes') for cdr_id, row in current.items()}
+        # A transcript only replaces the notes it was made to replace.
+        transcribed = [
+            cdrs[i] for i in entries
+            if cdrs[i].id in current and stored_notes[cdrs[i].id] == read_notes[cdrs[i].id]
+        ]
+        cdrs = [cdr for cdr in cdrs if cdr.id in current]
+        audio_cache.store_enrichment(analysed, key)
+        CallDetailRecord.objects.bulk_update(cdrs, ENRICHMENT_FIELDS, batch_size=500)
+        CallDetailRecord.objects.bulk_update(transcribed, TRANSCRIPT_FIELDS, batch_size=500)
+        record_changes(current.values(), [
+            dict(current[cdr.id], is_suspect=cdr.is_suspect, sentiment_label=cdr.sentiment_label) for cdr in cdrs
+        ])
+    return cdrs
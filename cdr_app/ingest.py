@@ -0,0 +1,336 @@
+import hashlib
+import io
+import logging
+import os
+import time
+import traceback
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .jobs import enqueue_enrichment
+from .metrics import INGEST_CHUNK_SECONDS, INGEST_ROWS
+from .models import CallDetailRecord, IngestionRun
+from .rollups import ROLLUP_FIELDS, record_changes, rollup_row
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = [
+    'call_id',
+    'caller_number',
+    'callee_number',
+    'call_start_time',
+    'call_end_time',
+    'call_type',
+    'call_notes',
+]
+UPSERT_FIELDS = [column for column in CSV_COLUMNS if column != 'call_id']
+
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024
+FINGERPRINT_SAMPLES = 16
+HASH_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+@dataclass
+class IngestResult:
+    rows: int = 0
+    skipped: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    resumed_from_row: int = 0
+    already_ingested: bool = False
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.already_ingested:
+            return "already ingested, skipped"
+        resumed = f", resumed after row {self.resumed_from_row}" if self.resumed_from_row else ""
+        return (
+            f"{self.rows} rows in {self.chunks} chunks, {self.skipped} skipped, "
+            f"{self.seconds:.1f}s ({self.rows_per_second:,.0f} rows/s){resumed}"
+        )
+
+
+def _parse_timestamps(values):
+    import pandas as pd
+
+    parsed = pd.to_datetime(values, errors='coerce', utc=True, format='ISO8601')
+    # Switch exports are ISO 8601, which parses in one vectorised pass; only
+    # values in other formats fall back to per-value format inference.
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors='coerce', utc=True, format='mixed')
+    return parsed
+
+
+def _chunk_to_records(df):
+    df = df.reindex(columns=CSV_COLUMNS)
+    # Timestamps are parsed for the whole chunk at once; naive values are
+    # taken to be UTC, which is also the project's TIME_ZONE.
+    starts = _parse_timestamps(df['call_start_time'])
+    ends = _parse_timestamps(df['call_end_time'])
+    valid = df['call_id'].notna() & starts.notna() & ends.notna()
+    df, starts, ends = df[valid], starts[valid], ends[valid]
+
+    # The same call may appear more than once in a chunk; an upsert can only
+    # touch each row once per statement, so keep the last occurrence.
+    keep = ~df['call_id'].duplicated(keep='last')
+    df, starts, ends = df[keep], starts[keep], ends[keep]
+
+    notes = df['call_notes'].astype(object).where(df['call_notes'].notna(), None)
+    records = [
+        CallDetailRecord(
+            call_id=call_id,
+            caller_number=caller_number,
+            callee_number=callee_number,
+            call_start_time=call_start_time,
+            call_end_time=call_end_time,
+            call_type=call_type,
+            call_notes=call_notes,
+        )
+        for call_id, caller_number, callee_number, call_start_time, call_end_time, call_type, call_notes in zip(
+            df['call_id'],
+            df['caller_number'].fillna(''),
+            df['callee_number'].fillna(''),
+            starts.dt.to_pydatetime(),
+            ends.dt.to_pydatetime(),
+            df['call_type'].fillna(''),
+            notes,
+        )
+    ]
+    return records, int((~valid).sum())
+
+
+def upsert_records(records):
+    """Insert or update ``records`` keyed on ``call_id`` in one statement and
+    return their primary keys. The dashboard rollups are moved from the
+    previous state of any updated records to the new one."""
+    existing = {
+        row.pop('call_id'): row
+        for row in CallDetailRecord.objects.filter(call_id__in=[record.call_id for record in records])
+        .values('call_id', *ROLLUP_FIELDS)
+    }
+    new_rows = []
+    for record in records:
+        row = rollup_row(record)
+        if record.call_id in existing:
+            # Enrichment results are not part of the upsert and carry over.
+            row['is_suspect'] = existing[record.call_id]['is_suspect']
+            row['sentiment_label'] = existing[record.call_id]['sentiment_label']
+        new_rows.append(row)
+    record_changes(existing.values(), new_rows)
+
+    CallDetailRecord.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=['call_id'],
+        update_fields=UPSERT_FIELDS,
+    )
+    if all(record.pk is not None for record in records):
+        return [record.pk for record in records]
+    # Backends that cannot return ids from an upsert need a lookup.
+    return list(
+        CallDetailRecord.objects.filter(call_id__in=[record.call_id for record in records])
+        .values_list('id', flat=True)
+    )
+
+
+def file_fingerprint(fh, size):
+    """Hash the file size and a fixed number of evenly spaced samples.
+
+    This reads the same amount of data whatever the file size, so the
+    earlier run of a file is found without reading all of it.
+    """
+    digest = hashlib.sha256(str(size).encode())
+    step = max(size // FINGERPRINT_SAMPLES, 1)
+    for offset in range(0, size, step)[:FINGERPRINT_SAMPLES]:
+        fh.seek(offset)
+        digest.update(fh.read(FINGERPRINT_SAMPLE_BYTES))
+    fh.seek(max(size - FINGERPRINT_SAMPLE_BYTES, 0))
+    digest.update(fh.read())
+    fh.seek(0)
+    return digest.hexdigest()
+
+
+def iter_raw_chunks(fh, chunk_size):
+    """Yield ``(data, end_offset, rows)`` for blocks of up to ``chunk_size``
+    CSV records read from the current position of the binary file ``fh``.
+
+    Blocks always end on a record boundary: a line break inside a quoted
+    field leaves an odd number of quote characters in the pending data.
+    """
+    lines = []
+    quotes = 0
+    rows = 0
+    while True:
+        line = fh.readline()
+        if not line:
+            break
+        lines.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2:
+            continue
+        rows += 1
+        if rows >= chunk_size:
+            yield b''.join(lines), fh.tell(), rows
+            lines, quotes, rows = [], 0, 0
+    if lines:
+        yield b''.join(lines), fh.tell(), rows
+
+
+def _read_chunk(header, data):
+    # pandas is only imported once a file is actually ingested.
+    import pandas as pd
+
+    return pd.read_csv(io.BytesIO(header + data), dtype=str, encoding='utf-8-sig')
+
+
+def _hash_prefix(fh, hasher, start, end):
+    fh.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = fh.read(min(HASH_BLOCK_BYTES, remaining))
+        if not block:
+            break
+        hasher.update(block)
+        remaining -= len(block)
+
+
+def _open_source(source):
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb'), os.path.basename(source)
+    return source, os.path.basename(getattr(source, 'name', '')) or 'upload.csv'
+
+
+def _content_hash(fh, size):
+    hasher = hashlib.sha256()
+    _hash_prefix(fh, hasher, 0, size)
+    fh.seek(0)
+    return hasher.hexdigest()
+
+
+def _reset_run(run, file_name):
+    run.file_name = file_name
+    run.byte_offset = 0
+    run.prefix_hash = ''
+    run.rows_committed = 0
+    run.chunks_committed = 0
+    run.content_hash = ''
+    run.completed_at = None
+
+
+def _start_run(fh, file_name, force):
+    # The sampled fingerprint only finds the earlier run of what may be the
+    # same file, in constant time. Skipping a completed run then reads the
+    # whole file once to compare its SHA-256 (hashing only, no parsing): a
+    # corrected export can differ from the original only between the
+    # samples, and skipping it would silently keep the old rows.
+    size = os.fstat(fh.fileno()).st_size
+    fingerprint = file_fingerprint(fh, size)
+    run, created = IngestionRun.objects.get_or_create(
+        fingerprint=fingerprint,
+        defaults={'file_name': file_name, 'file_size': size},
+    )
+    if created:
+        return run
+    if run.status == 'completed' and not force:
+        if _content_hash(fh, size) == run.content_hash:
+            return run
+        logger.info("%s matches the fingerprint of run %s but not its content; ingesting it again",
+                    file_name, run.pk)
+        force = True
+    if force:
+        _reset_run(run, file_name)
+    run.status = 'running'
+    run.save()
+    return run
+
+
+def ingest_csv(source, chunk_size=None, enrich=True, progress=None, force=False):
+    """Stream a CDR CSV file into the database ``chunk_size`` rows at a time.
+
+    Each chunk is upserted in a single statement and committed together with
+    the enrichment jobs for its rows and the ``IngestionRun`` checkpoint, so
+    re-submitting a file after a failure resumes after the last committed
+    chunk (if the bytes before it are unchanged) and a file whose full
+    content was ingested before is skipped; confirming a skip reads the file
+    once but parses nothing. ``force`` ingests the file again from the
+    start. ``progress`` is called with the running ``IngestResult`` after
+    every chunk.
+    """
+    chunk_size = chunk_size or getattr(settings, 'CDR_INGEST_CHUNK_SIZE', 5000)
+    result = IngestResult()
+    started = time.perf_counter()
+    fh, file_name = _open_source(source)
+    run = None
+    try:
+        run = _start_run(fh, file_name, force)
+        if run.status == 'completed':
+            result.already_ingested = True
+            logger.info("Skipping %s: already ingested by run %s", file_name, run.pk)
+            return result
+
+        header = fh.readline()
+        hasher = hashlib.sha256(header)
+        if run.byte_offset:
+            # The part committed by an earlier attempt is hashed again
+            # (without parsing it): the content hash covers the whole file,
+            # and the checkpoint's prefix hash confirms the offset still
+            # falls on the same record boundary of the same bytes.
+            _hash_prefix(fh, hasher, len(header), run.byte_offset)
+            if hasher.hexdigest() == run.prefix_hash:
+                fh.seek(run.byte_offset)
+                result.resumed_from_row = run.rows_committed
+                logger.info("Resuming %s at byte %s (row %s)", file_name, run.byte_offset, run.rows_committed)
+            else:
+                logger.info("%s differs from the part committed by run %s; ingesting it from the start",
+                            file_name, run.pk)
+                _reset_run(run, file_name)
+                run.save()
+                fh.seek(len(header))
+                hasher = hashlib.sha256(header)
+
+        for data, end_offset, rows in iter_raw_chunks(fh, chunk_size):
+            chunk_started = time.perf_counter()
+            hasher.update(data)
+            records, skipped = _chunk_to_records(_read_chunk(header, data))
+            with transaction.atomic():
+                ids = upsert_records(records) if records else []
+                if enrich:
+                    enqueue_enrichment(ids)
+                run.byte_offset = end_offset
+                run.prefix_hash = hasher.hexdigest()
+                run.rows_committed += rows
+                run.chunks_committed += 1
+                run.save(update_fields=[
+                    'byte_offset', 'prefix_hash', 'rows_committed', 'chunks_committed', 'updated_at',
+                ])
+            INGEST_ROWS.inc(len(records))
+            INGEST_CHUNK_SECONDS.observe(time.perf_counter() - chunk_started)
+            result.rows += len(records)
+            result.skipped += skipped
+            result.chunks += 1
+            result.seconds = time.perf_counter() - started
+            if progress:
+                progress(result)
+
+        run.status = 'completed'
+        run.content_hash = hasher.hexdigest()
+        run.completed_at = timezone.now()
+        run.last_error = ''
+        run.save()
+    except Exception:
+        if run is not None:
+            IngestionRun.objects.filter(pk=run.pk).update(status='failed', last_error=traceback.format_exc())
+        raise
+    finally:
+        if fh is not source:
+            fh.close()
+    result.seconds = time.perf_counter() - started
+    logger.info("Ingested %s: %s", file_name, result)
+    return result
@@ -0,0 +1,167 @@
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import CallDetailRecord, EnrichmentJob
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_enrichment(cdr_ids):
+    """Queue an enrichment job for each record that does not already have one
+    queued. Returns the number of jobs created.
+
+    A record whose job is already running gets a new one: the running job
+    may have read the record before the change that is being enqueued.
+    """
+    cdr_ids = set(cdr_ids)
+    if not cdr_ids:
+        return 0
+    already_queued = set(
+        EnrichmentJob.objects.filter(cdr_id__in=cdr_ids, status='queued')
+        .values_list('cdr_id', flat=True)
+    )
+    new_ids = sorted(cdr_ids - already_queued)
+    EnrichmentJob.objects.bulk_create(
+        [EnrichmentJob(cdr_id=cdr_id, max_attempts=_setting('CDR_JOB_MAX_ATTEMPTS', 5)) for cdr_id in new_ids],
+        batch_size=1000,
+    )
+    CallDetailRecord.objects.filter(id__in=new_ids).update(enrichment_status='queued')
+    return len(new_ids)
+
+
+def claim_jobs(worker_id, limit):
+    """Atomically claim up to ``limit`` due jobs for ``worker_id``.
+
+    ``SKIP LOCKED`` lets concurrent workers claim disjoint sets of rows
+    without waiting on each other. A job waits while another job for the
+    same record is running.
+    """
+    now = timezone.now()
+    running = EnrichmentJob.objects.filter(cdr_id=OuterRef('cdr_id'), status='running')
+    with transaction.atomic():
+        jobs = list(
+            EnrichmentJob.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_after__lte=now)
+            .exclude(Exists(running))
+            .order_by('run_after', 'id')[:limit]
+        )
+        if not jobs:
+            return []
+        job_ids = [job.id for job in jobs]
+        for job in jobs:
+            job.status = 'running'
+            job.locked_by = worker_id
+            job.locked_at = now
+            job.attempts += 1
+        EnrichmentJob.objects.bulk_update(jobs, ['status', 'locked_by', 'locked_at', 'attempts'])
+        CallDetailRecord.objects.filter(enrichment_jobs__id__in=job_ids).update(enrichment_status='running')
+    return jobs
+
+
+def retry_delay(attempts):
+    base = _setting('CDR_JOB_RETRY_BASE_SECONDS', 30)
+    cap = _setting('CDR_JOB_RETRY_MAX_SECONDS', 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    # Jitter keeps jobs that failed together from retrying in lockstep.
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _complete(jobs):
+    EnrichmentJob.objects.filter(id__in=[job.id for job in jobs]).update(
+        status='done', last_error='', locked_by='', locked_at=None, updated_at=timezone.now(),
+    )
+    # Records with a newer job queued stay queued.
+    CallDetailRecord.objects.filter(id__in=[job.cdr_id for job in jobs]).exclude(
+        enrichment_jobs__status='queued',
+    ).update(enrichment_status='done')
+
+
+def _fail(job, error):
+    now = timezone.now()
+    job.last_error = error
+    job.locked_by = ''
+    job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+        record_status = 'failed'
+    else:
+        job.status = 'queued'
+        job.run_after = now + timedelta(seconds=retry_delay(job.attempts))
+        record_status = 'queued'
+    job.save(update_fields=['status', 'run_after', 'last_error', 'locked_by', 'locked_at', 'updated_at'])
+    records = CallDetailRecord.objects.filter(id=job.cdr_id)
+    if record_status == 'failed':
+        records = records.exclude(enrichment_jobs__status='queued')
+    records.update(enrichment_status=record_status)
+    logger.warning("Enrichment job %s for record %s failed (attempt %s/%s): %s",
+                   job.id, job.cdr_id, job.attempts, job.max_attempts, error.splitlines()[-1])
+
+
+def run_jobs(jobs, batch_size=None):
+    from .inference import enrich_records
+
+    cdrs = list(CallDetailRecord.objects.filter(id__in=[job.cdr_id for job in jobs]))
+    try:
+        enrich_records(cdrs, batch_size)
+    except Exception:
+        # Fall back to one record at a time so that a single bad record does
+        # not hold back (or use up the retries of) the rest of the batch.
+        cdrs_by_id = {cdr.id: cdr for cdr in cdrs}
+        for job in jobs:
+            if job.cdr_id not in cdrs_by_id:
+                _complete([job])
+                continue
+            try:
+                enrich_records([cdrs_by_id[job.cdr_id]], batch_size)
+            except Exception:
+                _fail(job, traceback.format_exc())
+            else:
+                _complete([job])
+    else:
+        _complete(jobs)
+
+
+def requeue_stale_jobs():
+    """Put back jobs whose worker died while holding them."""
+    timeout = _setting('CDR_JOB_LOCK_TIMEOUT_SECONDS', 1800)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = EnrichmentJob.objects.filter(status='running', locked_at__lt=cutoff)
+    cdr_ids = list(stale.values_list('cdr_id', flat=True))
+    if not cdr_ids:
+        return 0
+    count = stale.update(status='queued', locked_by='', locked_at=None, run_after=timezone.now())
+    CallDetailRecord.objects.filter(id__in=cdr_ids).update(enrichment_status='queued')
+    return count
+
+
+def run_worker(worker_id=None, batch_size=None, poll_interval=5.0, once=False):
+    worker_id = worker_id or default_worker_id()
+    batch_size = batch_size or _setting('CDR_INFERENCE_BATCH_SIZE', 16)
+    logger.info("Enrichment worker %s started", worker_id)
+    while True:
+        requeue_stale_jobs()
+        jobs = claim_jobs(worker_id, batch_size)
+        if jobs:
+            run_jobs(jobs, batch_size)
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
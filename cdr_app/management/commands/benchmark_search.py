@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from cdr_app.benchmarking import benchmark_database, median_seconds, scaling_exponent, seed_records
+from cdr_app.models import CallDetailRecord
+from cdr_app.pagination import paginate
+from cdr_app.search import search_cdrs
+
+# A fixed set of "needle" records is planted in every table size, so each
+# query matches the same rows however large the table grows.
+NEEDLE_COUNT = 25
+NEEDLE_QUERIES = {
+    'notes word': 'zephyrine',
+    'partial number': '5550173',
+    'call id fragment': 'NEEDLE00',
+}
+
+
+def _plant_needles():
+    start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    CallDetailRecord.objects.bulk_create([
+        CallDetailRecord(
+            call_id=f"NEEDLE{index:04d}",
+            caller_number=f"+1212555017{index % 10}",
+            callee_number="+13105550100",
+            call_start_time=start,
+            call_end_time=start,
+            call_type='incoming',
+            call_notes=f"caller mentioned zephyrine shipment {index}",
+            enrichment_status='done',
+        )
+        for index in range(NEEDLE_COUNT)
+    ])
+
+
+def _legacy_search(query):
+    return CallDetailRecord.objects.filter(
+        Q(call_id__icontains=query) |
+        Q(caller_number__icontains=query) |
+        Q(callee_number__icontains=query) |
+        Q(call_notes__icontains=query)
+    ).order_by('-call_start_time', '-id')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure first-page search latency at increasing table sizes in a throwaway "
+        "test database, for the indexed search and the previous icontains scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--keepdb', action='store_true', help="Keep the benchmark database between runs")
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        page_size = options['page_size']
+        timings = {(name, variant): [] for name in NEEDLE_QUERIES for variant in ('indexed', 'icontains')}
+
+        with benchmark_database(keepdb=options['keepdb']):
+            CallDetailRecord.objects.all().delete()
+            _plant_needles()
+            seeded = 0
+            for size in sizes:
+                seed_records(seeded, size - seeded)
+                seeded = size
+                if connection.vendor == 'postgresql':
+                    # Fresh statistics, so the planner sees the table at its
+                    # new size rather than as last autovacuum left it.
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'ANALYZE {CallDetailRecord._meta.db_table}')
+                self.stdout.write(f"{size:>12,} rows")
+                for name, query in NEEDLE_QUERIES.items():
+                    def indexed():
+                        queryset = search_cdrs(CallDetailRecord.objects.all(), query)
+                        return list(paginate(queryset, ('-rank', '-id'), page_size))
+
+                    def icontains():
+                        return list(_legacy_search(query)[:page_size])
+
+                    for variant, func in (('indexed', indexed), ('icontains', icontains)):
+                        seconds = median_seconds(func, repeat=options['repeat'])
+                        timings[(name, variant)].append(seconds)
+                        self.stdout.write(f"    {name:<18} {variant:<10} {seconds * 1000:10.2f} ms")
+
+        self.stdout.write("\nScaling exponent (1.0 = linear in table size):")
+        for (name, variant), series in timings.items():
+            self.stdout.write(f"    {name:<18} {variant:<10} {scaling_exponent(sizes, series):6.2f}")
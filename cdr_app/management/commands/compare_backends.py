@@ -0,0 +1,78 @@
+import csv
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cdr_app.benchmarking import run_inference_task, token_f1, word_error_rate
+from cdr_app.model_registry import BACKENDS, DEFAULT_MODELS, ModelRegistry
+
+SAMPLE_CSVS = ('call_log.csv', 'cdr_records.csv')
+SAMPLE_RECORDING = 'recording.mp3'
+
+
+def _sample_notes(paths):
+    notes = []
+    for path in paths:
+        with open(path, newline='', encoding='utf-8-sig') as fh:
+            notes.extend(row['call_notes'] for row in csv.DictReader(fh) if (row.get('call_notes') or '').strip())
+    return notes
+
+
+def _agreement(task, reference, outputs):
+    if not outputs:
+        return "no outputs to compare"
+    if task == 'automatic-speech-recognition':
+        return f"WER {word_error_rate(reference, outputs):.3f}"
+    if task == 'summarization':
+        return f"ROUGE-1 F1 {statistics.fmean(token_f1(r, o) for r, o in zip(reference, outputs)):.3f}"
+    if task == 'sentiment-analysis':
+        labels = sum(r[0] == o[0] for r, o in zip(reference, outputs)) / len(outputs)
+        score = statistics.fmean(abs(r[1] - o[1]) for r, o in zip(reference, outputs))
+        return f"label agreement {labels:.1%}, mean |score diff| {score:.3f}"
+    return f"label agreement {sum(r == o for r, o in zip(reference, outputs)) / len(outputs):.1%}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare inference backends on the sample data: load time, resident size, "
+        "throughput and agreement with the first backend's outputs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['torch', 'torch-int8'],
+                            help="Backends to compare; the first is the reference (default: torch torch-int8)")
+        parser.add_argument('--tasks', nargs='+', choices=list(DEFAULT_MODELS), default=list(DEFAULT_MODELS))
+        parser.add_argument('--csv', nargs='+', default=[str(settings.BASE_DIR / name) for name in SAMPLE_CSVS],
+                            help="CSV files whose call_notes are used as text inputs")
+        parser.add_argument('--recording', default=str(settings.BASE_DIR / SAMPLE_RECORDING),
+                            help="Recording used for speech recognition")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        notes = _sample_notes(options['csv'])
+        self.stdout.write(f"{len(notes)} call notes, recording {options['recording']}")
+        reference = {}
+        for backend in options['backends']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{backend}"))
+            # A registry per backend, cleared afterwards, so only one
+            # backend's models are resident at a time.
+            registry = ModelRegistry()
+            for task in options['tasks']:
+                pipe = registry.get(task, backend=backend)
+                stats = registry.stats()[-1]
+                if task != 'automatic-speech-recognition' and notes:
+                    # Warm up once so lazy initialisation is not timed.
+                    run_inference_task(task, pipe, notes[:1], options['recording'], 1)
+                outputs, items, seconds = run_inference_task(task, pipe, notes, options['recording'], options['batch_size'])
+                if task == 'automatic-speech-recognition':
+                    throughput = f"RTF {seconds / items:.3f}" if items else "no audio"
+                else:
+                    throughput = f"{items / seconds:8.1f} texts/s" if items and seconds else "no notes"
+                quality = _agreement(task, reference[task], outputs) if task in reference else "reference"
+                reference.setdefault(task, outputs)
+                self.stdout.write(
+                    f"  {task:<30} load {stats.load_seconds:6.1f}s  {stats.size_mb:8.1f} MB  "
+                    f"{throughput:<18} {quality}"
+                )
+            registry.clear()
@@ -0,0 +1,71 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cdr_app.export import ENCODERS, export_rows, write_parquet
+from cdr_app.filters import parse_flag, parse_timestamp
+from cdr_app.utils import parse_keywords
+
+
+class _CountingRows:
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+class Command(BaseCommand):
+    help = (
+        "Export records matching the list view filters as CSV or NDJSON (streamed to a file "
+        "or stdout) or as Parquet partitioned by call date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'ndjson', 'parquet'], default='csv')
+        parser.add_argument('--output', '-o', default='-',
+                            help="Output file ('-' for stdout); a directory for parquet")
+        parser.add_argument('--q', default='', help="Search query")
+        parser.add_argument('--keywords', action='append', default=[], help="Comma-separated suspect keywords")
+        parser.add_argument('--start', help="Earliest call start (ISO date or datetime)")
+        parser.add_argument('--end', help="Call start before this (ISO date or datetime)")
+        parser.add_argument('--suspect', choices=['true', 'false'])
+        parser.add_argument('--sentiment')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Rows per cursor fetch (default: CDR_EXPORT_CHUNK_SIZE)")
+
+    def handle(self, *args, **options):
+        try:
+            filters = {
+                'q': options['q'],
+                'suspect_keywords': tuple(parse_keywords(options['keywords'])),
+                'start': parse_timestamp(options['start']),
+                'end': parse_timestamp(options['end']),
+                'suspect': parse_flag(options['suspect']),
+                'sentiment': options['sentiment'],
+            }
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        if options['format'] == 'parquet':
+            if options['output'] == '-':
+                raise CommandError("--output must be a directory for parquet exports")
+            count = write_parquet(filters, options['output'], options['chunk_size'])
+        else:
+            rows = _CountingRows(export_rows(filters, chunk_size=options['chunk_size']))
+            out = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='', encoding='utf-8')
+            try:
+                for text in ENCODERS[options['format']](rows):
+                    out.write(text)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            count = rows.count
+        seconds = time.perf_counter() - started
+        # Progress goes to stderr so stdout stays clean for piped exports.
+        self.stderr.write(f"Exported {count} records in {seconds:.1f}s ({count / seconds if seconds else 0:,.0f} rows/s)")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from cdr_app.ingest import ingest_csv
+
+
+class Command(BaseCommand):
+    help = "Stream one or more CDR CSV files into the database in chunked bulk upserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="CSV files to ingest")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Rows per upsert (default: CDR_INGEST_CHUNK_SIZE)")
+        parser.add_argument('--no-enrich', action='store_true',
+                            help="Do not queue enrichment jobs for the ingested records")
+        parser.add_argument('--force', action='store_true',
+                            help="Ingest from the start even if the file was ingested before")
+
+    def handle(self, *args, **options):
+        def progress(result):
+            self.stdout.write(f"  {result.rows:>12,} rows  {result.rows_per_second:>10,.0f} rows/s", ending='\r')
+
+        for path in options['paths']:
+            self.stdout.write(f"Ingesting {path}")
+            result = ingest_csv(
+                path,
+                chunk_size=options['chunk_size'],
+                enrich=not options['no_enrich'],
+                progress=progress,
+                force=options['force'],
+            )
+            self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS(f"{path}: {result}"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from cdr_app.rollups import rebuild_call_edges, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly and daily dashboard rollups and the call graph edges from the CDR table."
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows"))
+        count = rebuild_call_edges()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} call edges"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from cdr_app.reenrich import count_stale, reenrich
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run enrichment for records whose transcript, sentiment, summary or suspect flag "
+        "was produced by a different model than the one now configured."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Records per batch; progress is saved after each (default: 100)")
+        parser.add_argument('--max-rate', type=float, default=None,
+                            help="Upper bound on records processed per second")
+        parser.add_argument('--limit', type=int, default=None, help="Stop after this many records")
+        parser.add_argument('--name', default='default', help="Cursor name, to run independent passes")
+        parser.add_argument('--restart', action='store_true', help="Ignore the saved cursor and start from the first record")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the stale records")
+
+    def handle(self, *args, **options):
+        stale = count_stale()
+        self.stdout.write(f"{stale} stale records")
+        if options['dry_run'] or not stale:
+            return
+
+        def progress(result):
+            self.stdout.write(f"  {result.processed:>10,} records  {result.records_per_second:>8,.1f} records/s", ending='\r')
+
+        result = reenrich(
+            batch_size=options['batch_size'],
+            max_rate=options['max_rate'],
+            limit=options['limit'],
+            name=options['name'],
+            restart=options['restart'],
+            progress=progress,
+        )
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(str(result)))
@@ -0,0 +1,186 @@
+import json
+import os
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from cdr_app.benchmarking import (
+    benchmark_database, compare_to_baseline, median_seconds, run_inference_task, seed_records, write_synthetic_csv,
+)
+from cdr_app.caching import bump_data_version
+from cdr_app.models import CallDetailRecord
+from cdr_app.rollups import rebuild_rollups
+
+SUITES = ('ingest', 'list', 'dashboard', 'inference')
+SAMPLE_RECORDING = 'recording.mp3'
+
+# Requests timed at every table size. The view cache is retired before each
+# request, so these are uncached timings.
+LIST_REQUESTS = {
+    'list/first-page': {},
+    'list/search': {'q': 'billing'},
+    'list/keywords': {'suspect_keywords': 'refund,outage'},
+    'list/search-keywords': {'q': 'customer', 'suspect_keywords': 'refund,outage'},
+}
+DASHBOARD_REQUESTS = {
+    'dashboard/page': ('cdr_visualization', {}),
+    'dashboard/daily': ('cdr_aggregates', {'granularity': 'day'}),
+    'dashboard/hourly-filtered': ('cdr_aggregates', {'granularity': 'hour', 'suspect': 'false'}),
+}
+# Uploaded files use record indexes far above the seeded ones.
+UPLOAD_START = 900_000_000
+
+
+def _result(name, rows, value, unit, better='lower'):
+    return {'name': name, 'rows': rows, 'value': value, 'unit': unit, 'better': better}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark CSV upload ingestion, the list view, the dashboard and model inference "
+        "at increasing table sizes in a throwaway database; write the results as JSON and "
+        "compare them with a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+        parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--ingest-rows', type=int, default=50_000,
+                            help="Rows uploaded as one CSV file at each table size")
+        parser.add_argument('--recording', default=str(settings.BASE_DIR / SAMPLE_RECORDING))
+        parser.add_argument('--inference-texts', type=int, default=32,
+                            help="Copies of the recording's transcript run through each text model")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--output', '-o', default='benchmark_results.json')
+        parser.add_argument('--baseline', help="Earlier results file to compare against")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Relative slowdown flagged as a regression (default: 0.2)")
+
+    def handle(self, *args, **options):
+        try:
+            connection.ensure_connection()
+        except OperationalError as e:
+            raise CommandError(
+                f"Cannot reach the {connection.vendor} database: {str(e).splitlines()[0]}. To benchmark on SQLite instead, "
+                "run with --settings=cdr_analysis.benchmark_settings"
+            ) from e
+        suites = options['suites']
+        results = []
+
+        if {'ingest', 'list', 'dashboard'} & set(suites):
+            with benchmark_database(), tempfile.TemporaryDirectory() as workdir, override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], MEDIA_ROOT=os.path.join(workdir, 'media'),
+            ):
+                results.extend(self._database_suites(suites, sorted(options['sizes']), options, workdir))
+        if 'inference' in suites:
+            results.extend(self._inference_suite(options))
+
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'environment': {
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(f"\nWrote {len(results)} results to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as fh:
+                baseline = json.load(fh)['results']
+            regressions = compare_to_baseline(results, baseline, options['tolerance'])
+            for entry, before, change in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f"  {entry['name']} @ {entry['rows']} rows: {before:.4g} -> {entry['value']:.4g} "
+                    f"{entry['unit']} ({change:+.0%} worse)"
+                ))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions beyond {options['tolerance']:.0%}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def _database_suites(self, suites, sizes, options, workdir):
+        client = Client()
+        seeded = 0
+        for round_number, size in enumerate(sizes):
+            missing = size - CallDetailRecord.objects.count()
+            if missing > 0:
+                seed_records(seeded, missing)
+                seeded += missing
+                rebuild_rollups()
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            rows = CallDetailRecord.objects.count()
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{rows:,} rows"))
+
+            timed = []
+            if 'list' in suites:
+                timed += [(name, reverse('cdr_list'), params) for name, params in LIST_REQUESTS.items()]
+            if 'dashboard' in suites:
+                timed += [(name, reverse(view), params) for name, (view, params) in DASHBOARD_REQUESTS.items()]
+            for name, url, params in timed:
+                def request():
+                    bump_data_version()
+                    response = client.get(url, params)
+                    if response.status_code != 200:
+                        raise CommandError(f"{name}: HTTP {response.status_code}")
+
+                seconds = median_seconds(request, repeat=options['repeat'])
+                yield _result(name, rows, seconds * 1000, 'ms')
+                self.stdout.write(f"    {name:<28} {seconds * 1000:10.2f} ms")
+
+            if 'ingest' in suites:
+                # Ingested last so the timings above see exactly ``size`` rows.
+                count = options['ingest_rows']
+                path = os.path.join(workdir, f"upload-{size}.csv")
+                write_synthetic_csv(path, UPLOAD_START + round_number * count, count)
+
+                def upload():
+                    with open(path, 'rb') as fh:
+                        response = client.post(reverse('cdr_list'), {'csv_file': fh})
+                    if response.status_code != 302:
+                        raise CommandError(f"CSV upload: HTTP {response.status_code}")
+
+                seconds = median_seconds(upload, repeat=1, warmup=0)
+                yield _result('ingest/upload', rows, count / seconds, 'rows/s', better='higher')
+                self.stdout.write(f"    {'ingest/upload':<28} {count / seconds:10,.0f} rows/s")
+
+    def _inference_suite(self, options):
+        from cdr_app.model_registry import DEFAULT_MODELS, ModelRegistry
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"inference on {options['recording']}"))
+        registry = ModelRegistry()
+        notes = []
+        results = []
+        for task in DEFAULT_MODELS:
+            pipe = registry.get(task)
+            load_seconds = registry.stats()[-1].load_seconds
+            results.append(_result(f"inference/{task}/load", None, load_seconds, 's'))
+            if task == 'automatic-speech-recognition':
+                transcript, audio_seconds, seconds = run_inference_task(
+                    task, pipe, [], options['recording'], options['batch_size'],
+                )
+                notes = [transcript] * options['inference_texts']
+                throughput, unit = audio_seconds / seconds, 'audio s/s'
+            else:
+                # Warm up once so lazy initialisation is not timed.
+                run_inference_task(task, pipe, notes[:1], None, 1)
+                _, items, seconds = run_inference_task(task, pipe, notes, None, options['batch_size'])
+                throughput, unit = items / seconds, 'texts/s'
+            results.append(_result(f"inference/{task}", None, throughput, unit, better='higher'))
+            self.stdout.write(f"    {task:<28} load {load_seconds:6.1f}s  {throughput:10.2f} {unit}")
+        registry.clear()
+        return results
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _serve_metrics(port, address):
+    # Each process counts its own inference work, so each serves its own
+    # metrics for the scraper to sum.
+    from cdr_app import metrics
+
+    return metrics.serve(port, address, getattr(settings, 'CDR_METRICS_TOKEN', ''))
+
+
+def _worker_process(settings_module, worker_index, batch_size, poll_interval, once, metrics_port, metrics_address):
+    # Entry point for child processes. Under the "spawn" start method the
+    # child starts from a fresh interpreter, so Django must be set up again.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    from cdr_app.jobs import default_worker_id, run_worker
+    if metrics_port is not None:
+        _serve_metrics(metrics_port + worker_index, metrics_address)
+    run_worker(f"{default_worker_id()}#{worker_index}", batch_size, poll_interval, once)
+
+
+class Command(BaseCommand):
+    help = "Run local worker processes that claim and execute queued CDR enrichment jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Number of worker processes (default: 1)")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Jobs claimed and enriched per batch (default: CDR_INFERENCE_BATCH_SIZE)")
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help="Seconds to sleep when the queue is empty (default: 5)")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is drained")
+        parser.add_argument('--metrics-port', type=int, default=None,
+                            help="Serve Prometheus metrics over HTTP on this port; worker N of several uses "
+                                 "this port + N")
+        parser.add_argument('--metrics-address', default='127.0.0.1',
+                            help="Address the metrics listener binds to (default: 127.0.0.1)")
+
+    def handle(self, *args, **options):
+        from cdr_app.jobs import run_worker
+
+        processes = options['processes']
+        metrics_port = options['metrics_port']
+        if processes <= 1:
+            if metrics_port is not None:
+                server = _serve_metrics(metrics_port, options['metrics_address'])
+                self.stdout.write(f"Serving metrics on {options['metrics_address']}:{server.server_port}")
+            run_worker(batch_size=options['batch_size'], poll_interval=options['poll_interval'], once=options['once'])
+            return
+
+        # Children must not inherit the parent's database connections.
+        connections.close_all()
+        settings_module = os.environ['DJANGO_SETTINGS_MODULE']
+        workers = [
+            multiprocessing.Process(
+                target=_worker_process,
+                args=(settings_module, index, options['batch_size'], options['poll_interval'], options['once'],
+                      metrics_port, options['metrics_address']),
+                name=f"enrichment-worker-{index}",
+            )
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {processes} enrichment workers")
+        if metrics_port is not None:
+            self.stdout.write(f"Serving metrics on ports {metrics_port}-{metrics_port + processes - 1}")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
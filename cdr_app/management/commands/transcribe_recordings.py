@@ -0,0 +1,172 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Q
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg', '.m4a')
+
+
+def _init_worker(settings_module, threads):
+    # Runs once in each pool process: set up Django, pin the intra-op thread
+    # count so workers do not oversubscribe the CPU, and load the model.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    import torch
+    torch.set_num_threads(threads)
+
+    from cdr_app.model_registry import get_pipeline
+    get_pipeline("automatic-speech-recognition")
+
+
+def _transcribe_one(path):
+    from cdr_app.audio_cache import hash_audio, lookup, store_transcript
+    from cdr_app.transcription import transcribe_file
+
+    started = time.perf_counter()
+    try:
+        audio_hash = hash_audio(path)
+        entry = lookup(audio_hash)
+        if entry is not None:
+            transcript = (entry.transcript, entry.speech_ratio, 0.0, True, entry.model_name)
+            return path, transcript, None, time.perf_counter() - started
+        result = transcribe_file(path)
+        entry = store_transcript(audio_hash, result.text, result.speech_ratio)
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}", time.perf_counter() - started
+    transcript = (result.text, result.speech_ratio, result.audio_seconds, False, entry.model_name)
+    return path, transcript, None, time.perf_counter() - started
+
+
+def _find_recordings(directory, recursive):
+    pattern = '**/*' if recursive else '*'
+    return sorted(
+        path for path in Path(directory).glob(pattern)
+        if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS
+    )
+
+
+def _match_records(paths, overwrite, chunk_size=1000):
+    """Map each recording to the id of the record whose call_id is its file
+    stem, skipping records that already have notes unless ``overwrite``."""
+    from cdr_app.models import CallDetailRecord
+
+    by_stem = {path.stem: path for path in paths}
+    stems = list(by_stem)
+    matched = {}
+    for start in range(0, len(stems), chunk_size):
+        records = CallDetailRecord.objects.filter(call_id__in=stems[start:start + chunk_size])
+        if not overwrite:
+            records = records.filter(Q(call_notes__isnull=True) | Q(call_notes=''))
+        for call_id, pk in records.values_list('call_id', 'id'):
+            matched[str(by_stem[call_id])] = pk
+    return matched
+
+
+def _write_transcripts(results, enrich):
+    from cdr_app.jobs import enqueue_enrichment
+    from cdr_app.models import CallDetailRecord
+
+    # transcript_model is recorded as enrich_records does, so `reenrich`
+    # redoes these transcripts when the speech model changes.
+    records = [
+        CallDetailRecord(id=pk, call_notes=text, speech_ratio=speech_ratio, transcript_model=model_name)
+        for pk, (text, speech_ratio, _, _, model_name) in results
+    ]
+    with transaction.atomic():
+        CallDetailRecord.objects.bulk_update(records, ['call_notes', 'speech_ratio', 'transcript_model'])
+        if enrich:
+            enqueue_enrichment(record.id for record in records)
+    return len(records)
+
+
+class Command(BaseCommand):
+    help = (
+        "Transcribe a directory of recordings named <call_id>.<ext> in parallel and "
+        "write the transcripts to the matching CDRs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Directory holding the audio files")
+        parser.add_argument('--processes', type=int, default=None,
+                            help="Worker processes, each with its own model (default: CPUs / threads)")
+        parser.add_argument('--threads', type=int, default=1,
+                            help="Torch threads per worker process (default: 1)")
+        parser.add_argument('--write-batch', type=int, default=100,
+                            help="Transcripts written per bulk update (default: 100)")
+        parser.add_argument('--recursive', action='store_true', help="Also look in subdirectories")
+        parser.add_argument('--overwrite', action='store_true',
+                            help="Transcribe records that already have call notes")
+        parser.add_argument('--no-enrich', action='store_true',
+                            help="Do not queue enrichment jobs for the transcribed records")
+
+    def handle(self, *args, **options):
+        from cdr_app.benchmarking import percentile
+
+        if not os.path.isdir(options['directory']):
+            raise CommandError(f"{options['directory']} is not a directory")
+        paths = _find_recordings(options['directory'], options['recursive'])
+        matched = _match_records(paths, options['overwrite'])
+        self.stdout.write(f"{len(paths)} recordings, {len(matched)} matched to records needing a transcript")
+        if not matched:
+            return
+
+        threads = max(options['threads'], 1)
+        processes = options['processes'] or max((os.cpu_count() or 1) // threads, 1)
+        processes = min(processes, len(matched))
+
+        # Children are spawned fresh rather than forked: torch's thread pools
+        # and the parent's database connections do not survive a fork.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        settings_module = os.environ['DJANGO_SETTINGS_MODULE']
+
+        pending, latencies, failures = [], [], []
+        audio_seconds = 0.0
+        cache_hits = 0
+        written = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(processes, mp_context=context, initializer=_init_worker,
+                                 initargs=(settings_module, threads)) as pool:
+            self.stdout.write(f"Started {processes} workers with {threads} torch thread(s) each")
+            futures = [pool.submit(_transcribe_one, path) for path in matched]
+            for future in as_completed(futures):
+                path, transcript, error, seconds = future.result()
+                latencies.append(seconds)
+                if error:
+                    failures.append((path, error))
+                else:
+                    audio_seconds += transcript[2]
+                    cache_hits += transcript[3]
+                    pending.append((matched[path], transcript))
+                if len(pending) >= options['write_batch']:
+                    written += _write_transcripts(pending, enrich=not options['no_enrich'])
+                    pending = []
+                done = len(latencies)
+                rate = done / (time.perf_counter() - started)
+                self.stdout.write(f"  {done:>8,}/{len(matched):,} files  {rate:8.2f} files/s", ending='\r')
+        if pending:
+            written += _write_transcripts(pending, enrich=not options['no_enrich'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Transcribed {written} files ({audio_seconds:,.0f}s of audio) in {elapsed:,.1f}s: "
+            f"{written / elapsed:.2f} files/s, {audio_seconds / elapsed:.1f}x real time"
+        ))
+        self.stdout.write(f"Answered from the audio cache: {cache_hits} files")
+        self.stdout.write(
+            "Per-file latency: " + ", ".join(
+                f"p{pct} {percentile(latencies, pct):.2f}s" for pct in (50, 95, 99)
+            )
+        )
+        if failures:
+            self.stdout.write(self.style.ERROR(f"{len(failures)} files failed:"))
+            for path, error in failures:
+                self.stdout.write(f"  {path}: {error}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from cdr_app.model_registry import DEFAULT_MODELS, get_registry
+
+
+class Command(BaseCommand):
+    help = "Load the inference pipelines into the model registry and report load time and resident size."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tasks', nargs='*',
+            help=f"Pipeline tasks to load (default: all of {', '.join(DEFAULT_MODELS)})",
+        )
+
+    def handle(self, *args, **options):
+        registry = get_registry()
+        for stats in registry.warm(options['tasks'] or None):
+            self.stdout.write(
+                f"{stats.task:<32} {stats.model:<48} {stats.backend:<10} "
+                f"{stats.load_seconds:7.1f}s {stats.size_mb:9.1f} MB"
+            )
+        total_mb = registry.resident_bytes() / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(f"Total resident: {total_mb:.1f} MB"))
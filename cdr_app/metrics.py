@@ -0,0 +1,162 @@
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Default histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _copy(value):
+    # Snapshot a histogram's mutable state so it renders consistently.
+    return [list(value[0]), value[1], value[2]] if isinstance(value, list) else value
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, _copy(value)) for key, value in self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{self._labels(key)} {value}"]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [cumulative bucket counts, sum, count]
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key, value):
+        counts, total, observations = value
+        lines = [
+            f"{self.name}_bucket{self._labels(key, [('le', repr(float(bound)))])} {count}"
+            for bound, count in zip(self.buckets, counts)
+        ]
+        lines.append(f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])} {observations}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {total}")
+        lines.append(f"{self.name}_count{self._labels(key)} {observations}")
+        return lines
+
+
+REGISTRY = []
+
+
+def render():
+    """All metrics of this process in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port, address='127.0.0.1', token=''):
+    """Serve ``render()`` over HTTP from a daemon thread, for processes
+    that do not run the web app (the enrichment workers). With ``token``
+    scrapers must send it as a bearer token. Returns the server."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if token and not hmac.compare_digest(self.headers.get('Authorization', ''), f'Bearer {token}'):
+                self.send_error(403)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+REQUEST_SECONDS = Histogram(
+    'cdr_http_request_duration_seconds', "Time spent handling requests.", ('view', 'method', 'status'),
+)
+REQUEST_DB_QUERIES = Histogram(
+    'cdr_http_request_db_queries', "Database queries per request.", ('view',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+REQUEST_DB_SECONDS = Histogram(
+    'cdr_http_request_db_duration_seconds', "Time spent in database queries per request.", ('view',),
+)
+MODEL_LOAD_SECONDS = Histogram(
+    'cdr_model_load_duration_seconds', "Time to load an inference pipeline.", ('task', 'backend'),
+)
+INFERENCE_SECONDS = Histogram(
+    'cdr_inference_duration_seconds', "Time per inference stage and batch of records.", ('stage',),
+)
+INFERENCE_ITEMS = Counter(
+    'cdr_inference_items_total', "Records processed per inference stage.", ('stage',),
+)
+INGEST_ROWS = Counter('cdr_ingest_rows_total', "CSV rows upserted by ingestion.")
+INGEST_CHUNK_SECONDS = Histogram('cdr_ingest_chunk_duration_seconds', "Time to parse and upsert one CSV chunk.")
+CACHE_REQUESTS = Counter('cdr_view_cache_requests_total', "View cache lookups.", ('view', 'result'))
+AUDIO_CACHE_REQUESTS = Counter(
+    'cdr_audio_cache_requests_total', "Audio analysis cache lookups.", ('cache', 'result'),
+)
@@ -0,0 +1,84 @@
+import cProfile
+import io
+import pstats
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseBadRequest
+
+from .metrics import REQUEST_DB_QUERIES, REQUEST_DB_SECONDS, REQUEST_SECONDS
+
+PROFILE_SORT_KEYS = {'cumulative', 'cumtime', 'tottime', 'time', 'ncalls', 'calls', 'name', 'filename'}
+
+
+class _QueryTimer:
+    # connection.execute_wrapper hook counting queries and their time.
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class MetricsMiddleware:
+    """Record the duration of every request, labelled by view, and with
+    ``CDR_PROFILE_QUERIES`` also its database query count and time."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        if getattr(settings, 'CDR_PROFILE_QUERIES', False):
+            timer = _QueryTimer()
+            with connections['default'].execute_wrapper(timer):
+                response = self.get_response(request)
+        else:
+            timer = None
+            response = self.get_response(request)
+        view = _view_name(request)
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started, view=view, method=request.method, status=response.status_code,
+        )
+        if timer:
+            REQUEST_DB_QUERIES.observe(timer.count, view=view)
+            REQUEST_DB_SECONDS.observe(timer.seconds, view=view)
+        return response
+
+
+class ProfilingMiddleware:
+    """With ``CDR_PROFILING_ENABLED``, ``?profile=1`` runs the request under
+    cProfile and returns the profile (top functions by cumulative time)
+    instead of the page."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'CDR_PROFILING_ENABLED', False) or request.GET.get('profile') != '1':
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        if response.streaming:
+            # Streamed bodies are produced after the view returns.
+            profiler.runcall(lambda: b''.join(response.streaming_content))
+        limit = request.GET.get('limit', '50')
+        sort = request.GET.get('sort', 'cumulative')
+        if not limit.isdigit() or sort not in PROFILE_SORT_KEYS:
+            return HttpResponseBadRequest("limit must be a number and sort a pstats sort key")
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(int(limit))
+        return HttpResponse(output.getvalue(), content_type='text/plain')
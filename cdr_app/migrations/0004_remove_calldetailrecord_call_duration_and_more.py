@@ -0,0 +1,50 @@
+# Generated by Django 5.1 on 2026-10-18 08:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_enriched_records_done(apps, schema_editor):
+    CallDetailRecord = apps.get_model('cdr_app', 'CallDetailRecord')
+    CallDetailRecord.objects.exclude(sentiment_label__isnull=True).exclude(sentiment_label='').exclude(
+        summary__isnull=True).exclude(summary='').update(enrichment_status='done')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0003_calldetailrecord_summary'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='calldetailrecord',
+            name='call_duration',
+        ),
+        migrations.AddField(
+            model_name='calldetailrecord',
+            name='enrichment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.RunPython(mark_enriched_records_done, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='EnrichmentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cdr', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrichment_jobs', to='cdr_app.calldetailrecord')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='enrichment_job_claim_idx')],
+            },
+        ),
+    ]
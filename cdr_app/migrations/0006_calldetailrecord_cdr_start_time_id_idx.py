@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0005_ingestionrun'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calldetailrecord',
+            index=models.Index(fields=['call_start_time', 'id'], name='cdr_start_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1 on 2026-10-18 08:41
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Full-text and trigram search only exist on PostgreSQL; other backends keep
+# the plain search_vector column and fall back to icontains matching.
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION cdr_app_cdr_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.call_notes, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.summary, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER cdr_app_cdr_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF call_notes, summary ON cdr_app_calldetailrecord
+    FOR EACH ROW EXECUTE FUNCTION cdr_app_cdr_search_vector_update()
+    """,
+    """
+    UPDATE cdr_app_calldetailrecord SET search_vector =
+        setweight(to_tsvector('english', coalesce(call_notes, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'B')
+    """,
+    "CREATE INDEX cdr_search_vector_gin ON cdr_app_calldetailrecord USING gin (search_vector)",
+    # Expression indexes matching the UPPER(col::text) LIKE that icontains
+    # generates, so partial ID and number matches use the trigram index.
+    "CREATE INDEX cdr_call_id_trgm ON cdr_app_calldetailrecord USING gin (UPPER(call_id::text) gin_trgm_ops)",
+    "CREATE INDEX cdr_caller_number_trgm ON cdr_app_calldetailrecord USING gin (UPPER(caller_number::text) gin_trgm_ops)",
+    "CREATE INDEX cdr_callee_number_trgm ON cdr_app_calldetailrecord USING gin (UPPER(callee_number::text) gin_trgm_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS cdr_callee_number_trgm",
+    "DROP INDEX IF EXISTS cdr_caller_number_trgm",
+    "DROP INDEX IF EXISTS cdr_call_id_trgm",
+    "DROP INDEX IF EXISTS cdr_search_vector_gin",
+    "DROP TRIGGER IF EXISTS cdr_app_cdr_search_vector_trigger ON cdr_app_calldetailrecord",
+    "DROP FUNCTION IF EXISTS cdr_app_cdr_search_vector_update()",
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0006_calldetailrecord_cdr_start_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calldetailrecord',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(REVERSE_SQL)),
+    ]
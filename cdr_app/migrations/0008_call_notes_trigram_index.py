@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-18 08:42
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # Lets the suspect keyword filter (call_notes ~* 'kw1|kw2|...') use an
+    # index; pg_trgm is enabled by migration 0007.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX cdr_call_notes_trgm ON cdr_app_calldetailrecord USING gin (call_notes gin_trgm_ops)"
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS cdr_call_notes_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0007_calldetailrecord_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0008_call_notes_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuspectClassification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text_hash', models.CharField(max_length=64)),
+                ('model_name', models.CharField(max_length=200)),
+                ('labels_key', models.CharField(max_length=64)),
+                ('label', models.CharField(max_length=50)),
+                ('score', models.FloatField()),
+                ('is_suspect', models.BooleanField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('text_hash', 'model_name', 'labels_key'), name='unique_suspect_classification')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0009_suspectclassification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CallRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('call_type', models.CharField(max_length=20)),
+                ('call_count', models.BigIntegerField(default=0)),
+                ('total_duration', models.BigIntegerField(default=0)),
+                ('suspect_count', models.BigIntegerField(default=0)),
+                ('positive_count', models.BigIntegerField(default=0)),
+                ('negative_count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket', 'call_type'), name='unique_call_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0010_callrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calldetailrecord',
+            name='speech_ratio',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
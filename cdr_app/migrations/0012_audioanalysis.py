@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-18 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0011_calldetailrecord_speech_ratio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audio_hash', models.CharField(max_length=64)),
+                ('model_name', models.CharField(max_length=200)),
+                ('transcript', models.TextField()),
+                ('speech_ratio', models.FloatField(blank=True, null=True)),
+                ('enrichment_key', models.CharField(blank=True, max_length=64)),
+                ('sentiment_label', models.CharField(blank=True, max_length=50, null=True)),
+                ('sentiment_score', models.FloatField(blank=True, null=True)),
+                ('summary', models.TextField(blank=True, null=True)),
+                ('is_suspect', models.BooleanField(blank=True, null=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('audio_hash', 'model_name'), name='unique_audio_analysis')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0012_audioanalysis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReenrichmentCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('models_key', models.CharField(max_length=64)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='calldetailrecord',
+            name='sentiment_model',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='calldetailrecord',
+            name='summary_model',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='calldetailrecord',
+            name='suspect_model',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='calldetailrecord',
+            name='transcript_model',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0013_enrichment_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CallEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('caller', models.CharField(max_length=32)),
+                ('callee', models.CharField(max_length=32)),
+                ('day', models.DateField()),
+                ('call_count', models.BigIntegerField(default=0)),
+                ('total_duration', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['callee', 'day'], name='call_edge_callee_day_idx'), models.Index(fields=['day'], name='call_edge_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('caller', 'callee', 'day'), name='unique_call_edge')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0014_calledge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calldetailrecord',
+            name='suspect_reason',
+            field=models.CharField(blank=True, choices=[('notes', 'Call notes'), ('calling_pattern', 'Calling pattern'), ('both', 'Call notes and calling pattern')], default='', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cdr_app', '0015_suspect_reason'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionrun',
+            name='prefix_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
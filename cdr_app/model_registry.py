@@ -0,0 +1,278 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .metrics import MODEL_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Models used for each pipeline task. ``None`` lets transformers pick its
+# default checkpoint for the task. Override per task with ``CDR_MODELS``.
+DEFAULT_MODELS = {
+    'automatic-speech-recognition': 'facebook/wav2vec2-large-960h-lv60-self',
+    'sentiment-analysis': None,
+    'zero-shot-classification': 'facebook/bart-large-mnli',
+    'summarization': None,
+}
+
+# How a pipeline's model is executed on the CPU:
+#   torch       the checkpoint as published (fp32)
+#   torch-int8  Linear layers dynamically quantized to int8
+#   onnx        an ONNX Runtime export through optimum (optional dependency)
+BACKENDS = ('torch', 'torch-int8', 'onnx')
+
+
+@dataclass
+class ModelStats:
+    task: str
+    model: str
+    backend: str
+    load_seconds: float
+    size_bytes: int
+    last_used: float
+    uses: int = 0
+
+    @property
+    def size_mb(self):
+        return self.size_bytes / (1024 * 1024)
+
+
+def resolve_model(task, model=None):
+    if model is not None:
+        return model
+    overrides = getattr(settings, 'CDR_MODELS', {})
+    return overrides.get(task, DEFAULT_MODELS.get(task))
+
+
+def resolve_backend(task, backend=None):
+    if backend is None:
+        overrides = getattr(settings, 'CDR_INFERENCE_BACKENDS', {})
+        backend = overrides.get(task, getattr(settings, 'CDR_INFERENCE_BACKEND', 'torch'))
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"Unknown inference backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def resolve_revision(task):
+    return getattr(settings, 'CDR_MODEL_REVISIONS', {}).get(task)
+
+
+def model_id(task, model=None, backend=None):
+    """Identify what produces a task's outputs, for keys of cached results
+    and the per-field model columns of records: the checkpoint, its pinned
+    revision if any, and the backend unless it is plain torch."""
+    model = resolve_model(task, model) or f"{task}:default"
+    revision = resolve_revision(task)
+    backend = resolve_backend(task, backend)
+    if revision:
+        model = f"{model}:{revision}"
+    return model if backend == 'torch' else f"{model}@{backend}"
+
+
+def _tensor_bytes(value):
+    if hasattr(value, 'numel'):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(item) for item in value)
+    return 0
+
+
+def _pipeline_size_bytes(pipe):
+    # Everything in the torch module's state dict, i.e. what stays resident
+    # for as long as the pipeline is cached. Quantized layers keep their
+    # packed int8 weights there rather than as parameters.
+    model = getattr(pipe, 'model', None)
+    if model is None or not hasattr(model, 'state_dict'):
+        return 0
+    return sum(_tensor_bytes(value) for value in model.state_dict().values())
+
+
+def _torch_pipeline(task, model):
+    from transformers import pipeline
+
+    revision = resolve_revision(task)
+    return pipeline(task, model=model, revision=revision) if model else pipeline(task)
+
+
+def _int8_pipeline(task, model):
+    import torch
+
+    pipe = _torch_pipeline(task, model)
+    pipe.model = torch.ao.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipe
+
+
+def _onnx_pipeline(task, model):
+    try:
+        from optimum.pipelines import pipeline
+    except ImportError as e:
+        raise ImproperlyConfigured(
+            "The 'onnx' inference backend needs optimum with ONNX Runtime: pip install optimum[onnxruntime]"
+        ) from e
+    # Exporting a checkpoint takes far longer than loading the export, so
+    # each export is saved once and loaded from disk afterwards.
+    revision = resolve_revision(task)
+    export_dir = _onnx_export_dir(task, model, revision)
+    if export_dir.is_dir():
+        return pipeline(task, model=str(export_dir), accelerator='ort')
+    pipe = pipeline(task, model=model, accelerator='ort', revision=revision)
+    export_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=export_dir.parent))
+    try:
+        pipe.model.save_pretrained(staging)
+        for name in ('tokenizer', 'feature_extractor'):
+            if getattr(pipe, name, None) is not None:
+                getattr(pipe, name).save_pretrained(staging)
+        os.replace(staging, export_dir)
+    except OSError:
+        # Another process may have saved the same export first.
+        if not export_dir.is_dir():
+            logger.warning("Could not save the ONNX export of %s to %s", model, export_dir, exc_info=True)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return pipe
+
+
+def _onnx_export_dir(task, model, revision):
+    root = Path(getattr(settings, 'CDR_ONNX_EXPORT_DIR', None) or Path(tempfile.gettempdir()) / 'cdr-onnx')
+    name = f"{model or task + '-default'}@{revision or 'main'}"
+    return root / name.replace('/', '--')
+
+
+LOADERS = {
+    'torch': _torch_pipeline,
+    'torch-int8': _int8_pipeline,
+    'onnx': _onnx_pipeline,
+}
+
+
+class ModelRegistry:
+    """Process-wide cache of transformers pipelines.
+
+    Each (task, model) pair is loaded at most once per process. When the
+    resident size of all cached pipelines exceeds ``memory_budget_bytes`` the
+    least recently used ones are dropped until the budget is met again.
+    """
+
+    def __init__(self, memory_budget_bytes=None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._pipelines = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, task, model=None, backend=None):
+        key = (task, resolve_model(task, model), resolve_backend(task, backend))
+        with self._lock:
+            if key in self._pipelines:
+                return self._touch(key)
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Loading happens outside the registry lock so that different models
+        # can load concurrently; the per-key lock makes sure a model is only
+        # loaded once even if several threads ask for it at the same time.
+        with load_lock:
+            with self._lock:
+                if key in self._pipelines:
+                    return self._touch(key)
+            pipe, stats = self._load(*key)
+            with self._lock:
+                self._pipelines[key] = pipe
+                self._stats[key] = stats
+                self._evict_over_budget(keep=key)
+                return self._touch(key)
+
+    def warm(self, tasks=None):
+        for task in tasks or DEFAULT_MODELS:
+            self.get(task)
+        return self.stats()
+
+    def evict(self, task, model=None, backend=None):
+        key = (task, resolve_model(task, model), resolve_backend(task, backend))
+        with self._lock:
+            self._pipelines.pop(key, None)
+            self._stats.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._pipelines.clear()
+            self._stats.clear()
+
+    def stats(self):
+        with self._lock:
+            return [self._stats[key] for key in self._pipelines]
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(stats.size_bytes for stats in self._stats.values())
+
+    def _touch(self, key):
+        self._pipelines.move_to_end(key)
+        stats = self._stats[key]
+        stats.last_used = time.time()
+        stats.uses += 1
+        return self._pipelines[key]
+
+    def _load(self, task, model, backend):
+        started = time.perf_counter()
+        pipe = LOADERS[backend](task, model)
+        load_seconds = time.perf_counter() - started
+        MODEL_LOAD_SECONDS.observe(load_seconds, task=task, backend=backend)
+        stats = ModelStats(
+            task=task,
+            model=model or pipe.model.name_or_path,
+            backend=backend,
+            load_seconds=load_seconds,
+            size_bytes=_pipeline_size_bytes(pipe),
+            last_used=time.time(),
+        )
+        logger.info(
+            "Loaded %s (%s, %s) in %.1fs, %.0f MB resident",
+            stats.task, stats.model, stats.backend, stats.load_seconds, stats.size_mb,
+        )
+        return pipe, stats
+
+    def _evict_over_budget(self, keep):
+        if not self.memory_budget_bytes:
+            return
+        total = sum(stats.size_bytes for stats in self._stats.values())
+        for key in list(self._pipelines):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            stats = self._stats.pop(key)
+            del self._pipelines[key]
+            total -= stats.size_bytes
+            logger.info("Evicted %s (%s) to stay within the model memory budget", stats.task, stats.model)
+
+
+def _budget_from_settings():
+    budget_mb = getattr(settings, 'CDR_MODEL_MEMORY_BUDGET_MB', None)
+    return int(budget_mb * 1024 * 1024) if budget_mb else None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(memory_budget_bytes=_budget_from_settings())
+    return _registry
+
+
+def get_pipeline(task, model=None, backend=None):
+    return get_registry().get(task, model, backend)
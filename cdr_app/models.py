@@ -1,4 +1,46 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
+
+from .caching import invalidate_cached_data
+
+
+# Record fields that only track background work. Writes touching nothing
+# else leave the cached list and dashboard data alone (the status badge on
+# the list page may lag by the cache timeout); the enrichment results that
+# follow are written with their own fields and do retire it.
+BOOKKEEPING_FIELDS = frozenset({'enrichment_status'})
+
+
+class CallDetailRecordQuerySet(models.QuerySet):
+    # Bulk writes bypass model signals, so they retire the cached list and
+    # dashboard data here once they have changed rows; single saves and
+    # deletes do so in signals.py.
+
+    def update(self, **kwargs):
+        count = super().update(**kwargs)
+        if count and not kwargs.keys() <= BOOKKEEPING_FIELDS:
+            invalidate_cached_data()
+        return count
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        count = super().bulk_update(objs, fields, batch_size=batch_size)
+        if count and not set(fields) <= BOOKKEEPING_FIELDS:
+            invalidate_cached_data()
+        return count
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            invalidate_cached_data()
+        return objs
+
+    def delete(self):
+        count, per_model = super().delete()
+        if count:
+            invalidate_cached_data()
+        return count, per_model
+
 
 class CallDetailRecord(models.Model):
     call_id = models.CharField(max_length=100, unique=True)
@@ -17,7 +59,37 @@ class CallDetailRecord(models.Model):
     sentiment_label = models.CharField(max_length=20, blank=True, null=True)  # Sentiment label from sentiment analysis
     sentiment_score = models.FloatField(blank=True, null=True)  # Sentiment score from sentiment analysis
     is_suspect = models.BooleanField(default=False)  # Flag to mark suspect calls
+    suspect_reason = models.CharField(max_length=20, blank=True, default='', choices=[
+        ('notes', 'Call notes'),
+        ('calling_pattern', 'Calling pattern'),
+        ('both', 'Call notes and calling pattern'),
+    ])  # Which signal flagged the call; suspect_model only covers the notes
     summary = models.TextField(blank=True, null=True)  # Summary of the call
+    speech_ratio = models.FloatField(blank=True, null=True)  # Share of the recording that holds speech
+    # Model (and revision/backend) that produced each enrichment field, see
+    # cdr_app.model_registry.model_id. Indexed to find stale records.
+    transcript_model = models.CharField(max_length=200, blank=True, null=True, db_index=True)
+    sentiment_model = models.CharField(max_length=200, blank=True, null=True, db_index=True)
+    summary_model = models.CharField(max_length=200, blank=True, null=True, db_index=True)
+    suspect_model = models.CharField(max_length=200, blank=True, null=True, db_index=True)
+    enrichment_status = models.CharField(max_length=20, default='pending', db_index=True, choices=[
+        ('pending', 'Pending'),
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ])  # Progress of transcription/sentiment/summary/suspect enrichment
+    # Weighted tsvector of call notes (including transcripts) and summary.
+    # Maintained by a database trigger on PostgreSQL, see migration 0007.
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    objects = CallDetailRecordQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the list view by start time.
+            models.Index(fields=['call_start_time', 'id'], name='cdr_start_time_id_idx'),
+        ]
 
     def __str__(self):
         return f"Call ID: {self.call_id}"
@@ -26,4 +98,164 @@ class CallDetailRecord(models.Model):
     def call_duration(self):
         if self.call_start_time and self.call_end_time:
             return int((self.call_end_time - self.call_start_time).total_seconds())
-        return 0
\ No newline at end of file
+        return 0
+
+class EnrichmentJob(models.Model):
+    cdr = models.ForeignKey(CallDetailRecord, on_delete=models.CASCADE, related_name='enrichment_jobs')
+    status = models.CharField(max_length=20, default='queued', choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ])
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)  # Earliest time a worker may claim the job
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='enrichment_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Enrichment job {self.pk} for {self.cdr_id} ({self.status})"
+
+
+class IngestionRun(models.Model):
+    fingerprint = models.CharField(max_length=64, unique=True)  # Sampled hash used to recognise a re-submitted file
+    content_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of the whole file, set once fully ingested
+    file_name = models.CharField(max_length=255)
+    file_size = models.BigIntegerField()
+    status = models.CharField(max_length=20, default='running', choices=[
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+        ('completed', 'Completed'),
+    ])
+    byte_offset = models.BigIntegerField(default=0)  # End of the last committed chunk
+    prefix_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of the file up to byte_offset
+    rows_committed = models.BigIntegerField(default=0)
+    chunks_committed = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Ingestion of {self.file_name} ({self.status}, {self.rows_committed} rows)"
+
+
+class SuspectClassification(models.Model):
+    # Zero-shot suspect/normal results keyed by what produced them, so the
+    # same note is never sent through the classifier twice.
+    text_hash = models.CharField(max_length=64)  # SHA-256 of the classified text
+    model_name = models.CharField(max_length=200)
+    labels_key = models.CharField(max_length=64)  # SHA-256 of the candidate labels
+    label = models.CharField(max_length=50)
+    score = models.FloatField()
+    is_suspect = models.BooleanField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['text_hash', 'model_name', 'labels_key'], name='unique_suspect_classification'),
+        ]
+
+    def __str__(self):
+        return f"{self.text_hash[:12]} → {self.label} ({self.model_name})"
+
+
+class AudioAnalysis(models.Model):
+    # Transcript and enrichment results for a recording, keyed by the hash of
+    # its bytes and the speech model, so a recording uploaded again is not
+    # run through the models a second time.
+    audio_hash = models.CharField(max_length=64)  # SHA-256 of the audio file
+    model_name = models.CharField(max_length=200)  # Speech recognition model
+    transcript = models.TextField()
+    speech_ratio = models.FloatField(blank=True, null=True)
+    # Models that produced the fields below; they are only reused while
+    # these still match the configured models.
+    enrichment_key = models.CharField(max_length=64, blank=True)
+    sentiment_label = models.CharField(max_length=50, blank=True, null=True)
+    sentiment_score = models.FloatField(blank=True, null=True)
+    summary = models.TextField(blank=True, null=True)
+    is_suspect = models.BooleanField(blank=True, null=True)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['audio_hash', 'model_name'], name='unique_audio_analysis'),
+        ]
+
+    def __str__(self):
+        return f"{self.audio_hash[:12]} ({self.model_name}, {self.hits} hits)"
+
+
+class ReenrichmentCursor(models.Model):
+    # Progress of `manage.py reenrich` through the records, so an
+    # interrupted run continues after the last record it finished.
+    name = models.CharField(max_length=100, unique=True)
+    models_key = models.CharField(max_length=64)  # Hash of the model ids being brought up to date
+    last_id = models.BigIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Re-enrichment {self.name} (after id {self.last_id}, {self.processed} processed)"
+
+
+class CallRollup(models.Model):
+    # Pre-aggregated call counts for the dashboard, kept current by
+    # cdr_app.rollups as records are ingested, enriched, edited or deleted.
+    granularity = models.CharField(max_length=10, choices=[
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ])
+    bucket = models.DateTimeField()  # Start of the hour or day (UTC)
+    call_type = models.CharField(max_length=20)
+    call_count = models.BigIntegerField(default=0)
+    total_duration = models.BigIntegerField(default=0)  # Seconds
+    suspect_count = models.BigIntegerField(default=0)
+    positive_count = models.BigIntegerField(default=0)
+    negative_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket', 'call_type'], name='unique_call_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.call_type}: {self.call_count}"
+
+
+class CallEdge(models.Model):
+    # Calls from one number to another on one day (UTC), with numbers in
+    # cdr_app.graph.normalize_number form. The sparse adjacency index behind
+    # the graph analytics, kept current by cdr_app.rollups like CallRollup.
+    # Rows whose calls are all deleted stay behind with a zero count.
+    caller = models.CharField(max_length=32)
+    callee = models.CharField(max_length=32)
+    day = models.DateField()
+    call_count = models.BigIntegerField(default=0)
+    total_duration = models.BigIntegerField(default=0)  # Seconds
+
+    class Meta:
+        constraints = [
+            # Also serves lookups of a number's outgoing calls.
+            models.UniqueConstraint(fields=['caller', 'callee', 'day'], name='unique_call_edge'),
+        ]
+        indexes = [
+            models.Index(fields=['callee', 'day'], name='call_edge_callee_day_idx'),
+            models.Index(fields=['day'], name='call_edge_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.caller} -> {self.callee} on {self.day}: {self.call_count}"
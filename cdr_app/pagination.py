@@ -0,0 +1,115 @@
+import base64
+import binascii
+import json
+import operator
+from dataclasses import dataclass
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str = None
+    previous_cursor: str = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _split(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def encode_cursor(obj, ordering):
+    values = [getattr(obj, name) for name, _ in _split(ordering)]
+    payload = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+    fields = _split(ordering)
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor(cursor)
+    decoded = []
+    for (name, _), value in zip(fields, values):
+        try:
+            decoded.append(model._meta.get_field(name).to_python(value))
+        except FieldDoesNotExist:
+            # Annotations (e.g. a search rank) are plain JSON scalars.
+            decoded.append(value)
+        except ValidationError as exc:
+            raise InvalidCursor(cursor) from exc
+    return decoded
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """Build the filter selecting rows that sort strictly after ``values``
+    under ``ordering`` (or strictly before them when ``reverse`` is set).
+
+    For ``(-a, -b)`` this is ``a <= x AND (a < x OR (a = x AND b < y))``.
+    The redundant leading bound lets the database answer it with a range
+    scan of an index on ``(a, b)`` that stops after the page is filled.
+    """
+    fields = _split(ordering)
+    conditions = []
+    equal = Q()
+    for (name, descending), value in zip(fields, values):
+        lookup = 'lt' if descending != reverse else 'gt'
+        conditions.append(equal & Q(**{f'{name}__{lookup}': value}))
+        equal &= Q(**{name: value})
+    condition = reduce(operator.or_, conditions)
+    if len(fields) > 1:
+        name, descending = fields[0]
+        lookup = 'lte' if descending != reverse else 'gte'
+        condition = Q(**{f'{name}__{lookup}': values[0]}) & condition
+    return condition
+
+
+def _reversed(ordering):
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+
+def paginate(queryset, ordering, page_size, after=None, before=None):
+    """Return one page of ``queryset`` ordered by ``ordering``.
+
+    ``ordering`` must end in a unique column so that every row has a distinct
+    position. ``after``/``before`` are cursors returned by a previous page;
+    fetching any page costs one index range scan of ``page_size + 1`` rows.
+    """
+    model = queryset.model
+    backwards = bool(before) and not after
+    cursor = after or before
+    if cursor:
+        values = decode_cursor(cursor, model, ordering)
+        queryset = queryset.filter(keyset_filter(ordering, values, reverse=backwards))
+    queryset = queryset.order_by(*(_reversed(ordering) if backwards else ordering))
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    page = KeysetPage(rows)
+    if rows:
+        if has_more or backwards:
+            page.next_cursor = encode_cursor(rows[-1], ordering)
+        if (has_more and backwards) or (cursor and not backwards):
+            page.previous_cursor = encode_cursor(rows[0], ordering)
+    return page
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CallDetailRecord, ReenrichmentCursor
+
+logger = logging.getLogger(__name__)
+
+NLP_MODEL_FIELDS = ('sentiment_model', 'summary_model', 'suspect_model')
+
+
+@dataclass
+class ReenrichResult:
+    processed: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    resumed_after_id: int = 0
+
+    @property
+    def records_per_second(self):
+        return self.processed / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        resumed = f", resumed after id {self.resumed_after_id}" if self.resumed_after_id else ""
+        return (
+            f"{self.processed} records in {self.batches} batches, {self.seconds:.1f}s "
+            f"({self.records_per_second:,.1f} records/s){resumed}"
+        )
+
+
+def _differs(field, value):
+    # "IS NULL OR < OR >" rather than "<>": each arm is a range scan on the
+    # field's index, which PostgreSQL combines with a bitmap OR. Enriched
+    # records from before the model fields existed have them NULL.
+    return (
+        Q(**{f'{field}__isnull': True}) |
+        Q(**{f'{field}__lt': value}) |
+        Q(**{f'{field}__gt': value})
+    )
+
+
+def stale_transcript_q(models):
+    # Only transcripts the speech model produced are redone; notes on records
+    # without a transcript_model were typed or imported.
+    current = models['transcript_model']
+    return (
+        Q(call_recording__gt='', transcript_model__isnull=False) &
+        (Q(transcript_model__lt=current) | Q(transcript_model__gt=current))
+    )
+
+
+def stale_q(models):
+    """Enriched records with a field produced by a model other than the one
+    in ``models`` (a mapping of model field to current model id), or by an
+    unrecorded one. Records still pending, queued or running belong to the
+    job queue."""
+    q = stale_transcript_q(models)
+    for field in NLP_MODEL_FIELDS:
+        q |= _differs(field, models[field])
+    return Q(enrichment_status='done') & q
+
+
+def _models_key(models):
+    return hashlib.sha256(json.dumps(models, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _cursor(name, models, restart):
+    cursor, _ = ReenrichmentCursor.objects.get_or_create(name=name, defaults={'models_key': _models_key(models)})
+    # A run towards a different set of models, or a finished one, starts over.
+    if restart or cursor.models_key != _models_key(models) or cursor.completed_at:
+        cursor.models_key = _models_key(models)
+        cursor.last_id = 0
+        cursor.processed = 0
+        cursor.completed_at = None
+        cursor.save()
+    return cursor
+
+
+def reenrich(batch_size=100, max_rate=None, limit=None, name='default', restart=False, inference_batch_size=None,
+             progress=None):
+    """Bring stale records up to date with the configured models, running
+    only the stages whose model changed.
+
+    Records are walked in id order in batches of ``batch_size``, and the
+    last finished id is saved after each batch so an interrupted run picks
+    up where it stopped. ``max_rate`` caps the records processed per second
+    so the run can share the database and CPU with live traffic; ``limit``
+    stops after that many records.
+    """
+    from .inference import current_models, enrich_records
+
+    models = current_models()
+    stale = stale_q(models)
+    cursor = _cursor(name, models, restart)
+    result = ReenrichResult(resumed_after_id=cursor.last_id)
+    started = time.perf_counter()
+
+    while limit is None or result.processed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - result.processed)
+        cdrs = list(CallDetailRecord.objects.filter(stale, id__gt=cursor.last_id).order_by('id')[:size])
+        if not cdrs:
+            cursor.completed_at = timezone.now()
+            cursor.save(update_fields=['completed_at', 'updated_at'])
+            break
+        enrich_records(cdrs, inference_batch_size, only_stale=True)
+
+        cursor.last_id = cdrs[-1].id
+        cursor.processed += len(cdrs)
+        cursor.save(update_fields=['last_id', 'processed', 'updated_at'])
+        result.processed += len(cdrs)
+        result.batches += 1
+        result.seconds = time.perf_counter() - started
+        if progress:
+            progress(result)
+
+        if max_rate:
+            # Sleep off whatever the batch finished ahead of the allowed rate.
+            ahead = result.processed / max_rate - (time.perf_counter() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    result.seconds = time.perf_counter() - started
+    logger.info("Re-enrichment %s: %s", name, result)
+    return result
+
+
+def count_stale():
+    from .inference import current_models
+
+    return CallDetailRecord.objects.filter(stale_q(current_models())).count()
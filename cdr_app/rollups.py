@@ -0,0 +1,202 @@
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+
+from .caching import invalidate_cached_data
+from .graph import normalize_number
+from .models import CallDetailRecord, CallEdge, CallRollup
+
+# Record fields that contribute to the rollups and the call edges.
+ROLLUP_FIELDS = (
+    'call_type', 'call_start_time', 'call_end_time', 'is_suspect', 'sentiment_label',
+    'caller_number', 'callee_number',
+)
+METRICS = ('call_count', 'total_duration', 'suspect_count', 'positive_count', 'negative_count')
+GRANULARITIES = ('hour', 'day')
+EDGE_METRICS = ('call_count', 'total_duration')
+
+
+def rollup_row(cdr):
+    return {field: getattr(cdr, field) for field in ROLLUP_FIELDS}
+
+
+def _bucket(value, granularity):
+    value = value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if granularity == 'day' else value
+
+
+def _duration(row):
+    return int((row['call_end_time'] - row['call_start_time']).total_seconds())
+
+
+def _metrics(row):
+    duration = _duration(row)
+    label = (row['sentiment_label'] or '').upper()
+    return (1, duration, int(bool(row['is_suspect'])), int(label == 'POSITIVE'), int(label == 'NEGATIVE'))
+
+
+def contributions(rows, sign=1, deltas=None):
+    """Add (or with ``sign=-1`` subtract) the rollup contribution of each
+    row to ``deltas``, a mapping of (granularity, bucket, call_type) to a
+    list of metric deltas."""
+    if deltas is None:
+        deltas = defaultdict(lambda: [0] * len(METRICS))
+    for row in rows:
+        if row['call_start_time'] is None or row['call_end_time'] is None:
+            continue
+        metrics = _metrics(row)
+        for granularity in GRANULARITIES:
+            delta = deltas[(granularity, _bucket(row['call_start_time'], granularity), row['call_type'])]
+            for i, value in enumerate(metrics):
+                delta[i] += sign * value
+    return deltas
+
+
+def edge_contributions(rows, sign=1, deltas=None):
+    """Like ``contributions``, for the call edges: a mapping of (caller,
+    callee, day) to [call count, duration] deltas."""
+    if deltas is None:
+        deltas = defaultdict(lambda: [0] * len(EDGE_METRICS))
+    for row in rows:
+        if row['call_start_time'] is None or row['call_end_time'] is None:
+            continue
+        caller, callee = normalize_number(row['caller_number']), normalize_number(row['callee_number'])
+        if not caller or not callee:
+            continue
+        delta = deltas[(caller, callee, row['call_start_time'].astimezone(dt_timezone.utc).date())]
+        delta[0] += sign
+        delta[1] += sign * _duration(row)
+    return deltas
+
+
+def _add_counts(model, key_columns, metrics, params):
+    # Multi-row ``INSERT ... VALUES (...), (...) ON CONFLICT DO UPDATE``
+    # adding the metric deltas of ``params`` (keys, then deltas) to the
+    # existing counts (PostgreSQL and SQLite). Rows go in as few statements
+    # as the backend's parameter limit allows, so on PostgreSQL a chunk's
+    # deltas for a table are one statement however many keys they touch.
+    if not params:
+        return
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = key_columns + metrics
+    updates = ', '.join(f"{metric} = {table}.{metric} + EXCLUDED.{metric}" for metric in metrics)
+    placeholders = f"({', '.join(['%s'] * len(columns))})"
+    batch_rows = (connection.features.max_query_params or 65535) // len(columns)
+    with connection.cursor() as cursor:
+        for start in range(0, len(params), batch_rows):
+            batch = params[start:start + batch_rows]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))} "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}",
+                [value for row in batch for value in row],
+            )
+
+
+def apply_deltas(deltas):
+    """Add metric deltas to the rollup rows, creating missing ones."""
+    _add_counts(CallRollup, ('granularity', 'bucket', 'call_type'), METRICS, [
+        (granularity, connection.ops.adapt_datetimefield_value(bucket), call_type, *delta)
+        for (granularity, bucket, call_type), delta in deltas.items()
+        if any(delta)
+    ])
+
+
+def apply_edge_deltas(deltas):
+    """Add call count and duration deltas to the call edges, creating
+    missing ones."""
+    _add_counts(CallEdge, ('caller', 'callee', 'day'), EDGE_METRICS, [
+        (caller, callee, connection.ops.adapt_datefield_value(day), *delta)
+        for (caller, callee, day), delta in deltas.items()
+        if any(delta)
+    ])
+
+
+def record_changes(old_rows, new_rows):
+    """Move the rollups and call edges from the ``old_rows`` state of some
+    records to their ``new_rows`` state. Either side may be empty for
+    inserts and deletes."""
+    old_rows, new_rows = list(old_rows), list(new_rows)
+    deltas = contributions(old_rows, sign=-1)
+    contributions(new_rows, deltas=deltas)
+    apply_deltas(deltas)
+    edges = edge_contributions(old_rows, sign=-1)
+    edge_contributions(new_rows, deltas=edges)
+    apply_edge_deltas(edges)
+
+
+def rebuild_rollups():
+    """Recompute all rollups from the CDR table."""
+    duration = ExpressionWrapper(F('call_end_time') - F('call_start_time'), output_field=DurationField())
+    hourly = (
+        CallDetailRecord.objects.annotate(bucket=TruncHour('call_start_time', tzinfo=dt_timezone.utc))
+        .values('bucket', 'call_type')
+        .annotate(
+            call_count=Count('id'),
+            duration=Sum(duration),
+            suspect_count=Count('id', filter=Q(is_suspect=True)),
+            positive_count=Count('id', filter=Q(sentiment_label__iexact='POSITIVE')),
+            negative_count=Count('id', filter=Q(sentiment_label__iexact='NEGATIVE')),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        CallRollup.objects.all().delete()
+        CallRollup.objects.bulk_create(
+            (
+                CallRollup(
+                    granularity='hour',
+                    bucket=row['bucket'],
+                    call_type=row['call_type'],
+                    call_count=row['call_count'],
+                    total_duration=int(row['duration'].total_seconds()) if row['duration'] else 0,
+                    suspect_count=row['suspect_count'],
+                    positive_count=row['positive_count'],
+                    negative_count=row['negative_count'],
+                )
+                for row in hourly.iterator(chunk_size=5000)
+            ),
+            batch_size=5000,
+        )
+        daily = (
+            CallRollup.objects.filter(granularity='hour')
+            .annotate(day=TruncDay('bucket', tzinfo=dt_timezone.utc))
+            .values('day', 'call_type')
+            .annotate(**{f'sum_{metric}': Sum(metric) for metric in METRICS})
+            .order_by()
+        )
+        CallRollup.objects.bulk_create(
+            [
+                CallRollup(
+                    granularity='day',
+                    bucket=row['day'],
+                    call_type=row['call_type'],
+                    **{metric: row[f'sum_{metric}'] for metric in METRICS},
+                )
+                for row in daily
+            ],
+            batch_size=5000,
+        )
+        invalidate_cached_data()
+    return CallRollup.objects.count()
+
+
+def rebuild_call_edges(chunk_size=50000):
+    """Recompute all call edges from the CDR table. Records are streamed and
+    added ``chunk_size`` at a time, so memory stays flat."""
+    rows = CallDetailRecord.objects.values(
+        'caller_number', 'callee_number', 'call_start_time', 'call_end_time',
+    ).iterator(chunk_size=chunk_size)
+    with transaction.atomic():
+        CallEdge.objects.all().delete()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                apply_edge_deltas(edge_contributions(batch))
+                batch = []
+        apply_edge_deltas(edge_contributions(batch))
+        invalidate_cached_data()
+    return CallEdge.objects.count()
@@ -0,0 +1,43 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+SEARCH_CONFIG = 'english'
+
+
+def _identifier_q(query):
+    # Partial call ID and phone number matches. On PostgreSQL these are served
+    # by the UPPER(...) gin_trgm_ops indexes from migration 0007.
+    return (
+        Q(call_id__icontains=query) |
+        Q(caller_number__icontains=query) |
+        Q(callee_number__icontains=query)
+    )
+
+
+def search_cdrs(queryset, query):
+    """Filter ``queryset`` to records matching ``query`` and annotate each
+    with a ``rank`` (higher is more relevant).
+
+    On PostgreSQL notes, transcripts and summaries are matched through the
+    ``search_vector`` GIN index and ranked with ``ts_rank``, plus the trigram
+    similarity of the best matching identifier. Other backends fall back to
+    unranked ``icontains`` matching.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.filter(_identifier_q(query) | Q(call_notes__icontains=query)).annotate(
+            rank=Value(0.0, output_field=FloatField()),
+        )
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(Q(search_vector=search_query) | _identifier_q(query)).annotate(
+        rank=(
+            Coalesce(SearchRank(F('search_vector'), search_query), Value(0.0)) +
+            Greatest(
+                TrigramSimilarity('call_id', query),
+                TrigramSimilarity('caller_number', query),
+                TrigramSimilarity('callee_number', query),
+            )
+        ),
+    )
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import invalidate_cached_data
+from .models import CallDetailRecord
+from .rollups import ROLLUP_FIELDS, record_changes, rollup_row
+
+# Single-object saves and deletes (forms, admin) keep the rollups current
+# here. Bulk paths (ingestion, enrichment) bypass signals and update the
+# rollups themselves.
+
+
+@receiver(pre_save, sender=CallDetailRecord)
+def remember_rollup_state(sender, instance, **kwargs):
+    instance._rollup_old_rows = []
+    if instance.pk:
+        instance._rollup_old_rows = list(
+            CallDetailRecord.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS)
+        )
+
+
+@receiver(post_save, sender=CallDetailRecord)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_changes(getattr(instance, '_rollup_old_rows', []), [rollup_row(instance)])
+    invalidate_cached_data()
+
+
+@receiver(post_delete, sender=CallDetailRecord)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    record_changes([rollup_row(instance)], [])
+    invalidate_cached_data()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from cdr_app.models import CallDetailRecord
+
+START = datetime(2024, 1, 1, 9, 0, tzinfo=dt_timezone.utc)
+HEADER = 'call_id,caller_number,callee_number,call_start_time,call_end_time,call_type,call_notes\n'
+
+
+def make_cdr(index, start=START, **fields):
+    values = {
+        'call_id': f'call-{index:04d}',
+        'caller_number': '2125550100',
+        'callee_number': '2125550101',
+        'call_start_time': start,
+        'call_end_time': start + timedelta(minutes=2),
+        'call_type': 'incoming',
+    }
+    values.update(fields)
+    return CallDetailRecord.objects.create(**values)
+
+
+def csv_line(index, notes='', minute=0, call_type='incoming'):
+    start = START + timedelta(minutes=minute)
+    end = start + timedelta(seconds=90)
+    return (
+        f'call-{index:04d},2125550100,2125550101,{start:%Y-%m-%d %H:%M:%S},'
+        f'{end:%Y-%m-%d %H:%M:%S},{call_type},{notes}\n'
+    )
+
+
+def write_csv(test_case, lines):
+    """Write a CDR CSV file with ``lines`` after the header; it is removed
+    when ``test_case`` finishes."""
+    handle, path = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(handle, 'w') as fh:
+        fh.write(HEADER + ''.join(lines))
+    test_case.addCleanup(os.remove, path)
+    return path
+
+
+class StatementCounter:
+    """``connection.execute_wrapper`` hook counting the statements sent to
+    the database; ``executemany`` counts once per parameter set, as the
+    driver runs it."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.extend([sql] * (len(params) if many else 1))
+        return execute(sql, params, many, context)
+
+    def count(self, fragment):
+        return sum(fragment in sql for sql in self.statements)
@@ -0,0 +1,61 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from cdr_app import audio_cache
+from cdr_app.metrics import AUDIO_CACHE_REQUESTS, render
+from cdr_app.models import AudioAnalysis
+from cdr_app.transcription import TranscriptionResult
+
+
+class AudioCacheTests(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.write(b'first recording')
+        patcher = mock.patch('cdr_app.audio_cache.transcribe_file', side_effect=self.fake_transcribe)
+        self.transcribe = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, data):
+        with open(self.path, 'wb') as audio_file:
+            audio_file.write(data)
+
+    def fake_transcribe(self, path):
+        with open(path, 'rb') as audio_file:
+            return TranscriptionResult(audio_file.read().decode(), audio_seconds=1.0, processing_seconds=0.1)
+
+    def counts(self):
+        return {result: AUDIO_CACHE_REQUESTS.value(cache='transcript', result=result) for result in ('hit', 'miss')}
+
+    def test_miss_then_hit(self):
+        before = self.counts()
+        entry, hit = audio_cache.transcribe_cached(self.path)
+        self.assertEqual((entry.transcript, hit), ('first recording', False))
+        entry, hit = audio_cache.transcribe_cached(self.path)
+        self.assertEqual((entry.transcript, hit), ('first recording', True))
+        self.assertEqual(self.transcribe.call_count, 1)
+        self.assertEqual(self.counts(), {'hit': before['hit'] + 1, 'miss': before['miss'] + 1})
+        self.assertEqual(audio_cache.stats()['transcript_hits'], before['hit'] + 1)
+        self.assertIn('cdr_audio_cache_requests_total{cache="transcript",result="hit"}', render())
+
+    def test_changed_audio_is_a_new_key(self):
+        first, _ = audio_cache.transcribe_cached(self.path)
+        self.write(b'second recording')
+        before = self.counts()
+        second, hit = audio_cache.transcribe_cached(self.path)
+        self.assertFalse(hit)
+        self.assertNotEqual(first.audio_hash, second.audio_hash)
+        self.assertEqual(second.transcript, 'second recording')
+        self.assertEqual(self.transcribe.call_count, 2)
+        self.assertEqual(self.counts()['miss'], before['miss'] + 1)
+        self.assertEqual(AudioAnalysis.objects.count(), 2)
+
+    def test_enrichment_key_follows_the_models(self):
+        key = audio_cache.enrichment_key(['suspect', 'normal'])
+        self.assertEqual(audio_cache.enrichment_key(['suspect', 'normal']), key)
+        with override_settings(CDR_MODELS={'summarization': 'other/summarizer'}):
+            self.assertNotEqual(audio_cache.enrichment_key(['suspect', 'normal']), key)
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from cdr_app.benchmarking import seed_records, write_synthetic_csv
+from cdr_app.ingest import ingest_csv
+from cdr_app.models import CallDetailRecord
+
+
+class SyntheticDataTests(TestCase):
+    def test_seeded_records_are_enriched_and_continue_numbering(self):
+        seed_records(0, 150, block_size=100)
+        seed_records(150, 50, block_size=100)
+        self.assertEqual(CallDetailRecord.objects.count(), 200)
+        self.assertEqual(CallDetailRecord.objects.values('call_id').distinct().count(), 200)
+        self.assertEqual(
+            set(CallDetailRecord.objects.values_list('enrichment_status', 'is_suspect', 'suspect_reason')),
+            {('done', False, '')},
+        )
+        self.assertTrue(CallDetailRecord.objects.filter(call_id='CALL0000000200').exists())
+        self.assertFalse(CallDetailRecord.objects.filter(call_notes='').exists())
+
+    def test_seeding_is_one_batched_statement_per_block(self):
+        with CaptureQueriesContext(connection) as queries:
+            seed_records(0, 250, block_size=100)
+        # executemany is logged once, as "<n> times: INSERT ...".
+        inserts = [query for query in queries if 'INSERT' in query['sql'] or 'COPY' in query['sql']]
+        self.assertEqual(len(inserts), 3)
+
+    def test_synthetic_csv_is_ingestible(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        write_synthetic_csv(path, 1000, 120)
+        result = ingest_csv(path, chunk_size=50, enrich=False)
+        self.assertEqual((result.rows, result.skipped), (120, 0))
+        self.assertEqual(CallDetailRecord.objects.filter(call_id__startswith='CALL00000010').count(), 99)
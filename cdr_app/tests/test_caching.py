@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from cdr_app.caching import cached_result, data_version
+from cdr_app.inference import enrich_records
+from cdr_app.ingest import ingest_csv
+from cdr_app.models import CallDetailRecord
+
+from .helpers import csv_line, make_cdr, write_csv
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DataVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.computed = 0
+
+    def count_calls(self):
+        self.computed += 1
+        return CallDetailRecord.objects.count()
+
+    def cached_count(self):
+        return cached_result('test_count', {}, self.count_calls)
+
+    def test_result_is_cached_until_data_changes(self):
+        self.assertEqual((self.cached_count(), self.cached_count()), (0, 0))
+        self.assertEqual(self.computed, 1)
+
+    def test_ingest_invalidates_after_commit(self):
+        self.cached_count()
+        version = data_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            ingest_csv(write_csv(self, [csv_line(1, notes='hello'), csv_line(2)]), enrich=False)
+        # Nothing is retired before the rows are visible to other readers.
+        self.assertEqual(data_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(data_version(), version)
+        self.assertEqual(self.cached_count(), 2)
+        self.assertEqual(self.computed, 2)
+
+    def test_enrichment_invalidates(self):
+        cdr = make_cdr(1, call_notes='hello')
+        self.cached_count()
+        patches = [
+            mock.patch('cdr_app.inference.analyze_sentiment_batch', lambda notes, _: [('POSITIVE', 0.9)] * len(notes)),
+            mock.patch('cdr_app.inference.summarize_text_batch', lambda notes, _: ['summary'] * len(notes)),
+            mock.patch('cdr_app.inference.classify_suspect_batch', lambda notes, _: [False] * len(notes)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            enrich_records([cdr])
+        self.cached_count()
+        self.assertEqual(self.computed, 2)
+
+    def test_bookkeeping_update_keeps_cached_results(self):
+        make_cdr(1)
+        self.cached_count()
+        with self.captureOnCommitCallbacks(execute=True):
+            CallDetailRecord.objects.update(enrichment_status='queued')
+        self.cached_count()
+        self.assertEqual(self.computed, 1)
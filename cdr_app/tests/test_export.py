@@ -0,0 +1,94 @@
+import csv
+import importlib.util
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from cdr_app.export import EXPORT_COLUMNS, iter_csv, iter_ndjson, write_parquet
+from cdr_app.models import CallDetailRecord
+
+from .helpers import START, make_cdr
+
+
+def _row(index):
+    start = START + timedelta(minutes=index)
+    values = {
+        'call_id': f'call-{index:04d}', 'caller_number': '2125550100', 'callee_number': '2125550101',
+        'call_start_time': start, 'call_end_time': start + timedelta(seconds=90), 'call_type': 'incoming',
+        'call_notes': f'notes, "quoted" {index}\nsecond line', 'sentiment_label': 'POSITIVE',
+        'sentiment_score': 0.5, 'summary': None, 'is_suspect': index % 2 == 0, 'speech_ratio': None,
+    }
+    return tuple(values[column] for column in EXPORT_COLUMNS)
+
+
+class EncoderTests(SimpleTestCase):
+    rows = [_row(index) for index in range(5)]
+
+    def test_csv_round_trips_in_batches(self):
+        chunks = list(iter_csv(iter(self.rows), batch_size=2))
+        self.assertEqual(len(chunks), 3)
+        parsed = list(csv.reader(io.StringIO(''.join(chunks))))
+        self.assertEqual(parsed[0], list(EXPORT_COLUMNS))
+        self.assertEqual(len(parsed), 6)
+        first = dict(zip(EXPORT_COLUMNS, parsed[1]))
+        self.assertEqual(first['call_notes'], self.rows[0][6])
+        self.assertEqual(first['call_start_time'], START.isoformat())
+        self.assertEqual((first['summary'], first['is_suspect']), ('', 'True'))
+
+    def test_csv_without_rows_is_only_the_header(self):
+        self.assertEqual(''.join(iter_csv(iter([]))), ','.join(EXPORT_COLUMNS) + '\r\n')
+
+    def test_ndjson_is_one_object_per_line_in_batches(self):
+        chunks = list(iter_ndjson(iter(self.rows), batch_size=2))
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [2, 2, 1])
+        objects = [json.loads(line) for line in ''.join(chunks).splitlines()]
+        self.assertEqual([obj['call_id'] for obj in objects], [row[0] for row in self.rows])
+        self.assertEqual(objects[0]['call_start_time'], '2024-01-01T09:00:00Z')
+        self.assertIsNone(objects[0]['summary'])
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        CallDetailRecord.objects.bulk_create([
+            CallDetailRecord(**dict(zip(EXPORT_COLUMNS, _row(index)))) for index in range(501)
+        ])
+
+    def test_csv_is_streamed_in_chunks(self):
+        response = self.client.get(reverse('cdr_export'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="cdrs.csv"', response['Content-Disposition'])
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(len(list(csv.reader(io.StringIO(''.join(chunks))))), 502)
+
+    def test_filters_apply_to_ndjson(self):
+        response = self.client.get(reverse('cdr_export'), {'format': 'ndjson', 'suspect': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 251)
+        self.assertTrue(all(json.loads(line)['is_suspect'] for line in lines))
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('cdr_export'), {'format': 'xlsx'}).status_code, 400)
+
+
+@unittest.skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+class ParquetExportTests(TestCase):
+    def test_rows_are_partitioned_by_start_date(self):
+        import pyarrow.parquet as pq
+
+        for index in range(3):
+            make_cdr(index, start=START + timedelta(hours=10 * index))
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.assertEqual(write_parquet({}, directory, chunk_size=1), 3)
+        table = pq.read_table(directory)
+        self.assertEqual(sorted(table.column('call_id').to_pylist()), ['call-0000', 'call-0001', 'call-0002'])
+        self.assertEqual(pq.read_table(f'{directory}/date=2024-01-02').num_rows, 1)
@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from scripts.generate_csv import COLUMNS, generate
+
+
+class GenerateCsvTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_single_shard_into_a_new_directory(self):
+        output = os.path.join(self.directory, 'data') + os.sep
+        paths = generate(10, output, processes=1)
+        self.assertEqual(paths, [os.path.join(output, 'part-00000.csv')])
+        self.assertEqual(len(pd.read_csv(paths[0])), 10)
+
+    def test_single_shard_into_a_file_in_a_new_directory(self):
+        output = os.path.join(self.directory, 'nested', 'calls.csv')
+        self.assertEqual(generate(5, output, processes=1), [output])
+        self.assertEqual(len(pd.read_csv(output)), 5)
+
+    def test_every_shard_file_is_written_even_without_rows(self):
+        paths = generate(2, self.directory, shards=4, processes=1)
+        frames = [pd.read_csv(path) for path in paths]
+        self.assertEqual([len(frame) for frame in frames], [0, 1, 0, 1])
+        self.assertTrue(all(list(frame.columns) == COLUMNS for frame in frames))
+        self.assertEqual(pd.concat(frames)['call_id'].tolist(), ['CALL001', 'CALL002'])
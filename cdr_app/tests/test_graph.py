@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from cdr_app.inference import enrich_records
+from cdr_app.ingest import ingest_csv
+from cdr_app.models import CallEdge
+from cdr_app.rollups import rebuild_call_edges
+
+from .helpers import START, StatementCounter, make_cdr, write_csv
+
+
+class SuspectReasonTests(TestCase):
+    def test_reason_separates_notes_and_calling_pattern(self):
+        # The first caller rings many numbers that never call back.
+        dialler = [make_cdr(i, callee_number=f'31055501{i:02d}', call_notes='hello') for i in range(60)]
+        other = make_cdr(100, caller_number='4155550100', call_notes='send the gift cards')
+        patches = [
+            mock.patch('cdr_app.inference.analyze_sentiment_batch', lambda notes, _: [('NEUTRAL', 0.5)] * len(notes)),
+            mock.patch('cdr_app.inference.summarize_text_batch', lambda notes, _: [''] * len(notes)),
+            mock.patch('cdr_app.inference.classify_suspect_batch', lambda notes, _: [n != 'hello' for n in notes]),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        enrich_records([dialler[0], other])
+        dialler[0].refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((dialler[0].is_suspect, dialler[0].suspect_reason), (True, 'calling_pattern'))
+        self.assertEqual((other.is_suspect, other.suspect_reason), (True, 'notes'))
+
+
+def _fan_out_lines(count, offset=0, exchange='31055'):
+    end = START.replace(minute=2)
+    return [
+        f'edge-{offset + i:04d},2125550100,{exchange}{offset + i:05d},{START:%Y-%m-%d %H:%M:%S},'
+        f'{end:%Y-%m-%d %H:%M:%S},outgoing,\n'
+        for i in range(count)
+    ]
+
+
+class CallEdgeMaintenanceTests(TestCase):
+    def test_one_edge_upsert_per_chunk(self):
+        counter = StatementCounter()
+        path = write_csv(self, _fan_out_lines(200))
+        with connection.execute_wrapper(counter):
+            result = ingest_csv(path, chunk_size=100, enrich=False)
+        self.assertEqual(result.chunks, 2)
+        self.assertEqual(counter.count('INSERT INTO "cdr_app_calledge"'), 2)
+        self.assertEqual(CallEdge.objects.count(), 200)
+
+    def test_maintained_edges_match_rebuild(self):
+        ingest_csv(write_csv(self, _fan_out_lines(30)), enrich=False)
+        # Re-ingesting moves some calls to other callees.
+        ingest_csv(write_csv(self, _fan_out_lines(10, offset=25, exchange='41555')), enrich=False)
+        maintained = set(CallEdge.objects.filter(call_count__gt=0).values_list('caller', 'callee', 'day', 'call_count'))
+        rebuild_call_edges()
+        self.assertEqual(maintained, set(CallEdge.objects.values_list('caller', 'callee', 'day', 'call_count')))
@@ -0,0 +1,145 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from cdr_app.inference import (
+    NO_TRANSCRIPTION, analyze_sentiment_batch, classify_suspect_batch, summarize_text_batch,
+)
+from cdr_app.model_registry import model_id
+from cdr_app.models import SuspectClassification
+
+
+class FakePipeline:
+    """Records the batches it is called with and labels each text with its
+    length, so results can be traced back to their inputs."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, batch_size=None, **kwargs):
+        self.batches.append(list(texts))
+        return [{'label': f'len{len(text)}', 'score': len(text) / 100} for text in texts]
+
+
+class BatchedInferenceTests(SimpleTestCase):
+    texts = ['a' * 9, 'a' * 2, '', 'a' * 5, None, 'a' * 7, 'a' * 1]
+
+    def test_results_are_in_input_order(self):
+        results = analyze_sentiment_batch(self.texts, batch_size=2, pipe=FakePipeline())
+        expected = [(f'len{len(text)}', len(text) / 100) if text else ('N/A', 0.0) for text in self.texts]
+        self.assertEqual(results, expected)
+
+    def test_batches_are_length_sorted_and_skip_empty_texts(self):
+        pipe = FakePipeline()
+        analyze_sentiment_batch(self.texts, batch_size=2, pipe=pipe)
+        self.assertEqual([[len(text) for text in batch] for batch in pipe.batches], [[1, 2], [5, 7], [9]])
+
+    @override_settings(CDR_INFERENCE_BATCH_SIZE=3)
+    def test_batch_size_defaults_to_setting(self):
+        pipe = FakePipeline()
+        analyze_sentiment_batch(self.texts, pipe=pipe)
+        self.assertEqual([len(batch) for batch in pipe.batches], [3, 2])
+
+    def test_no_texts_runs_no_batches(self):
+        pipe = FakePipeline()
+        self.assertEqual(analyze_sentiment_batch(['', None], pipe=pipe), [('N/A', 0.0)] * 2)
+        self.assertEqual(pipe.batches, [])
+
+
+class FakeZeroShot:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts, batch_size=None, candidate_labels=None):
+        self.texts.extend(texts)
+        return [
+            {'labels': ['suspect', 'normal'] if 'gift card' in text else ['normal', 'suspect'], 'scores': [0.9, 0.1]}
+            for text in texts
+        ]
+
+
+class SuspectClassificationCacheTests(TestCase):
+    def setUp(self):
+        self.pipe = FakeZeroShot()
+        patch = mock.patch('cdr_app.inference.get_pipeline', lambda task: self.pipe)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_cached_texts_are_not_classified_again(self):
+        texts = ['pay by gift card', 'about my bill', '', 'pay by gift card']
+        self.assertEqual(classify_suspect_batch(texts), [True, False, False, True])
+        # Repeated texts are classified once.
+        self.assertEqual(self.pipe.texts, ['about my bill', 'pay by gift card'])
+        self.assertEqual(SuspectClassification.objects.count(), 2)
+
+        self.assertEqual(classify_suspect_batch(['about my bill', 'new gift card text']), [False, True])
+        self.assertEqual(self.pipe.texts[2:], ['new gift card text'])
+
+    def test_cache_is_keyed_by_model(self):
+        classify_suspect_batch(['pay by gift card'])
+        with override_settings(CDR_MODELS={'zero-shot-classification': 'another/model'}):
+            classify_suspect_batch(['pay by gift card'])
+        classify_suspect_batch(['pay by gift card'])
+        self.assertEqual(len(self.pipe.texts), 2)
+        self.assertCountEqual(
+            SuspectClassification.objects.values_list('model_name', flat=True),
+            [model_id('zero-shot-classification'), 'another/model'],
+        )
+
+
+class WordTokenizer:
+    """One token per word: ``w<n>`` is token ``n``."""
+    model_max_length = 1024
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=True, verbose=True):
+        return {'input_ids': [[int(word[1:]) for word in text.split()] for text in texts]}
+
+    def batch_decode(self, sequences, skip_special_tokens=False):
+        return [' '.join(f'w{token}' for token in ids) for ids in sequences]
+
+
+class FakeSummarizer:
+    """Summarizes a chunk as its first word and records every chunk."""
+
+    def __init__(self):
+        self.tokenizer = WordTokenizer()
+        self.rounds = []
+
+    def __call__(self, texts, batch_size=None, **kwargs):
+        self.rounds.append(list(texts))
+        return [{'summary_text': text.split()[0]} for text in texts]
+
+
+def words(start, count):
+    return ' '.join(f'w{n}' for n in range(start, start + count))
+
+
+@override_settings(CDR_SUMMARY_CHUNK_TOKENS=300)
+class MapReduceSummaryTests(SimpleTestCase):
+    def test_text_that_fits_one_chunk_is_summarized_once(self):
+        pipe = FakeSummarizer()
+        self.assertEqual(summarize_text_batch([words(0, 300), ''], pipe=pipe), ['w0', NO_TRANSCRIPTION])
+        self.assertEqual(pipe.rounds, [[words(0, 300)]])
+
+    def test_long_text_is_chunked_at_the_token_limit_and_reduced(self):
+        pipe = FakeSummarizer()
+        self.assertEqual(summarize_text_batch([words(0, 301)], pipe=pipe), ['w0'])
+        # Chunks are batched shortest first.
+        self.assertEqual(pipe.rounds, [[words(300, 1), words(0, 300)], ['w0 w300']])
+
+    def test_chunks_of_all_texts_share_batches(self):
+        pipe = FakeSummarizer()
+        summaries = summarize_text_batch([words(0, 650), words(1000, 10)], batch_size=16, pipe=pipe)
+        self.assertEqual(summaries, ['w0', 'w1000'])
+        self.assertCountEqual(pipe.rounds[0], [words(0, 300), words(300, 300), words(600, 50), words(1000, 10)])
+        self.assertEqual(pipe.rounds[1:], [['w0 w300 w600']])
+
+    @override_settings(CDR_SUMMARY_CHUNK_TOKENS=None)
+    def test_chunk_limit_defaults_to_the_model_input_length(self):
+        pipe = FakeSummarizer()
+        # 1024 tokens, less 2 special tokens and a margin of 8.
+        summarize_text_batch([words(0, 1015)], pipe=pipe)
+        self.assertEqual([len(chunk.split()) for chunk in pipe.rounds[0]], [1, 1014])
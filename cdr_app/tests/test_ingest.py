@@ -0,0 +1,94 @@
+import io
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from cdr_app.ingest import ingest_csv, iter_raw_chunks, upsert_records
+from cdr_app.models import CallDetailRecord, IngestionRun
+
+from .helpers import HEADER, csv_line, write_csv
+
+
+class RawChunkTests(SimpleTestCase):
+    def test_chunks_end_on_record_boundaries(self):
+        lines = [
+            b'1,"plain"\n',
+            b'2,"spans\nthree\nlines"\n',
+            b'3,"a ""quoted"" word\nand a break"\n',
+            b'4,last\n',
+        ]
+        data = b''.join(lines)
+        chunks = list(iter_raw_chunks(io.BytesIO(data), 2))
+        self.assertEqual([chunk for chunk, _, _ in chunks], [lines[0] + lines[1], lines[2] + lines[3]])
+        self.assertEqual([rows for _, _, rows in chunks], [2, 2])
+        self.assertEqual([offset for _, offset, _ in chunks], [len(lines[0] + lines[1]), len(data)])
+
+
+class IngestResumeTests(TestCase):
+    def setUp(self):
+        self.lines = [csv_line(i, notes='"first line\nsecond line"' if i == 3 else f'note {i}') for i in range(10)]
+        self.path = write_csv(self, self.lines)
+
+    def _fail_on_third_chunk(self):
+        with mock.patch('cdr_app.ingest.upsert_records', side_effect=_failing_upsert(3)):
+            with self.assertRaises(RuntimeError):
+                ingest_csv(self.path, chunk_size=3, enrich=False)
+
+    def _rewrite(self, lines):
+        with open(self.path, 'w') as fh:
+            fh.write(HEADER + ''.join(lines))
+
+    def test_resumes_after_last_committed_chunk(self):
+        self._fail_on_third_chunk()
+        run = IngestionRun.objects.get()
+        self.assertEqual((run.status, run.rows_committed, run.chunks_committed), ('failed', 6, 2))
+        self.assertEqual(CallDetailRecord.objects.count(), 6)
+
+        statuses = []
+        result = ingest_csv(
+            self.path, chunk_size=3, enrich=False,
+            progress=lambda _: statuses.append(IngestionRun.objects.get().status),
+        )
+        self.assertEqual((result.resumed_from_row, result.rows), (6, 4))
+        self.assertEqual(set(statuses), {'running'})
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.rows_committed), ('completed', 10))
+        self.assertEqual(run.prefix_hash, run.content_hash)
+        self.assertEqual(CallDetailRecord.objects.get(call_id='call-0003').call_notes, 'first line\nsecond line')
+
+        self.assertTrue(ingest_csv(self.path, enrich=False).already_ingested)
+
+    def test_changed_prefix_is_ingested_from_the_start(self):
+        self._fail_on_third_chunk()
+        fingerprint = IngestionRun.objects.get().fingerprint
+        # A longer first record moves every later record boundary.
+        self._rewrite([csv_line(0, notes='note 0 (corrected)')] + self.lines[1:])
+        with mock.patch('cdr_app.ingest.file_fingerprint', return_value=fingerprint):
+            result = ingest_csv(self.path, chunk_size=3, enrich=False)
+        self.assertEqual(result.resumed_from_row, 0)
+        self.assertEqual((result.rows, result.skipped), (10, 0))
+        self.assertEqual(CallDetailRecord.objects.count(), 10)
+        self.assertEqual(CallDetailRecord.objects.get(call_id='call-0000').call_notes, 'note 0 (corrected)')
+
+    def test_changed_file_with_same_fingerprint_is_ingested_again(self):
+        ingest_csv(self.path, enrich=False)
+        self._rewrite([line.replace('note 5', 'note X') for line in self.lines])
+        # Every byte of a file this small is sampled, so pretend the change
+        # fell between the samples.
+        fingerprint = IngestionRun.objects.get().fingerprint
+        with mock.patch('cdr_app.ingest.file_fingerprint', return_value=fingerprint):
+            result = ingest_csv(self.path, enrich=False)
+        self.assertFalse(result.already_ingested)
+        self.assertEqual(CallDetailRecord.objects.get(call_id='call-0005').call_notes, 'note X')
+
+
+def _failing_upsert(failing_call):
+    calls = []
+
+    def upsert(records):
+        calls.append(records)
+        if len(calls) == failing_call:
+            raise RuntimeError("database went away")
+        return upsert_records(records)
+
+    return upsert
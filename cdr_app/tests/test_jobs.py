@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from cdr_app.ingest import ingest_csv
+from cdr_app.jobs import claim_jobs, enqueue_enrichment, run_jobs
+from cdr_app.models import CallDetailRecord, CallRollup, EnrichmentJob
+
+from .helpers import csv_line, make_cdr, write_csv
+
+
+def _label(notes):
+    return [('POSITIVE' if text == 'new notes' else 'NEGATIVE', 0.9) for text in notes]
+
+
+class EnrichmentJobTests(TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch('cdr_app.inference.analyze_sentiment_batch', self._sentiment),
+            mock.patch('cdr_app.inference.summarize_text_batch', lambda notes, _: ['summary'] * len(notes)),
+            mock.patch('cdr_app.inference.classify_suspect_batch', lambda notes, _: [False] * len(notes)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.during_inference = None
+
+    def _sentiment(self, notes, batch_size):
+        if self.during_inference:
+            self.during_inference()
+            self.during_inference = None
+        return _label(notes)
+
+    def test_queued_job_is_not_duplicated(self):
+        cdr = make_cdr(1, call_notes='old notes')
+        self.assertEqual(enqueue_enrichment([cdr.id]), 1)
+        self.assertEqual(enqueue_enrichment([cdr.id]), 0)
+
+    def test_notes_ingested_while_job_runs_are_kept_and_reenriched(self):
+        cdr = make_cdr(1, call_notes='old notes')
+        enqueue_enrichment([cdr.id])
+        jobs = claim_jobs('worker-1', 10)
+        claimed_meanwhile = []
+
+        def ingest_new_notes():
+            ingest_csv(write_csv(self, [csv_line(1, notes='new notes')]))
+            claimed_meanwhile.extend(claim_jobs('worker-2', 10))
+
+        self.during_inference = ingest_new_notes
+        run_jobs(jobs)
+
+        # The new job waits for the running one instead of running alongside it.
+        self.assertEqual(claimed_meanwhile, [])
+        cdr.refresh_from_db()
+        self.assertEqual((cdr.call_notes, cdr.sentiment_label), ('new notes', 'NEGATIVE'))
+        self.assertEqual(cdr.enrichment_status, 'queued')
+        self.assertEqual(EnrichmentJob.objects.filter(cdr=cdr, status='queued').count(), 1)
+
+        run_jobs(claim_jobs('worker-1', 10))
+        cdr.refresh_from_db()
+        self.assertEqual((cdr.call_notes, cdr.sentiment_label), ('new notes', 'POSITIVE'))
+        self.assertEqual(cdr.enrichment_status, 'done')
+        self.assertFalse(EnrichmentJob.objects.exclude(status='done').exists())
+
+    def test_rollups_follow_rows_changed_during_inference(self):
+        cdr = make_cdr(1, call_notes='new notes')
+        enqueue_enrichment([cdr.id])
+        jobs = claim_jobs('worker-1', 10)
+        self.during_inference = lambda: ingest_csv(
+            write_csv(self, [csv_line(1, notes='new notes', minute=24 * 60)]), enrich=False,
+        )
+        run_jobs(jobs)
+        cdr = CallDetailRecord.objects.get(pk=cdr.pk)
+        day = CallRollup.objects.get(granularity='day', bucket__date=cdr.call_start_time.date())
+        self.assertEqual((day.call_count, day.positive_count), (1, 1))
+        self.assertFalse(CallRollup.objects.exclude(pk=day.pk).filter(granularity='day', call_count__gt=0).exists())
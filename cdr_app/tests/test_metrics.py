@@ -0,0 +1,86 @@
+import io
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from cdr_app import metrics
+from cdr_app.jobs import enqueue_enrichment
+from cdr_app.metrics import REQUEST_DB_QUERIES
+
+from .helpers import make_cdr
+
+
+class MetricsViewTests(SimpleTestCase):
+    @override_settings(CDR_METRICS_TOKEN='')
+    def test_local_scraper_without_token(self):
+        self.assertEqual(self.client.get(reverse('cdr_metrics')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('cdr_metrics'), REMOTE_ADDR='10.0.0.5').status_code, 403)
+
+    @override_settings(CDR_METRICS_TOKEN='s3cret')
+    def test_token_required_when_configured(self):
+        url = reverse('cdr_metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    def _db_query_observations(self):
+        return sum(state[2] for state in REQUEST_DB_QUERIES._values.values())
+
+    @override_settings(CDR_PROFILE_QUERIES=False)
+    def test_queries_not_timed_by_default(self):
+        before = self._db_query_observations()
+        self.client.get(reverse('cdr_metrics'))
+        self.assertEqual(self._db_query_observations(), before)
+
+    @override_settings(CDR_PROFILE_QUERIES=True)
+    def test_queries_timed_when_enabled(self):
+        before = self._db_query_observations()
+        self.client.get(reverse('cdr_metrics'))
+        self.assertEqual(self._db_query_observations(), before + 1)
+
+
+class WorkerMetricsTests(TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch('cdr_app.inference.analyze_sentiment_batch', lambda notes, _: [('POSITIVE', 0.9)] * len(notes)),
+            mock.patch('cdr_app.inference.summarize_text_batch', lambda notes, _: ['summary'] * len(notes)),
+            mock.patch('cdr_app.inference.classify_suspect_batch', lambda notes, _: [False] * len(notes)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_worker(self, *args):
+        servers = []
+        original = metrics.serve
+
+        def serve(*serve_args):
+            servers.append(original(*serve_args))
+            self.addCleanup(servers[-1].server_close)
+            self.addCleanup(servers[-1].shutdown)
+            return servers[-1]
+        with mock.patch('cdr_app.metrics.serve', serve):
+            call_command('run_enrichment_worker', '--once', '--metrics-port', '0', *args, stdout=io.StringIO())
+        return f'http://127.0.0.1:{servers[0].server_port}/metrics'
+
+    def test_worker_serves_inference_metrics(self):
+        enqueue_enrichment([make_cdr(1, call_notes='hello').id])
+        url = self.run_worker()
+        with urlopen(url) as response:
+            self.assertEqual(response.headers['Content-Type'], metrics.CONTENT_TYPE)
+            body = response.read().decode()
+        self.assertIn('cdr_inference_duration_seconds_count{stage="sentiment"}', body)
+        self.assertIn('cdr_inference_items_total{stage="summarization"}', body)
+
+    @override_settings(CDR_METRICS_TOKEN='s3cret')
+    def test_worker_metrics_need_the_token_when_configured(self):
+        url = self.run_worker()
+        with self.assertRaises(HTTPError) as error:
+            urlopen(url)
+        error.exception.close()
+        with urlopen(Request(url, headers={'Authorization': 'Bearer s3cret'})) as response:
+            self.assertEqual(response.status, 200)
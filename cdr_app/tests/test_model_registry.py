@@ -0,0 +1,104 @@
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from cdr_app import model_registry
+from cdr_app.model_registry import ModelRegistry
+
+MB = 1024 * 1024
+SIZES = {'sentiment-analysis': 40 * MB, 'summarization': 50 * MB, 'zero-shot-classification': 30 * MB}
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.loads = []
+
+        def load(task, model):
+            self.loads.append(task)
+            return SimpleNamespace(task=task, size=SIZES[task], model=SimpleNamespace(name_or_path=f'{task}-model'))
+        patches = [
+            mock.patch.dict(model_registry.LOADERS, {'torch': load}),
+            mock.patch.object(model_registry, '_pipeline_size_bytes', lambda pipe: pipe.size),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_each_model_loads_once(self):
+        registry = ModelRegistry()
+        first = registry.get('sentiment-analysis', backend='torch')
+        self.assertIs(registry.get('sentiment-analysis', backend='torch'), first)
+        self.assertEqual(self.loads, ['sentiment-analysis'])
+        self.assertEqual(registry.stats()[0].uses, 2)
+
+    def test_least_recently_used_model_is_evicted_over_budget(self):
+        registry = ModelRegistry(memory_budget_bytes=100 * MB)
+        registry.get('sentiment-analysis', backend='torch')
+        registry.get('summarization', backend='torch')
+        # Using sentiment again makes summarization the least recently used.
+        registry.get('sentiment-analysis', backend='torch')
+        registry.get('zero-shot-classification', backend='torch')
+        self.assertEqual(
+            [stats.task for stats in registry.stats()], ['sentiment-analysis', 'zero-shot-classification'],
+        )
+        self.assertEqual(registry.resident_bytes(), 70 * MB)
+
+    def test_evicted_model_is_reloaded_on_next_use(self):
+        registry = ModelRegistry(memory_budget_bytes=60 * MB)
+        registry.get('sentiment-analysis', backend='torch')
+        registry.get('summarization', backend='torch')
+        registry.get('sentiment-analysis', backend='torch')
+        self.assertEqual(self.loads, ['sentiment-analysis', 'summarization', 'sentiment-analysis'])
+        self.assertEqual([stats.task for stats in registry.stats()], ['sentiment-analysis'])
+
+    def test_model_over_budget_on_its_own_is_kept(self):
+        registry = ModelRegistry(memory_budget_bytes=10 * MB)
+        pipe = registry.get('summarization', backend='torch')
+        self.assertIs(registry.get('summarization', backend='torch'), pipe)
+        self.assertEqual(self.loads, ['summarization'])
+
+
+class FakeOrtPipeline(SimpleNamespace):
+    def __init__(self, model):
+        saver = SimpleNamespace(save_pretrained=self.save)
+        super().__init__(model=saver, tokenizer=saver, feature_extractor=None, source=model)
+
+    def save(self, directory):
+        (directory / 'model.onnx').write_text(self.source)
+
+
+class OnnxExportCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+
+        def pipeline(task, model, accelerator, revision=None):
+            self.calls.append(model)
+            return FakeOrtPipeline(model)
+        optimum = SimpleNamespace(pipelines=SimpleNamespace(pipeline=pipeline))
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir)
+        modules = mock.patch.dict(sys.modules, {'optimum': optimum, 'optimum.pipelines': optimum.pipelines})
+        modules.start()
+        self.addCleanup(modules.stop)
+        overrides = override_settings(CDR_ONNX_EXPORT_DIR=Path(export_dir), CDR_MODEL_REVISIONS={})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_checkpoint_is_exported_once(self):
+        model_registry._onnx_pipeline('summarization', 'org/summarizer')
+        pipe = model_registry._onnx_pipeline('summarization', 'org/summarizer')
+        export_dir = model_registry._onnx_export_dir('summarization', 'org/summarizer', None)
+        self.assertEqual(self.calls, ['org/summarizer', str(export_dir)])
+        self.assertEqual(pipe.source, str(export_dir))
+        self.assertEqual((export_dir / 'model.onnx').read_text(), 'org/summarizer')
+
+    def test_revision_gets_its_own_export(self):
+        model_registry._onnx_pipeline('summarization', 'org/summarizer')
+        with override_settings(CDR_MODEL_REVISIONS={'summarization': 'v2'}):
+            model_registry._onnx_pipeline('summarization', 'org/summarizer')
+        self.assertEqual(self.calls, ['org/summarizer', 'org/summarizer'])
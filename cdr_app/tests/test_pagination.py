@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.test import TestCase
+
+from cdr_app.models import CallDetailRecord
+from cdr_app.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter, paginate
+
+from .helpers import START, make_cdr
+
+
+class KeysetPaginationTests(TestCase):
+    ordering = ('-call_start_time', '-id')
+
+    @classmethod
+    def setUpTestData(cls):
+        # Pairs of records share a start time, so pages must break ties on id.
+        cls.records = [make_cdr(i, START + timedelta(minutes=i // 2)) for i in range(9)]
+        cls.expected = sorted(cls.records, key=lambda cdr: (cdr.call_start_time, cdr.id), reverse=True)
+
+    def test_keyset_filter_after_and_before(self):
+        pivot = self.expected[4]
+        values = [pivot.call_start_time, pivot.id]
+        after = CallDetailRecord.objects.filter(keyset_filter(self.ordering, values)).order_by(*self.ordering)
+        before = CallDetailRecord.objects.filter(keyset_filter(self.ordering, values, reverse=True))
+        self.assertEqual(list(after), self.expected[5:])
+        self.assertCountEqual(before, self.expected[:4])
+
+    def test_pages_forward_and_back_through_ties(self):
+        queryset = CallDetailRecord.objects.all()
+        pages = [paginate(queryset, self.ordering, 2)]
+        while pages[-1].next_cursor:
+            pages.append(paginate(queryset, self.ordering, 2, after=pages[-1].next_cursor))
+        self.assertEqual([cdr for page in pages for cdr in page], self.expected)
+        self.assertIsNone(pages[0].previous_cursor)
+        self.assertIsNone(pages[-1].next_cursor)
+
+        for earlier, later in zip(pages, pages[1:]):
+            previous = paginate(queryset, self.ordering, 2, before=later.previous_cursor)
+            self.assertEqual(list(previous), list(earlier))
+
+    def test_ascending_single_column_ordering(self):
+        page = paginate(CallDetailRecord.objects.all(), ('call_id',), 4)
+        rest = paginate(CallDetailRecord.objects.all(), ('call_id',), 10, after=page.next_cursor)
+        self.assertEqual([cdr.call_id for cdr in [*page, *rest]], [f'call-{i:04d}' for i in range(9)])
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(self.expected[0], self.ordering)
+        self.assertEqual(
+            decode_cursor(cursor, CallDetailRecord, self.ordering),
+            [self.expected[0].call_start_time, self.expected[0].id],
+        )
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-a-cursor', encode_cursor(self.expected[0], ('call_id',))):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginate(CallDetailRecord.objects.all(), self.ordering, 2, after=cursor)
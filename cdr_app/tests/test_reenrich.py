@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+
+from cdr_app.inference import current_models
+from cdr_app.models import CallDetailRecord
+from cdr_app.reenrich import count_stale, reenrich
+
+from .helpers import make_cdr
+
+
+class ReenrichTests(TestCase):
+    def setUp(self):
+        self.calls = {}
+
+        def stage(name, result):
+            def run(notes, batch_size):
+                self.calls.setdefault(name, []).extend(notes)
+                return [result] * len(notes)
+            return run
+        patches = [
+            mock.patch('cdr_app.inference.analyze_sentiment_batch', stage('sentiment', ('POSITIVE', 0.9))),
+            mock.patch('cdr_app.inference.summarize_text_batch', stage('summary', 'new summary')),
+            mock.patch('cdr_app.inference.classify_suspect_batch', stage('suspect', False)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.models = current_models()
+
+    def enriched(self, index, **fields):
+        values = {
+            'call_notes': f'notes {index}', 'enrichment_status': 'done',
+            'sentiment_label': 'NEGATIVE', 'sentiment_score': 0.8, 'summary': 'old summary',
+            'is_suspect': True, 'suspect_reason': 'notes',
+            'sentiment_model': self.models['sentiment_model'],
+            'summary_model': self.models['summary_model'],
+            'suspect_model': self.models['suspect_model'],
+        }
+        values.update(fields)
+        return make_cdr(index, **values)
+
+    def test_null_model_fields_of_enriched_records_are_stale(self):
+        self.enriched(1)
+        self.enriched(2, sentiment_model=None, summary_model=None, suspect_model=None)
+        make_cdr(3, call_notes='notes 3')
+        self.assertEqual(count_stale(), 1)
+
+    def test_only_stale_stages_run(self):
+        cdr = self.enriched(1, summary_model='old/summarizer')
+        self.enriched(2)
+        self.assertEqual(reenrich().processed, 1)
+        self.assertEqual(self.calls, {'sentiment': [], 'summary': ['notes 1'], 'suspect': []})
+        cdr.refresh_from_db()
+        self.assertEqual((cdr.summary, cdr.summary_model), ('new summary', self.models['summary_model']))
+        self.assertEqual((cdr.sentiment_label, cdr.is_suspect, cdr.suspect_reason), ('NEGATIVE', True, 'notes'))
+        self.assertEqual(count_stale(), 0)
+
+    def test_records_enriched_before_model_fields_run_every_stage(self):
+        cdr = self.enriched(1, sentiment_model=None, summary_model=None, suspect_model=None, suspect_reason='')
+        reenrich()
+        self.assertEqual(self.calls, {'sentiment': ['notes 1'], 'summary': ['notes 1'], 'suspect': ['notes 1']})
+        cdr.refresh_from_db()
+        self.assertEqual((cdr.sentiment_label, cdr.summary, cdr.is_suspect), ('POSITIVE', 'new summary', False))
+        self.assertEqual(
+            {field: getattr(cdr, field) for field in ('sentiment_model', 'summary_model', 'suspect_model')},
+            {field: self.models[field] for field in ('sentiment_model', 'summary_model', 'suspect_model')},
+        )
+        self.assertFalse(CallDetailRecord.objects.filter(summary_model__isnull=True).exists())
+
+    def test_outdated_transcript_is_redone_and_reenriched(self):
+        cdr = self.enriched(1, call_recording='recordings/call-0001.wav', transcript_model='old/asr')
+        entry = SimpleNamespace(
+            transcript='new transcript', speech_ratio=0.5, model_name=self.models['transcript_model'], enrichment_key='',
+        )
+        with mock.patch('cdr_app.inference._transcribe', return_value=entry), \
+                mock.patch('cdr_app.audio_cache.store_enrichment'):
+            reenrich()
+        self.assertEqual(self.calls['summary'], ['new transcript'])
+        cdr.refresh_from_db()
+        self.assertEqual((cdr.call_notes, cdr.transcript_model), ('new transcript', self.models['transcript_model']))
+        self.assertEqual(count_stale(), 0)
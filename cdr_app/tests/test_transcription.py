@@ -0,0 +1,30 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from cdr_app.transcription import iter_windows
+
+
+class WindowTests(SimpleTestCase):
+    def test_windows_tile_the_stream_once(self):
+        samples = np.arange(1000, dtype=np.float32)
+        blocks = np.array_split(samples, 7)
+        windows = list(iter_windows(blocks, window=200, overlap=20))
+        self.assertTrue(all(len(window) <= 200 for window, _, _ in windows))
+        self.assertEqual((windows[0][1], windows[-1][2]), (0, 0))
+        stitched = np.concatenate([window[left:len(window) - right] for window, left, right in windows])
+        np.testing.assert_array_equal(stitched, samples)
+
+    def test_window_boundary_falls_exactly_at_stream_end(self):
+        # 200 + 2 * 160: the last full window is followed by nothing.
+        samples = np.arange(520, dtype=np.float32)
+        windows = list(iter_windows([samples], window=200, overlap=20))
+        stitched = np.concatenate([window[left:len(window) - right] for window, left, right in windows])
+        np.testing.assert_array_equal(stitched, samples)
+
+    def test_short_stream_is_one_window(self):
+        windows = list(iter_windows([np.ones(50, dtype=np.float32)], window=200, overlap=20))
+        self.assertEqual(len(windows), 1)
+        self.assertEqual((len(windows[0][0]), windows[0][1], windows[0][2]), (50, 0, 0))
+
+    def test_empty_stream(self):
+        self.assertEqual(list(iter_windows([], window=200, overlap=20)), [])
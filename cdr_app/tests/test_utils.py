@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase, TestCase
+
+from cdr_app.models import CallDetailRecord
+from cdr_app.utils import (
+    compile_keyword_matcher, filter_suspect_calls, keyword_pattern, parse_keywords, suspect_keywords_q,
+)
+
+from .helpers import make_cdr
+
+NOTES = [
+    'Customer asked for a refund',
+    'Wants to pay with C++ gift cards (urgent)',
+    'Billing question about plan 1.5',
+    'Plan 105 upgrade',
+    None,
+]
+
+
+class KeywordParsingTests(SimpleTestCase):
+    def test_parse_keywords(self):
+        self.assertEqual(
+            parse_keywords(['Refund, gift cards,,refund', ' URGENT ', '']),
+            ['refund', 'gift cards', 'urgent'],
+        )
+        self.assertEqual(parse_keywords([]), [])
+
+    def test_pattern_escapes_regex_characters_and_prefers_longest(self):
+        parts = keyword_pattern(['c++', '1.5', '(urgent)']).split('|')
+        self.assertEqual(parts[0], r'\(urgent\)')
+        self.assertCountEqual(parts, [r'\(urgent\)', r'c\+\+', r'1\.5'])
+        matcher = compile_keyword_matcher(['1.5'])
+        self.assertTrue(matcher.search('plan 1.5'))
+        self.assertFalse(matcher.search('plan 105'))
+
+    def test_matcher_is_case_insensitive(self):
+        self.assertTrue(compile_keyword_matcher(['c++']).search('paid with C++ cards'))
+
+
+class SuspectKeywordQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.records = [make_cdr(i, call_notes=notes) for i, notes in enumerate(NOTES)]
+
+    def matching(self, keywords):
+        return sorted(CallDetailRecord.objects.filter(suspect_keywords_q(keywords)).values_list('call_notes', flat=True))
+
+    def test_query_matches_python_filter(self):
+        for keywords in (['refund'], ['c++', '1.5'], ['(urgent)', 'REFUND'], ['missing']):
+            with self.subTest(keywords=keywords):
+                expected = sorted(cdr.call_notes for cdr in filter_suspect_calls(self.records, keywords))
+                self.assertEqual(self.matching(keywords), expected)
+
+    def test_no_keywords_match_everything(self):
+        self.assertEqual(CallDetailRecord.objects.filter(suspect_keywords_q([])).count(), len(NOTES))
+        self.assertEqual(len(filter_suspect_calls(self.records, [])), len(NOTES))
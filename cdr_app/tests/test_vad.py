@@ -0,0 +1,92 @@
+import importlib.util
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from cdr_app.transcription import SAMPLE_RATE, transcribe_file
+from cdr_app.vad import VoiceActivityDetector
+
+
+def _energy_features(self, frames):
+    # The detector's gating only needs per-frame energy and flatness; tone
+    # frames are never flat here, so these tests do not need librosa.
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10)), np.zeros(len(frames))
+
+
+def tone(seconds, rate, amplitude=0.5):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds, rate):
+    return np.zeros(int(rate * seconds), dtype=np.float32)
+
+
+class VoiceActivityTests(SimpleTestCase):
+    rate = 8000
+
+    def detector(self):
+        return VoiceActivityDetector(self.rate, margin_db=10, min_db=-50, max_flatness=0.5, hangover=0.1)
+
+    @mock.patch.object(VoiceActivityDetector, '_frame_features', _energy_features)
+    def test_silence_is_dropped(self):
+        vad = self.detector()
+        self.assertEqual(list(vad.filter([silence(1, self.rate), silence(1, self.rate)])), [])
+        self.assertEqual(vad.speech_ratio, 0.0)
+
+    @mock.patch.object(VoiceActivityDetector, '_frame_features', _energy_features)
+    def test_speech_is_kept_with_gaps_between_segments(self):
+        vad = self.detector()
+        speech = tone(0.5, self.rate)
+        audio = np.concatenate([silence(1, self.rate), speech, silence(1, self.rate), speech])
+        # Odd block sizes exercise the frame remainder carried between blocks.
+        segments = list(vad.filter(np.array_split(audio, 13)))
+        kept = np.concatenate(segments)
+        hangover = 2 * vad.hangover_frames * vad.frame
+        self.assertGreaterEqual(len(kept), 2 * len(speech))
+        self.assertLessEqual(len(kept), 2 * len(speech) + hangover + len(vad.gap))
+        self.assertTrue(any(segment is vad.gap for segment in segments))
+        self.assertAlmostEqual(vad.speech_ratio, (len(kept) - len(vad.gap)) / len(audio), delta=0.1)
+        self.assertEqual(vad.total_samples, len(audio))
+
+    @unittest.skipUnless(importlib.util.find_spec('librosa'), "librosa is not installed")
+    def test_noise_is_dropped(self):
+        vad = self.detector()
+        noise = np.random.default_rng(0).normal(0, 0.3, self.rate * 2).astype(np.float32)
+        audio = np.concatenate([silence(0.5, self.rate), noise, tone(1, self.rate)])
+        kept = sum(len(segment) for segment in vad.filter([audio]))
+        self.assertLess(kept, len(tone(1, self.rate)) * 1.5)
+
+
+@override_settings(CDR_VAD_ENABLED=True)
+@mock.patch.object(VoiceActivityDetector, '_frame_features', _energy_features)
+class TranscribeFileTests(SimpleTestCase):
+    def transcribe(self, audio):
+        model_samples = []
+
+        def token_ids(pipe, samples, left, right):
+            model_samples.append(len(samples) - left - right)
+            return np.array([1])
+
+        pipe = SimpleNamespace(tokenizer=SimpleNamespace(decode=lambda ids: 'hello'))
+        with mock.patch('cdr_app.transcription.iter_audio_blocks', return_value=iter([audio])), \
+                mock.patch('cdr_app.transcription.get_pipeline', return_value=pipe), \
+                mock.patch('cdr_app.transcription._window_token_ids', token_ids):
+            return transcribe_file('call.wav'), sum(model_samples)
+
+    def test_silent_recording_never_reaches_the_model(self):
+        result, model_samples = self.transcribe(silence(3, SAMPLE_RATE))
+        self.assertEqual((result.text, model_samples, result.speech_ratio), ('', 0, 0.0))
+        self.assertEqual(result.audio_seconds, 3)
+
+    def test_real_time_factor_uses_the_recording_length(self):
+        audio = np.concatenate([silence(3, SAMPLE_RATE), tone(1, SAMPLE_RATE)])
+        result, model_samples = self.transcribe(audio)
+        self.assertEqual(result.text, 'hello')
+        self.assertLess(model_samples, 2 * SAMPLE_RATE)
+        self.assertEqual(result.audio_seconds, 4)
+        self.assertAlmostEqual(result.real_time_factor, result.processing_seconds / 4)
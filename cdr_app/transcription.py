@@ -0,0 +1,165 @@
+import logging
+import subprocess
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+
+from .model_registry import get_pipeline
+from .vad import VoiceActivityDetector
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+DECODE_BLOCK_SECONDS = 10
+
+
+@dataclass
+class TranscriptionResult:
+    text: str
+    audio_seconds: float  # Length of the recording, including any silence VAD cut out
+    processing_seconds: float
+    speech_ratio: float = None
+
+    @property
+    def real_time_factor(self):
+        """Processing time per second of audio; below 1 is faster than real time."""
+        return self.processing_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+
+def _soundfile_blocks(path, sample_rate, block_seconds):
+    import soundfile as sf
+    import soxr
+
+    with sf.SoundFile(path) as audio_file:
+        resampler = None
+        if audio_file.samplerate != sample_rate:
+            resampler = soxr.ResampleStream(audio_file.samplerate, sample_rate, 1, dtype='float32')
+        blocksize = int(audio_file.samplerate * block_seconds)
+        for block in audio_file.blocks(blocksize=blocksize, dtype='float32', always_2d=True):
+            mono = block.mean(axis=1, dtype=np.float32)
+            yield resampler.resample_chunk(mono) if resampler else mono
+        if resampler:
+            yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+
+def _ffmpeg_blocks(path, sample_rate, block_seconds):
+    # Formats libsndfile cannot read are decoded by the ffmpeg binary pydub is
+    # configured with, streaming raw samples over a pipe.
+    from pydub import AudioSegment
+
+    command = [
+        AudioSegment.converter, '-v', 'error', '-i', str(path),
+        '-f', 'f32le', '-ac', '1', '-ar', str(sample_rate), '-',
+    ]
+    block_bytes = int(sample_rate * block_seconds) * 4
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data, dtype=np.float32)
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not decode {path}: {process.stderr.read().decode(errors='replace')}")
+
+
+def iter_audio_blocks(path, sample_rate=SAMPLE_RATE, block_seconds=DECODE_BLOCK_SECONDS):
+    """Decode ``path`` to mono float32 at ``sample_rate``, in memory, one
+    block of about ``block_seconds`` at a time."""
+    import soundfile as sf
+
+    try:
+        with sf.SoundFile(path):
+            pass
+    except (sf.LibsndfileError, RuntimeError):
+        yield from _ffmpeg_blocks(path, sample_rate, block_seconds)
+    else:
+        yield from _soundfile_blocks(path, sample_rate, block_seconds)
+
+
+def iter_windows(blocks, window, overlap):
+    """Regroup a stream of sample blocks into windows of ``window`` samples
+    that overlap their neighbours by ``2 * overlap`` samples.
+
+    Yields ``(samples, left, right)`` where ``left``/``right`` are how many
+    samples at either edge are context only: the non-context parts of
+    consecutive windows tile the recording exactly once. Only one window
+    (plus one decode block) is held in memory at a time.
+    """
+    step = window - 2 * overlap
+    buffer = np.zeros(0, dtype=np.float32)
+    left = 0
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        # Only emit a full window once more audio is known to follow it;
+        # the last window has no right-hand context.
+        while len(buffer) > window:
+            yield buffer[:window], left, overlap
+            buffer = buffer[step:]
+            left = overlap
+    if len(buffer) > left:
+        yield buffer, left, 0
+
+
+def _window_token_ids(pipe, samples, left, right):
+    import torch
+
+    inputs = pipe.feature_extractor(samples, sampling_rate=SAMPLE_RATE, return_tensors='pt')
+    with torch.inference_mode():
+        logits = pipe.model(**inputs).logits[0]
+    frames_per_sample = logits.shape[0] / len(samples)
+    start = int(round(left * frames_per_sample))
+    end = logits.shape[0] - int(round(right * frames_per_sample))
+    return logits[start:end].argmax(dim=-1).numpy()
+
+
+def transcribe_blocks(blocks, pipe=None):
+    """Transcribe a stream of 16 kHz sample blocks with the CTC speech model.
+
+    Long audio is processed in overlapping windows; each window's edge
+    frames are dropped and the remaining CTC token ids are concatenated
+    and decoded once, so words spanning a window boundary are not split.
+    The model is only loaded once there is audio to run it on.
+    """
+    window = int(getattr(settings, 'CDR_ASR_WINDOW_SECONDS', 30) * SAMPLE_RATE)
+    overlap = int(getattr(settings, 'CDR_ASR_OVERLAP_SECONDS', 2) * SAMPLE_RATE)
+
+    token_ids = []
+    audio_samples = 0
+    started = time.perf_counter()
+    for samples, left, right in iter_windows(blocks, window, overlap):
+        audio_samples += len(samples) - left - right
+        pipe = pipe or get_pipeline("automatic-speech-recognition")
+        token_ids.append(_window_token_ids(pipe, samples, left, right))
+    text = pipe.tokenizer.decode(np.concatenate(token_ids)) if token_ids else ''
+    return TranscriptionResult(
+        text=text,
+        audio_seconds=audio_samples / SAMPLE_RATE,
+        processing_seconds=time.perf_counter() - started,
+    )
+
+
+def transcribe_file(path):
+    """Transcribe the recording at ``path``.
+
+    With ``CDR_VAD_ENABLED`` only the voiced parts of the recording reach
+    the speech model, and a recording with no speech at all never runs it.
+    """
+    blocks = iter_audio_blocks(path)
+    if not getattr(settings, 'CDR_VAD_ENABLED', True):
+        result = transcribe_blocks(blocks)
+        result.speech_ratio = None
+    else:
+        vad = VoiceActivityDetector(SAMPLE_RATE)
+        result = transcribe_blocks(vad.filter(blocks))
+        # The real-time factor is against the whole recording, not only the
+        # speech that reached the model.
+        result.audio_seconds = vad.total_samples / SAMPLE_RATE
+        result.speech_ratio = vad.speech_ratio
+    logger.info(
+        "Transcribed %s: %.1fs of audio in %.1fs (RTF %.2f, speech ratio %s)",
+        path, result.audio_seconds, result.processing_seconds, result.real_time_factor,
+        'n/a' if result.speech_ratio is None else f"{result.speech_ratio:.2f}",
+    )
+    return result
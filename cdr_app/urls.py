@@ -4,4 +4,9 @@ from . import views
 urlpatterns = [
     path('', views.cdr_list, name='cdr_list'),
     path('visualization/', views.cdr_visualization, name='cdr_visualization'),
+    path('api/aggregates/', views.cdr_aggregates, name='cdr_aggregates'),
+    path('api/graph/', views.cdr_graph, name='cdr_graph'),
+    path('export/', views.cdr_export, name='cdr_export'),
+    path('api/cache-stats/', views.cdr_cache_stats, name='cdr_cache_stats'),
+    path('metrics/', views.cdr_metrics, name='cdr_metrics'),
 ]
\ No newline at end of file
@@ -1,60 +1,63 @@
-import os
-from transformers import pipeline  # Import pipeline from transformers
-import librosa
-import torch
-from pydub import AudioSegment
+import operator
+import re
+from functools import reduce
+from django.db import connection
+from django.db.models import Q
 
-def transcribe_audio(file_path):
-    try:
-        print(f"Transcribing file: {file_path}")
-        
-        # Convert MP3 to WAV if necessary
-        if file_path.endswith('.mp3'):
-            wav_file_path = file_path.rsplit('.', 1)[0] + '.wav'
-            audio = AudioSegment.from_mp3(file_path)
-            audio.export(wav_file_path, format="wav")
-            file_path = wav_file_path
-        
-        transcriber = pipeline("automatic-speech-recognition", model="facebook/wav2vec2-large-960h-lv60-self")
-        audio, sample_rate = librosa.load(file_path, sr=16000)
-        audio_tensor = torch.tensor(audio).unsqueeze(0)
-        result = transcriber(audio_tensor)
-        print(f"Transcription result: {result['text']}")
-        return result['text']
-    except Exception as e:
-        print(f"Error transcribing audio: {e}")
-        return "No transcript available."
-
-def analyze_sentiment(text):
-    if not isinstance(text, str) or not text.strip():
-        return 'N/A', 0.0
-    sentiment_pipeline = pipeline("sentiment-analysis")
-    result = sentiment_pipeline(text)[0]
-    return result['label'], result['score']
+# Characters with a special meaning in both Python and PostgreSQL regexes.
+_REGEX_SPECIAL = set('\\.^$|?*+()[]{}')
+
+def _escape_regex(keyword):
+    return ''.join('\\' + char if char in _REGEX_SPECIAL else char for char in keyword)
+
+def parse_keywords(values):
+    """Split comma-separated keyword inputs into a de-duplicated list."""
+    keywords = []
+    for value in values:
+        for keyword in value.split(','):
+            keyword = keyword.strip().lower()
+            if keyword and keyword not in keywords:
+                keywords.append(keyword)
+    return keywords
+
+def keyword_pattern(keywords):
+    # Longest first, so overlapping keywords match the most specific one.
+    return '|'.join(_escape_regex(keyword) for keyword in sorted(set(keywords), key=len, reverse=True))
+
+def compile_keyword_matcher(keywords):
+    """Compile ``keywords`` into one case-insensitive alternation, so each
+    note is scanned once however many keywords there are."""
+    return re.compile(keyword_pattern(keywords), re.IGNORECASE)
 
 def filter_suspect_calls(cdrs, suspect_keywords):
-    suspect_calls = []
-    for cdr in cdrs:
-        if any(keyword.lower() in cdr.call_notes.lower() for keyword in suspect_keywords if cdr.call_notes):
-            suspect_calls.append(cdr)
-    return suspect_calls
-
-def flag_suspect_calls_with_ai(cdrs):
-    classifier_pipeline = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-    labels = ["suspect", "normal"]
-    suspect_calls = []
-    for cdr in cdrs:
-        if cdr.call_notes:
-            result = classifier_pipeline(cdr.call_notes, candidate_labels=labels)
-            if result['labels'][0] == "suspect":
-                cdr.is_suspect = True
-                cdr.save()
-                suspect_calls.append(cdr)
-    return suspect_calls
-
-def summarize_text(text):
-    if not isinstance(text, str) or not text.strip():
-        return "No transcription available."
-    summarization_pipeline = pipeline("summarization")
-    summary = summarization_pipeline(text, max_length=130, min_length=30, do_sample=False)
-    return summary[0]['summary_text']
\ No newline at end of file
+    if not suspect_keywords:
+        return list(cdrs)
+    matcher = compile_keyword_matcher(suspect_keywords)
+    return [cdr for cdr in cdrs if cdr.call_notes and matcher.search(cdr.call_notes)]
+
+def suspect_keywords_q(suspect_keywords):
+    """Database-side equivalent of ``filter_suspect_calls`` for querysets.
+
+    On PostgreSQL this is a single ``call_notes ~* 'kw1|kw2|...'`` predicate,
+    which is answered from the trigram index on ``call_notes``. No keywords
+    match every record, as in ``filter_suspect_calls``.
+    """
+    if not suspect_keywords:
+        return Q()
+    if connection.vendor == 'postgresql':
+        return Q(call_notes__iregex=keyword_pattern(suspect_keywords))
+    return reduce(operator.or_, (Q(call_notes__icontains=keyword) for keyword in suspect_keywords))
+
+# The inference helpers moved to cdr_app.inference so that importing this
+# module (as the views do) does not load the model code; the old names are
+# still importable from here.
+def __getattr__(name):
+    # The import system probes modules for dunders such as __path__; those
+    # must not trigger the import.
+    if name.startswith('__'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from . import inference
+    try:
+        return getattr(inference, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
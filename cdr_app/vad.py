@@ -0,0 +1,96 @@
+import numpy as np
+from django.conf import settings
+
+FRAME_SECONDS = 0.02
+
+
+class VoiceActivityDetector:
+    """Energy and spectral-flatness voice activity detection over a stream of
+    mono sample blocks.
+
+    A frame counts as speech when its energy is ``margin_db`` above a
+    running noise floor (and above an absolute minimum) and its spectrum is
+    not flat like broadband noise. Decisions are held for ``hangover``
+    seconds so short pauses inside speech are kept.
+    """
+
+    def __init__(self, sample_rate, margin_db=None, min_db=None, max_flatness=None, hangover=None):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * FRAME_SECONDS)
+        self.margin_db = margin_db if margin_db is not None else getattr(settings, 'CDR_VAD_MARGIN_DB', 10.0)
+        self.min_db = min_db if min_db is not None else getattr(settings, 'CDR_VAD_MIN_DB', -50.0)
+        self.max_flatness = max_flatness if max_flatness is not None else getattr(settings, 'CDR_VAD_MAX_FLATNESS', 0.5)
+        hangover = hangover if hangover is not None else getattr(settings, 'CDR_VAD_HANGOVER_SECONDS', 0.3)
+        self.hangover_frames = int(hangover / FRAME_SECONDS)
+        # Silence inserted between kept segments so the recogniser still sees
+        # a word boundary where audio was cut out.
+        self.gap = np.zeros(int(sample_rate * 0.1), dtype=np.float32)
+
+        self.total_samples = 0
+        self.speech_samples = 0
+        self._noise_floor = None
+        self._hold = 0
+        self._in_speech = False
+        self._emitted = False
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    @property
+    def speech_ratio(self):
+        return self.speech_samples / self.total_samples if self.total_samples else 0.0
+
+    def _frame_features(self, frames):
+        import librosa
+
+        samples = frames.reshape(-1)
+        rms = librosa.feature.rms(y=samples, frame_length=self.frame, hop_length=self.frame, center=False)[0]
+        flatness = librosa.feature.spectral_flatness(
+            y=samples, n_fft=self.frame, hop_length=self.frame, center=False,
+        )[0]
+        energy_db = 20 * np.log10(np.maximum(rms, 1e-10))
+        return energy_db[:len(frames)], flatness[:len(frames)]
+
+    def _is_speech(self, energy_db, flatness):
+        if self._noise_floor is None or energy_db < self._noise_floor:
+            self._noise_floor = energy_db
+        else:
+            # Let the floor creep up (~2.5 dB/s) so it follows rising noise.
+            self._noise_floor += 0.05
+        loud = energy_db > max(self._noise_floor + self.margin_db, self.min_db)
+        if loud and flatness < self.max_flatness:
+            self._hold = self.hangover_frames
+            return True
+        if self._hold > 0:
+            self._hold -= 1
+            return True
+        return False
+
+    def filter(self, blocks):
+        """Yield only the voiced parts of ``blocks``."""
+        for block in blocks:
+            samples = np.concatenate([self._remainder, block])
+            usable = len(samples) - len(samples) % self.frame
+            self._remainder = samples[usable:]
+            if not usable:
+                continue
+            frames = samples[:usable].reshape(-1, self.frame)
+            self.total_samples += usable
+            energy_db, flatness = self._frame_features(frames)
+            voiced = np.array([self._is_speech(e, f) for e, f in zip(energy_db, flatness)])
+            if voiced.any():
+                self.speech_samples += int(voiced.sum()) * self.frame
+                yield from self._segments(frames, voiced)
+            else:
+                self._in_speech = False
+        self.total_samples += len(self._remainder)
+
+    def _segments(self, frames, voiced):
+        # Contiguous runs of voiced frames, each preceded by a short gap when
+        # it follows cut-out audio.
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], voiced.astype(np.int8), [0]])))
+        for start, end in zip(edges[::2], edges[1::2]):
+            continues_previous = start == 0 and self._in_speech
+            if self._emitted and not continues_previous:
+                yield self.gap
+            yield frames[start:end].reshape(-1)
+            self._emitted = True
+        self._in_speech = bool(voiced[-1])
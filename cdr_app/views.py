@@ -1,77 +1,95 @@
 from django.shortcuts import render, redirect
 from .models import CallDetailRecord
 from .forms import CallDetailRecordForm, CSVUploadForm, IndividualCallRecordForm
-from .utils import analyze_sentiment, transcribe_audio, filter_suspect_calls, flag_suspect_calls_with_ai, summarize_text
+from .jobs import enqueue_enrichment
+from .ingest import ingest_csv
+from .pagination import InvalidCursor, paginate
+from .filters import filter_cdrs, filters_from_query, parse_flag, parse_timestamp
+from .aggregates import TRUNCATE, aggregate_calls
+from .caching import cached_result, stats as cache_stats
+from .export import ENCODERS, STREAM_FORMATS, export_rows
+from .graph import default_window, find_rings, number_profile
+from . import metrics
+from django.contrib import messages
 from django.core.files.storage import FileSystemStorage
-from django.db.models import Q
+from django.conf import settings
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
+from django.db.models.functions import Left
+import hmac
+import logging
 import os
-import pandas as pd
-import plotly.express as px
-from transformers import pipeline  # Import pipeline from transformers
-import librosa
-import torch
-from pydub import AudioSegment
-
-def transcribe_audio(file_path):
+
+logger = logging.getLogger(__name__)
+
+# Sort options offered by the list view. Each ordering ends in a unique
+# column and is backed by an index so keyset pages stay cheap.
+SORT_OPTIONS = {
+    'newest': ('-call_start_time', '-id'),
+    'oldest': ('call_start_time', 'id'),
+    'call_id': ('call_id',),
+    # Only available with a search query, which annotates the rank.
+    'relevance': ('-rank', '-id'),
+}
+SORT_LABELS = {
+    'relevance': 'Best match',
+    'newest': 'Newest first',
+    'oldest': 'Oldest first',
+    'call_id': 'Call ID',
+}
+
+# Columns rendered by cdr_list.html; call notes are only loaded as a preview.
+LIST_COLUMNS = (
+    'id', 'call_id', 'caller_number', 'callee_number', 'call_start_time', 'call_end_time',
+    'call_type', 'sentiment_label', 'sentiment_score', 'call_recording', 'summary',
+    'is_suspect', 'suspect_reason', 'enrichment_status',
+)
+NOTES_PREVIEW_CHARS = 300
+
+def _page_size(request):
+    default = getattr(settings, 'CDR_LIST_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'CDR_LIST_MAX_PAGE_SIZE', 500)
+    try:
+        return max(1, min(int(request.GET.get('page_size', default)), maximum))
+    except ValueError:
+        return default
+
+def _page_url(request, **cursor):
+    params = request.GET.copy()
+    for key in ('after', 'before'):
+        params.pop(key, None)
+    params.update(cursor)
+    return f"?{params.urlencode()}"
+
+def _list_page(filters, sort, page_size, after, before):
+    cdrs = CallDetailRecord.objects.only(*LIST_COLUMNS).annotate(
+        notes_preview=Left('call_notes', NOTES_PREVIEW_CHARS),
+    )
+    cdrs = filter_cdrs(cdrs, **filters)
+    try:
+        return paginate(cdrs, SORT_OPTIONS[sort], page_size, after=after, before=before)
+    except InvalidCursor:
+        return paginate(cdrs, SORT_OPTIONS[sort], page_size)
+
+def _request_filters(request):
     try:
-        print(f"Transcribing file: {file_path}")
-        
-        # Convert MP3 to WAV if necessary
-        if file_path.endswith('.mp3'):
-            wav_file_path = file_path.rsplit('.', 1)[0] + '.wav'
-            audio = AudioSegment.from_mp3(file_path)
-            audio.export(wav_file_path, format="wav")
-            file_path = wav_file_path
-        
-        transcriber = pipeline("automatic-speech-recognition", model="facebook/wav2vec2-large-960h-lv60-self")
-        audio, sample_rate = librosa.load(file_path, sr=16000)
-        audio_tensor = torch.tensor(audio).unsqueeze(0)
-        result = transcriber(audio_tensor)
-        print(f"Transcription result: {result['text']}")
-        return result['text']
-    except Exception as e:
-        print(f"Error transcribing audio: {e}")
-        return "No transcript available."
-
-def analyze_sentiment(text):
-    if not isinstance(text, str) or not text.strip():
-        return 'N/A', 0.0
-    sentiment_pipeline = pipeline("sentiment-analysis")
-    result = sentiment_pipeline(text)[0]
-    return result['label'], result['score']
-
-def filter_suspect_calls(cdrs, suspect_keywords):
-    suspect_calls = []
-    for cdr in cdrs:
-        if any(keyword.lower() in cdr.call_notes.lower() for keyword in suspect_keywords if cdr.call_notes):
-            suspect_calls.append(cdr)
-    return suspect_calls
-
-def flag_suspect_calls_with_ai(cdrs):
-    classifier_pipeline = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-    labels = ["suspect", "normal"]
-    suspect_calls = []
-    for cdr in cdrs:
-        if cdr.call_notes:
-            result = classifier_pipeline(cdr.call_notes, candidate_labels=labels)
-            if result['labels'][0] == "suspect":
-                cdr.is_suspect = True
-                cdr.save()
-                suspect_calls.append(cdr)
-    return suspect_calls
-
-def summarize_text(text):
-    if not isinstance(text, str) or not text.strip():
-        return "No transcription available."
-    summarization_pipeline = pipeline("summarization")
-    summary = summarization_pipeline(text, max_length=130, min_length=30, do_sample=False)
-    return summary[0]['summary_text']
+        return filters_from_query(request.GET)
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        params = request.GET.copy()
+        params.pop('start', None)
+        params.pop('end', None)
+        return filters_from_query(params)
 
 def cdr_list(request):
-    query = request.GET.get('q', '')
-    suspect_keywords = request.GET.getlist('suspect_keywords', [])
-    use_ai_filter = request.GET.get('use_ai_filter', False) == 'true'
-    
+    filters = _request_filters(request)
+    query = filters['q']
+    sort = request.GET.get('sort', 'relevance' if query else 'newest')
+    if sort not in SORT_OPTIONS or (sort == 'relevance' and not query):
+        sort = 'newest'
+    page_size = _page_size(request)
+
     form = CallDetailRecordForm()
     csv_form = CSVUploadForm()
     individual_form = IndividualCallRecordForm()
@@ -84,150 +102,132 @@ def cdr_list(request):
                 fs = FileSystemStorage()
                 filename = fs.save(csv_file.name, csv_file)
                 file_path = os.path.join(fs.location, filename)
-                df = pd.read_csv(file_path)
-                for index, row in df.iterrows():
-                    call_id = row.get('call_id', '')
-                    caller_number = row.get('caller_number', '')
-                    callee_number = row.get('callee_number', '')
-                    call_start_time = pd.to_datetime(row.get('call_start_time', ''))
-                    call_end_time = pd.to_datetime(row.get('call_end_time', ''))
-                    call_type = row.get('call_type', '')
-                    call_notes = row.get('call_notes', '')
-
-                    cdr, created = CallDetailRecord.objects.update_or_create(
-                        call_id=call_id,
-                        defaults={
-                            'caller_number': caller_number,
-                            'callee_number': callee_number,
-                            'call_start_time': call_start_time,
-                            'call_end_time': call_end_time,
-                            'call_type': call_type,
-                            'call_notes': call_notes,
-                        }
-                    )
-                    if not cdr.call_notes:
-                        if cdr.call_recording:
-                            fs = FileSystemStorage()
-                            file_path = os.path.join(fs.location, cdr.call_recording.name)
-                            transcription = transcribe_audio(file_path)
-                            cdr.call_notes = transcription
-                            cdr.sentiment_label, cdr.sentiment_score = analyze_sentiment(transcription)
-                            cdr.summary = summarize_text(transcription)
-                            cdr.is_suspect = flag_suspect_calls_with_ai([cdr])[0].is_suspect if cdr.call_notes else False
-                    else:
-                        cdr.sentiment_label, cdr.sentiment_score = analyze_sentiment(cdr.call_notes)
-                        cdr.summary = summarize_text(cdr.call_notes)
-                        cdr.is_suspect = flag_suspect_calls_with_ai([cdr])[0].is_suspect if cdr.call_notes else False
-                    cdr.save()
+                result = ingest_csv(file_path)
+                messages.success(request, f"Imported {csv_file.name}: {result}")
                 return redirect('cdr_list')
         elif 'individual_call_recording' in request.POST:
-            print("Individual call recording form submitted")
             individual_form = IndividualCallRecordForm(request.POST, request.FILES)
             if individual_form.is_valid():
-                print("Form is valid")
-                cdr = individual_form.save(commit=False)
-                if 'call_recording' in request.FILES:
-                    print("Call recording file is present")
-                    cdr.call_recording = request.FILES['call_recording']
-                    fs = FileSystemStorage()
-                    filename = fs.save(cdr.call_recording.name, cdr.call_recording)
-                    uploaded_file_url = fs.url(filename)
-                    file_path = os.path.join(fs.location, filename)
-                    transcription = transcribe_audio(file_path)
-                    print(f"Transcription: {transcription}")
-                    cdr.call_notes = transcription
-                    cdr.sentiment_label, cdr.sentiment_score = analyze_sentiment(transcription)
-                    cdr.summary = summarize_text(transcription)
-                    cdr.is_suspect = flag_suspect_calls_with_ai([cdr])[0].is_suspect if cdr.call_notes else False
-                else:
-                    print("No call recording file uploaded")
-                cdr.save()
+                cdr = individual_form.save()
+                logger.info("Saved individual call %s (%s recording)", cdr.call_id,
+                            "with" if cdr.call_recording else "no")
+                enqueue_enrichment([cdr.id])
                 return redirect('cdr_list')
             else:
-                print("Form is invalid")
-                print(individual_form.errors)
+                logger.info("Invalid individual call form: %s", individual_form.errors.as_json())
     else:
         form = CallDetailRecordForm()
         csv_form = CSVUploadForm()
         individual_form = IndividualCallRecordForm()
 
-    cdrs = CallDetailRecord.objects.all()
-    if query:
-        cdrs = cdrs.filter(
-            Q(call_id__icontains=query) |
-            Q(caller_number__icontains=query) |
-            Q(callee_number__icontains=query) |
-            Q(call_notes__icontains=query)
-        )
-
-    if suspect_keywords:
-        cdrs = filter_suspect_calls(cdrs, suspect_keywords)
-
-    if use_ai_filter:
-        cdrs = flag_suspect_calls_with_ai(cdrs)
+    params = {
+        'filters': filters,
+        'sort': sort,
+        'page_size': page_size,
+        'after': request.GET.get('after'),
+        'before': request.GET.get('before'),
+    }
+    page = cached_result('cdr_list', params, lambda: _list_page(**params))
 
-    for cdr in cdrs:
-        if not cdr.call_notes:
-            if cdr.call_recording:
-                fs = FileSystemStorage()
-                file_path = os.path.join(fs.location, cdr.call_recording.name)
-                transcription = transcribe_audio(file_path)
-                cdr.call_notes = transcription
-                cdr.sentiment_label, cdr.sentiment_score = analyze_sentiment(transcription)
-                cdr.summary = summarize_text(transcription)
-                cdr.is_suspect = flag_suspect_calls_with_ai([cdr])[0].is_suspect if cdr.call_notes else False
-                cdr.save()
-        if not cdr.sentiment_label:
-            if cdr.call_notes:
-                cdr.sentiment_label, cdr.sentiment_score = analyze_sentiment(cdr.call_notes)
-            else:
-                cdr.sentiment_label = 'N/A'
-                cdr.sentiment_score = 0.0
-            cdr.save()
-        if not cdr.summary:
-            if cdr.call_notes:
-                cdr.summary = summarize_text(cdr.call_notes)
-            else:
-                cdr.summary = "No transcription available."
-            cdr.save()
+    # Records that were never enriched (e.g. created through the admin) are
+    # handed to the background workers rather than processed here.
+    enqueue_enrichment([cdr.id for cdr in page if cdr.enrichment_status == 'pending'])
 
     return render(request, 'cdr_list.html', {
-        'cdrs': cdrs,
+        'cdrs': page,
+        'first_url': _page_url(request),
+        'next_url': _page_url(request, after=page.next_cursor) if page.next_cursor else None,
+        'previous_url': _page_url(request, before=page.previous_cursor) if page.previous_cursor else None,
+        'sort': sort,
+        'sort_options': SORT_LABELS.items(),
+        'page_size': page_size,
         'form': form,
         'csv_form': csv_form,
         'individual_form': individual_form,
+        'export_query': request.GET.urlencode(),
         'query': query,
-        'suspect_keywords': suspect_keywords,
-        'use_ai_filter': use_ai_filter
+        'suspect_keywords': filters['suspect_keywords'],
+        'use_ai_filter': filters['suspect'] is True,
     })
 
 def cdr_visualization(request):
-    cdrs = CallDetailRecord.objects.all()
-    df = pd.DataFrame(list(cdrs.values()))
-
-    # Example: Call Frequency Over Time
-    df['call_start_time'] = pd.to_datetime(df['call_start_time'])
-    df['date'] = df['call_start_time'].dt.date
-    call_frequency = df.groupby('date').size().reset_index(name='counts')
-    call_start_times = call_frequency['date'].astype(str).tolist()
-    call_counts = call_frequency['counts'].tolist()
-
-    # Example: Call Type Distribution
-    call_type_distribution = df['call_type'].value_counts().reset_index()
-    call_type_distribution.columns = ['call_type', 'counts']
-    call_types = call_type_distribution['call_type'].tolist()
-    call_type_counts = call_type_distribution['counts'].tolist()
-
-    # Pass data to the template
-    context = {
-        'call_start_times': call_start_times,
-        'call_counts': call_counts,
-        'call_types': call_types,
-        'call_type_counts': call_type_counts,
-        'incoming_count': df[df['call_type'] == 'incoming']['call_type'].count(),
-        'outgoing_count': df[df['call_type'] == 'outgoing']['call_type'].count(),
-        'missed_count': df[df['call_type'] == 'missed']['call_type'].count(),
-        'voicemail_count': df[df['call_type'] == 'voicemail']['call_type'].count(),
-    }
+    # The charts fetch their data from cdr_aggregates as the user zooms and
+    # filters; only the filter choices are rendered here.
+    return render(request, 'cdr_visualization.html', {
+        'call_types': CallDetailRecord._meta.get_field('call_type').choices,
+        'granularities': list(TRUNCATE),
+    })
 
-    return render(request, 'cdr_visualization.html', context)
\ No newline at end of file
+def cdr_aggregates(request):
+    try:
+        params = {
+            'granularity': request.GET.get('granularity', 'day'),
+            'start': parse_timestamp(request.GET.get('start')),
+            'end': parse_timestamp(request.GET.get('end')),
+            'call_types': tuple(request.GET.getlist('call_type')),
+            'suspect': parse_flag(request.GET.get('suspect')),
+            'sentiment': request.GET.get('sentiment'),
+            'number': request.GET.get('number'),
+        }
+        data = cached_result('cdr_aggregates', params, lambda: aggregate_calls(**params))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(data)
+
+def _date_param(request, name):
+    value = parse_timestamp(request.GET.get(name))
+    return value.date() if value else None
+
+def cdr_graph(request):
+    # ?number= profiles one number from its own edges; without it, the rings
+    # in the window (by default the last CDR_GRAPH_WINDOW_DAYS with calls).
+    try:
+        start, end = _date_param(request, 'start'), _date_param(request, 'end')
+        number = request.GET.get('number')
+        if number:
+            params = {'number': number, 'start': start, 'end': end}
+            return JsonResponse(cached_result('cdr_graph_number', params, lambda: number_profile(**params)))
+        if start is None and end is None:
+            start, end = default_window()
+        params = {
+            'start': start,
+            'end': end,
+            'min_size': int(request.GET.get('min_size', 3)),
+            'max_size': int(request.GET.get('max_size', 50)),
+        }
+        rings = cached_result('cdr_graph_rings', params, lambda: find_rings(**params))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({'start': start, 'end': end, 'rings': rings})
+
+def cdr_cache_stats(request):
+    # Hit ratios of the view caches in this worker process.
+    return JsonResponse(cache_stats())
+
+def cdr_metrics(request):
+    # Prometheus text format for this worker process only; served to local
+    # scrapers and, when CDR_METRICS_TOKEN is set, only with that bearer token
+    # (a local reverse proxy makes every client look local).
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'CDR_METRICS_ALLOWED_IPS', ()):
+        return HttpResponseForbidden()
+    token = getattr(settings, 'CDR_METRICS_TOKEN', '')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+def cdr_export(request):
+    # Same filters as the list; rows are streamed as they are read, so the
+    # response never holds more than one chunk of records.
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in STREAM_FORMATS:
+        return HttpResponseBadRequest(f"Unsupported export format {export_format!r}")
+    try:
+        filters = filters_from_query(request.GET)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    response = StreamingHttpResponse(
+        ENCODERS[export_format](export_rows(filters)),
+        content_type=STREAM_FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="cdrs.{export_format}"'
+    return response
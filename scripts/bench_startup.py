@@ -0,0 +1,81 @@
+"""Measure how long a fresh process takes to get Django ready, and how much
+memory it holds, for the ways the project is started.
+
+    python scripts/bench_startup.py --repeat 5
+
+Each scenario runs in a new interpreter so nothing is already imported.
+The report also lists which heavy ML/data libraries each scenario loaded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ('torch', 'transformers', 'librosa', 'numpy', 'pandas', 'plotly', 'pydub', 'soundfile')
+
+SCENARIOS = {
+    # What every manage.py command pays.
+    'django.setup': "",
+    # A web worker: resolving the URLconf imports every view.
+    'web worker (urls + views)': "from django.urls import get_resolver; get_resolver().url_patterns",
+    # An enrichment worker, before any model is loaded.
+    'inference module': "import cdr_app.inference",
+}
+
+PROBE = """
+import json, os, resource, sys, time
+started = time.perf_counter()
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cdr_analysis.settings')
+django.setup()
+{statement}
+seconds = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    'seconds': seconds,
+    'rss_mb': rss_kb / 1024 if sys.platform != 'darwin' else rss_kb / 1024 / 1024,
+    'loaded': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_scenario(statement, repeat):
+    code = PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=PROJECT_DIR, env=os.environ.copy(),
+            capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'seconds': statistics.median(sample['seconds'] for sample in samples),
+        'rss_mb': statistics.median(sample['rss_mb'] for sample in samples),
+        'loaded': samples[-1]['loaded'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per scenario; the median is reported")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = {name: run_scenario(statement, args.repeat) for name, statement in SCENARIOS.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'scenario':<28} {'startup':>9} {'max RSS':>10}  heavy modules loaded")
+    for name, result in results.items():
+        print(
+            f"{name:<28} {result['seconds'] * 1000:7.0f}ms {result['rss_mb']:8.1f}MB  "
+            f"{', '.join(result['loaded']) or '-'}"
+        )
+
+
+if __name__ == '__main__':
+    main()
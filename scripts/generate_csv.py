@@ -1,52 +1,299 @@
-import csv
-import random
-from faker import Faker
-from datetime import datetime, timedelta
-
-fake = Faker()
-
-def generate_fake_call_record(index):
-    call_id = f"CALL{index:03}"
-    caller_number = fake.phone_number()
-    callee_number = fake.phone_number()
-    call_start_time = fake.date_time_between(start_date='-1y', end_date='now')
-    call_end_time = call_start_time + timedelta(seconds=random.randint(60, 3600))
-    call_duration = int((call_end_time - call_start_time).total_seconds())
-    call_type = random.choice(['incoming', 'outgoing', 'missed', 'voicemail'])
-    call_notes = fake.text(max_nb_chars=100) if random.choice([True, False]) else ""
-    return {
-        'call_id': call_id,
-        'caller_number': caller_number,
-        'callee_number': callee_number,
-        'call_start_time': call_start_time.isoformat(),
-        'call_end_time': call_end_time.isoformat(),
-        'call_duration': call_duration,
-        'call_type': call_type,
-        'call_notes': call_notes
+"""Generate synthetic call detail records for load testing.
+
+    python scripts/generate_csv.py --rows 100000000 --shards 64 --processes 8 --format parquet --output data/
+    python scripts/generate_csv.py --rows 50 --output cdr_records.csv
+
+Columns are built with NumPy a block at a time, and shards are written by a
+pool of processes. Each shard is seeded from ``--seed`` and its number, so
+the output does not depend on the process count. The data follows a few
+realistic patterns:
+
+- callers and callees are drawn from a Zipf distribution over a fixed
+  subscriber population, so a few numbers call (and are called) a lot
+- call start times follow a daily and weekly cycle
+- durations depend on the call type
+- a ``--fraud`` fraction of calls come from a small pool of fraud numbers
+  that make short calls to many different numbers at any hour, with
+  suspicious notes; the ``is_fraud`` column marks them
+
+``--audio N`` also writes N short WAV recordings named ``<call_id>.wav``,
+ready for ``manage.py transcribe_recordings``.
+"""
+import argparse
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    'call_id', 'caller_number', 'callee_number', 'call_start_time', 'call_end_time',
+    'call_duration', 'call_type', 'call_notes', 'is_fraud',
+]
+CALL_TYPES = np.array(['incoming', 'outgoing', 'missed', 'voicemail'])
+CALL_TYPE_WEIGHTS = np.array([0.42, 0.38, 0.12, 0.08])
+# Lognormal call durations per type: (median seconds, sigma). Missed calls
+# only ring, for 5-40 seconds.
+DURATIONS = {'incoming': (150, 1.0), 'outgoing': (120, 1.0), 'voicemail': (35, 0.5)}
+MAX_DURATION = 4 * 3600
+# Relative call volume for each hour of the day and each weekday (Monday first).
+HOUR_WEIGHTS = np.array([
+    1.0, 0.6, 0.4, 0.3, 0.3, 0.5, 1.5, 3.5, 6.0, 8.0, 9.0, 9.0,
+    8.0, 8.0, 8.5, 8.5, 8.5, 9.0, 8.0, 6.5, 5.0, 4.0, 3.0, 2.0,
+])
+WEEKDAY_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 1.05, 0.7, 0.55])
+
+NOTE_PHRASES = [
+    "customer called about a billing issue", "asked for the account balance", "set up a payment plan",
+    "requested a refund", "will call back later", "line dropped mid call", "left a voicemail",
+    "reported a network outage", "wants to upgrade the contract", "questions about roaming charges",
+    "international number blocked", "porting request", "complaint escalated to a supervisor",
+    "issue resolved", "follow up pending", "appointment confirmed", "delivery update",
+    "changed the billing address",
+]
+FRAUD_NOTES = [
+    "caller asked to verify account details and the card PIN",
+    "claimed to be from the bank and requested a wire transfer",
+    "asked the customer to pay a fine with gift cards",
+    "said a prize was waiting and asked for a processing fee",
+    "urgent call about a suspended account, asked for the one time code",
+    "asked for a money transfer to a safe account",
+]
+NOTE_POOL_SIZE = 4096
+# Subscriber indexes are scrambled into 10 digit numbers with a
+# multiplicative hash, unique for every index below the modulus.
+NUMBER_MULTIPLIER = 2_654_435_761
+NUMBER_MODULUS = 8_000_000_000
+
+SAMPLE_RATE = 16000
+# Seeds the recordings separately from every shard.
+AUDIO_STREAM = 1 << 20
+
+
+def phone_numbers(indexes):
+    """E.164 numbers for subscriber ``indexes`` (deterministic, vectorized)."""
+    digits = 2_000_000_000 + ((indexes.astype(np.int64) + 1) * NUMBER_MULTIPLIER) % NUMBER_MODULUS
+    return '+1' + pd.Series(digits).astype(str)
+
+
+@lru_cache(maxsize=2)
+def _zipf_cdf(exponent, population):
+    # Zipf bounded to the population, so exponents at or below 1 work too.
+    weights = np.arange(1, population + 1, dtype=np.float64) ** -exponent
+    return np.cumsum(weights) / weights.sum()
+
+
+def _zipf_indexes(rng, exponent, population, size):
+    cdf = _zipf_cdf(exponent, population)
+    return np.minimum(np.searchsorted(cdf, rng.random(size)), population - 1)
+
+
+def _note_pool(rng):
+    counts = rng.integers(1, 4, NOTE_POOL_SIZE)
+    return np.array(['; '.join(rng.choice(NOTE_PHRASES, count, replace=False)) for count in counts], dtype=object)
+
+
+def _start_seconds(rng, size, start, days):
+    day_offsets = np.arange(days)
+    weekdays = (start.weekday() + day_offsets) % 7
+    day_weights = WEEKDAY_WEIGHTS[weekdays] / WEEKDAY_WEIGHTS[weekdays].sum()
+    day = rng.choice(day_offsets, size, p=day_weights)
+    hour = rng.choice(24, size, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    return day * 86400 + hour * 3600 + rng.integers(0, 3600, size)
+
+
+def _durations(rng, call_types):
+    durations = rng.integers(5, 41, len(call_types))
+    for call_type, (median, sigma) in DURATIONS.items():
+        mask = call_types == call_type
+        durations[mask] = np.clip(rng.lognormal(np.log(median), sigma, mask.sum()), 1, MAX_DURATION)
+    return durations
+
+
+def generate_block(rng, first_index, size, options):
+    """Build ``size`` records, numbered from ``first_index``, as a DataFrame."""
+    subscribers = options['subscribers']
+    caller = _zipf_indexes(rng, options['zipf'], subscribers, size)
+    callee = _zipf_indexes(rng, options['zipf'], subscribers, size)
+    callee = np.where(callee == caller, (callee + 1) % subscribers, callee)
+    call_types = rng.choice(CALL_TYPES, size, p=CALL_TYPE_WEIGHTS)
+    start = _start_seconds(rng, size, options['start'], options['days'])
+    durations = _durations(rng, call_types)
+    note_pool = _note_pool(rng)
+    notes = np.where(rng.random(size) < options['notes'], note_pool[rng.integers(0, NOTE_POOL_SIZE, size)], '')
+
+    fraud = rng.random(size) < options['fraud']
+    count = int(fraud.sum())
+    if count:
+        # Fraud numbers sit outside the subscriber population and call
+        # numbers uniformly, briefly and at any hour.
+        caller[fraud] = subscribers + rng.integers(0, options['fraud_callers'], count)
+        callee[fraud] = rng.integers(0, subscribers, count)
+        call_types[fraud] = 'outgoing'
+        start[fraud] = rng.integers(0, options['days'] * 86400, count)
+        durations[fraud] = rng.integers(1, 26, count)
+        notes[fraud] = rng.choice(FRAUD_NOTES, count)
+
+    start_times = pd.Timestamp(options['start'], tz='UTC') + pd.to_timedelta(start, unit='s')
+    ids = pd.Series(np.arange(first_index, first_index + size)).astype(str).str.zfill(options['id_width'])
+    return pd.DataFrame({
+        'call_id': 'CALL' + ids,
+        'caller_number': phone_numbers(caller),
+        'callee_number': phone_numbers(callee),
+        'call_start_time': start_times,
+        'call_end_time': start_times + pd.to_timedelta(durations, unit='s'),
+        'call_duration': durations,
+        'call_type': call_types,
+        'call_notes': notes,
+        'is_fraud': fraud,
+    }, columns=COLUMNS)
+
+
+def _iso_strings(timestamps):
+    # Much faster than letting to_csv format each timestamp.
+    seconds = timestamps.dt.tz_localize(None).to_numpy('datetime64[s]')
+    return np.datetime_as_string(seconds, unit='s').astype(object) + '+00:00'
+
+
+def write_shard(shard, first_index, rows, path, options):
+    rng = np.random.default_rng([options['seed'], shard])
+    writer = None
+    try:
+        # A shard with no rows still gets its file, with only the header
+        # (or the Parquet schema).
+        for offset in range(0, max(rows, 1), options['block_size']):
+            block = generate_block(rng, first_index + offset, min(options['block_size'], rows - offset), options)
+            if options['format'] == 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(block, preserve_index=False)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                for column in ('call_start_time', 'call_end_time'):
+                    block[column] = _iso_strings(block[column])
+                block.to_csv(path, mode='a' if offset else 'w', header=not offset, index=False)
+    finally:
+        if writer:
+            writer.close()
+    return rows
+
+
+def _shard_paths(output, shards, extension):
+    # A single shard is written to ``output`` itself unless it names a
+    # directory: an existing one, or any path ending in a separator.
+    if shards == 1 and not os.path.isdir(output) and not output.endswith((os.sep, '/')):
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        return [output]
+    os.makedirs(output, exist_ok=True)
+    return [os.path.join(output, f"part-{shard:05d}.{extension}") for shard in range(shards)]
+
+
+def synthesize_recording(rng, seconds):
+    """Speech-like audio: voiced bursts at syllable rate with pauses, over a
+    low noise floor. Enough to exercise decoding, VAD and the ASR model."""
+    samples = int(seconds * SAMPLE_RATE)
+    t = np.arange(samples) / SAMPLE_RATE
+    pitch = rng.uniform(90, 220) * (1 + 0.05 * np.sin(2 * np.pi * 0.5 * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None)
+    # Pauses between phrases of one to three seconds.
+    phrases = np.repeat(rng.random(int(seconds) + 1) < 0.7, SAMPLE_RATE)[:samples]
+    audio = 0.3 * voice * syllables * phrases + rng.normal(0, 0.005, samples)
+    return np.clip(audio / max(np.abs(audio).max(), 1e-9) * 0.8, -1, 1)
+
+
+def write_audio_fixtures(directory, call_ids, seed):
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng([seed, AUDIO_STREAM])
+    for call_id in call_ids:
+        audio = synthesize_recording(rng, rng.uniform(3, 15))
+        with wave.open(os.path.join(directory, f"{call_id}.wav"), 'wb') as fh:
+            fh.setnchannels(1)
+            fh.setsampwidth(2)
+            fh.setframerate(SAMPLE_RATE)
+            fh.writeframes((audio * 32767).astype('<i2').tobytes())
+
+
+def generate(rows, output, shards=1, processes=None, fmt='csv', seed=0, block_size=1_000_000,
+             subscribers=None, zipf=0.8, fraud=0.01, fraud_callers=50, notes=0.5,
+             start='2024-01-01', days=365):
+    """Write ``rows`` records to ``output`` (a file, or a directory of
+    ``shards`` files) and return the shard paths."""
+    options = {
+        'format': fmt,
+        'seed': seed,
+        'block_size': block_size,
+        'subscribers': subscribers or max(rows // 20, 1000),
+        'zipf': zipf,
+        'fraud': fraud,
+        'fraud_callers': fraud_callers,
+        'notes': notes,
+        'start': pd.Timestamp(start),
+        'days': days,
+        'id_width': max(3, len(str(rows))),
     }
+    if fmt == 'parquet':
+        import pyarrow  # noqa: F401  (fail before starting the workers)
+    paths = _shard_paths(output, shards, fmt)
+    bounds = [rows * shard // shards for shard in range(shards + 1)]
+    with ProcessPoolExecutor(max_workers=min(processes or os.cpu_count(), shards)) as pool:
+        futures = [
+            pool.submit(write_shard, shard, bounds[shard] + 1, bounds[shard + 1] - bounds[shard], path, options)
+            for shard, path in enumerate(paths)
+        ]
+        for future in futures:
+            future.result()
+    return paths
 
-def generate_csv(num_records=50, filename='cdr_records.csv'):
-    fieldnames = [
-        'call_id',
-        'caller_number',
-        'callee_number',
-        'call_start_time',
-        'call_end_time',
-        'call_duration',
-        'call_type',
-        'call_notes'
-    ]
-
-    with open(filename, mode='w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for i in range(num_records):
-            call_record = generate_fake_call_record(i + 1)
-            # Ensure call_notes is not None (though it's already handled in generate_fake_call_record)
-            call_record['call_notes'] = call_record.get('call_notes', '')
-            writer.writerow(call_record)
 
+def generate_csv(num_records=50, filename='cdr_records.csv'):
+    generate(num_records, filename, processes=1)
     print(f"Generated {num_records} call records in {filename}")
 
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--output', '-o', default='cdr_records.csv',
+                        help="Output file, or a directory (always with --shards above 1, or when it "
+                             "exists or ends in a separator)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--processes', type=int, default=None, help="Default: one per CPU")
+    parser.add_argument('--block-size', type=int, default=1_000_000, help="Rows generated at a time")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--subscribers', type=int, default=None, help="Default: rows / 20")
+    parser.add_argument('--zipf', type=float, default=0.8, help="Zipf exponent of caller/callee popularity")
+    parser.add_argument('--fraud', type=float, default=0.01, help="Fraction of calls made by fraud numbers")
+    parser.add_argument('--fraud-callers', type=int, default=50)
+    parser.add_argument('--notes', type=float, default=0.5, help="Fraction of calls with notes")
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--audio', type=int, default=0, help="Number of WAV recordings to synthesize")
+    parser.add_argument('--audio-dir', default='recordings')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = generate(
+        args.rows, args.output, shards=args.shards, processes=args.processes, fmt=args.format,
+        seed=args.seed, block_size=args.block_size, subscribers=args.subscribers, zipf=args.zipf,
+        fraud=args.fraud, fraud_callers=args.fraud_callers, notes=args.notes, start=args.start, days=args.days,
+    )
+    seconds = time.perf_counter() - started
+    print(f"Generated {args.rows:,} call records in {len(paths)} file(s) in {seconds:.1f}s "
+          f"({args.rows / seconds:,.0f} rows/s)")
+    if args.audio:
+        width = max(3, len(str(args.rows)))
+        call_ids = [f"CALL{index:0{width}d}" for index in range(1, min(args.audio, args.rows) + 1)]
+        write_audio_fixtures(args.audio_dir, call_ids, args.seed)
+        print(f"Wrote {len(call_ids)} recordings to {args.audio_dir}")
+
+
 if __name__ == '__main__':
-    generate_csv()
\ No newline at end of file
+    main()